@@ -1,21 +1,25 @@
+# El perfilador de arranque debe activarse antes de cualquier otro import
+# para medir el costo de importación de cada módulo (STARTUP_PROFILE=1).
+from utils.startup_profiler import startup_profiler
+
+startup_profiler.start()
+
 from flask import Flask, render_template, redirect, url_for
 from flask_login import LoginManager, current_user
 from whitenoise import WhiteNoise
-import firebase_admin
-from firebase_admin import credentials
 import os
-import json
 
 from config import config
 from models.user import User
-
-from routes.auth_routes import auth_bp
-from routes.quiz_routes import quiz_bp
-from routes.team_routes import team_bp
-from routes.question_routes import question_bp
-from routes.bracket_routes import bracket_bp
+from services.container import init_services
+from utils.metrics import init_metrics
+from utils.page_cache import init_page_cache
+from utils.profiler import init_profiler
+from utils.rate_limit import init_proxy_fix, init_rate_limits
+from utils.structured_logging import init_logging
 
 
+@startup_profiler.profiled()
 def create_app(config_name=None):
     app = Flask(__name__)
 
@@ -29,12 +33,20 @@ def create_app(config_name=None):
         'static'
     )
     app.wsgi_app = WhiteNoise(app.wsgi_app, root=static_root, prefix="static/")
-
-    initialize_firebase(app)
+    init_proxy_fix(app)
+
+    init_logging(app)
+    init_services(app)
+    init_metrics(app)
+    init_rate_limits(app)
+    init_page_cache(app)
+    init_profiler(app)
     setup_login_manager(app)
     register_blueprints(app)
     setup_context_processors(app)
     setup_error_handlers(app)
+    setup_cli_commands(app)
+    startup_profiler.install(app)
 
     @app.route('/')
     def index():
@@ -51,74 +63,7 @@ def create_app(config_name=None):
     return app
 
 
-def initialize_firebase(app):
-    """
-    Inicializa Firebase Admin SDK.
-
-    Soporta:
-    - Variable de entorno FIREBASE_CREDENTIALS (JSON string) para producción
-    - Archivo local firebase_credentials.json para desarrollo local
-    """
-    try:
-        if firebase_admin._apps:
-            app.logger.info("Firebase ya estaba inicializado")
-            return
-
-        firebase_creds_json = os.getenv('FIREBASE_CREDENTIALS')
-
-        if firebase_creds_json:
-            app.logger.info("Usando credenciales de Firebase desde variable de entorno")
-
-            try:
-                cred_dict = json.loads(firebase_creds_json)
-                cred = credentials.Certificate(cred_dict)
-
-                firebase_admin.initialize_app(cred, {
-                    'storageBucket': 'olympic-math.firebasestorage.app'
-                })
-
-                print("=" * 60)
-                print("Firebase inicializado desde VARIABLE DE ENTORNO")
-                print("Bucket: olympic-math.firebasestorage.app")
-                print("=" * 60)
-
-            except json.JSONDecodeError as e:
-                app.logger.error(f"Error al parsear JSON de credenciales: {e}")
-                raise
-
-        else:
-            app.logger.info("Usando credenciales de Firebase desde archivo local")
-
-            cred_path = app.config.get(
-                'FIREBASE_CREDENTIALS',
-                os.path.join(os.path.dirname(__file__), 'firebase_credentials.json')
-            )
-
-            if not os.path.exists(cred_path):
-                raise FileNotFoundError(
-                    f"No se encontró el archivo de credenciales: {cred_path}\n"
-                    f"Tampoco está configurada la variable de entorno FIREBASE_CREDENTIALS"
-                )
-
-            cred = credentials.Certificate(cred_path)
-
-            firebase_admin.initialize_app(cred, {
-                'storageBucket': 'olympic-math.firebasestorage.app'
-            })
-
-            print("=" * 60)
-            print("Firebase inicializado desde ARCHIVO LOCAL")
-            print(f"Archivo: {cred_path}")
-            print("Bucket: olympic-math.firebasestorage.app")
-            print("=" * 60)
-
-        app.logger.info("Firebase inicializado correctamente")
-
-    except Exception as e:
-        app.logger.error(f"Error crítico al inicializar Firebase: {str(e)}")
-        raise
-
-
+@startup_profiler.profiled()
 def setup_login_manager(app):
     """
     Configuración de Flask-Login.
@@ -140,19 +85,33 @@ def setup_login_manager(app):
         return None
 
 
+@startup_profiler.profiled()
 def register_blueprints(app):
     """
     Registrar blueprints de la aplicación.
+    Los módulos de rutas se importan aquí para que el costo de importarlos
+    aparezca como una fase propia en el perfil de arranque.
     """
+    from routes.auth_routes import auth_bp
+    from routes.quiz_routes import quiz_bp
+    from routes.team_routes import team_bp
+    from routes.question_routes import question_bp
+    from routes.bracket_routes import bracket_bp
+    from routes.metrics_routes import metrics_bp
+    from routes.profiler_routes import profiler_bp
+
     app.register_blueprint(auth_bp)
     app.register_blueprint(quiz_bp)
     app.register_blueprint(team_bp)
     app.register_blueprint(question_bp)
     app.register_blueprint(bracket_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(profiler_bp)
 
     app.logger.info("Blueprints registrados correctamente")
 
 
+@startup_profiler.profiled()
 def setup_context_processors(app):
     """
     Registrar funciones helper para templates.
@@ -168,6 +127,7 @@ def setup_context_processors(app):
     app.logger.info("Context processors registrados correctamente")
 
 
+@startup_profiler.profiled()
 def setup_error_handlers(app):
     """
     Registrar manejo de errores HTTP comunes.
@@ -190,6 +150,16 @@ def setup_error_handlers(app):
         return redirect(url_for('question.add_question'))
 
 
+@startup_profiler.profiled()
+def setup_cli_commands(app):
+    """
+    Registrar comandos de consola (flask venue-pull, ...).
+    """
+    from repositories.venue import register_commands
+
+    register_commands(app)
+
+
 app = create_app()
 
 
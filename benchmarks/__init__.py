@@ -0,0 +1,5 @@
+"""
+Herramientas de medición de rendimiento (no se cargan en la aplicación).
+
+    python -m benchmarks.loadtest --help
+"""
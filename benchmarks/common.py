@@ -0,0 +1,72 @@
+"""
+Utilidades compartidas por los benchmarks: datos de prueba y percentiles.
+"""
+
+import math
+
+
+LEVELS = {
+    'nivel1': 'Nivel I',
+    'nivel2': 'Nivel II',
+    'nivel3': 'Nivel III'
+}
+
+
+def percentile(sorted_values, pct):
+    """
+    Percentil por rango más cercano sobre una lista ya ordenada.
+    """
+    if not sorted_values:
+        return 0.0
+
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples_ms, duration_s=None):
+    values = sorted(samples_ms)
+    summary = {
+        'count': len(values),
+        'p50_ms': round(percentile(values, 50), 3),
+        'p95_ms': round(percentile(values, 95), 3),
+        'p99_ms': round(percentile(values, 99), 3),
+        'max_ms': round(values[-1], 3) if values else 0.0,
+        'mean_ms': round(sum(values) / len(values), 3) if values else 0.0
+    }
+
+    if duration_s:
+        summary['rps'] = round(len(values) / duration_s, 1)
+
+    return summary
+
+
+def team_names(level_key, count):
+    return [f"{level_key.upper()}-E{index + 1}" for index in range(count)]
+
+
+def seed_repository(repo, levels=LEVELS, teams_per_level=8, questions_per_level=200, round_type='octavos'):
+    """
+    Cargar equipos y preguntas deterministas en un repositorio.
+    """
+    batch = repo.batch()
+
+    for level_key, level_label in levels.items():
+        for name in team_names(level_key, teams_per_level):
+            batch.set(repo.collection('teams').document(name.lower()), {
+                'name': name,
+                'level': level_label,
+                'score': 0,
+                'total_score': 0
+            })
+
+        for index in range(questions_per_level):
+            batch.set(repo.collection('questions').document(f"{level_key}-{round_type}-{index:04d}"), {
+                'level': level_key,
+                'round': round_type,
+                'question_text': f"Pregunta {index + 1} de {level_label}",
+                'question_image': f"https://example.invalid/{level_key}/{index}.png",
+                'options': {'a': '1', 'b': '2', 'c': '3', 'd': '4'},
+                'correct': 'abcd'[index % 4]
+            })
+
+    batch.commit()
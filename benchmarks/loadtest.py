@@ -0,0 +1,354 @@
+"""
+Prueba de carga de la aplicación Flask real contra el backend en memoria.
+
+Simula por cada sala de cada nivel:
+- pantallas públicas y celulares que consultan /quiz/versus/<nivel>/state
+- público que envía respuestas a /quiz/submit-public-answer/<nivel>
+- un admin que avanza preguntas, asigna puntos y abre nuevos
+  enfrentamientos cuando termina uno
+
+Todo corre en el mismo proceso (un hilo por cliente, test_client de
+Flask), así que mide el costo de CPU de la aplicación y la contención
+entre hilos, no la red.
+
+    python -m benchmarks.loadtest --pollers 40 --submitters 10 --duration 30
+    python -m benchmarks.loadtest --levels nivel1 --rooms 3 --json resultados.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from benchmarks.common import LEVELS, seed_repository, summarize, team_names
+
+
+class Recorder:
+    """
+    Latencias y códigos de respuesta por endpoint (thread-safe).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.failures = defaultdict(int)
+
+    def record(self, label, elapsed_ms, status):
+        with self._lock:
+            self.samples[label].append(elapsed_ms)
+            self.statuses[label][status] += 1
+
+    def failure(self, label):
+        with self._lock:
+            self.failures[label] += 1
+
+    def report(self, duration_s):
+        report = {}
+
+        for label in sorted(set(self.samples) | set(self.failures)):
+            summary = summarize(self.samples.get(label, []), duration_s)
+            statuses = dict(self.statuses.get(label, {}))
+            summary['errors_5xx'] = sum(count for status, count in statuses.items() if status >= 500)
+            summary['exceptions'] = self.failures.get(label, 0)
+            summary['statuses'] = {str(status): count for status, count in sorted(statuses.items())}
+            report[label] = summary
+
+        return report
+
+
+class LogCounter(logging.Handler):
+    """
+    Reemplaza los handlers del logger raíz durante la carga: cuenta los
+    registros de los servicios en lugar de escribirlos.
+    """
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+class SimulatedClient:
+    def __init__(self, app, recorder):
+        self.client = app.test_client()
+        self.recorder = recorder
+
+    def request(self, label, method, path, **kwargs):
+        started = time.perf_counter()
+
+        try:
+            response = self.client.open(path, method=method, **kwargs)
+        except Exception:
+            self.recorder.failure(label)
+            return None
+
+        self.recorder.record(label, (time.perf_counter() - started) * 1000, response.status_code)
+        return response
+
+
+def _sleep(stop, seconds):
+    if seconds > 0:
+        stop.wait(seconds * random.uniform(0.8, 1.2))
+
+
+def poller(app, recorder, stop, level_key, room, interval):
+    client = SimulatedClient(app, recorder)
+    path = f"/quiz/versus/{level_key}/{room}/state"
+
+    while not stop.is_set():
+        client.request('GET versus/<nivel>/<sala>/state', 'GET', path)
+        _sleep(stop, interval)
+
+
+def hub_poller(app, recorder, stop, interval):
+    client = SimulatedClient(app, recorder)
+
+    while not stop.is_set():
+        client.request('GET versus/state', 'GET', '/quiz/versus/state')
+        _sleep(stop, interval)
+
+
+def submitter(app, recorder, stop, level_key, room, interval):
+    client = SimulatedClient(app, recorder)
+    path = f"/quiz/submit-public-answer/{level_key}/{room}"
+
+    while not stop.is_set():
+        client.request(
+            'POST submit-public-answer',
+            'POST',
+            path,
+            data={'answer': random.choice('abcd')},
+            headers={'X-Requested-With': 'XMLHttpRequest'}
+        )
+        _sleep(stop, interval)
+
+
+def admin(app, recorder, stop, level_key, room, interval, teams, matches_started):
+    client = SimulatedClient(app, recorder)
+    level_label = LEVELS[level_key]
+    team1, team2 = teams
+
+    client.request('admin POST login', 'POST', '/login', data={
+        'username': app.config['ADMIN_USERNAME'],
+        'password': app.config['ADMIN_PASSWORD']
+    })
+
+    def start_match():
+        for _attempt in range(2):
+            response = client.request('admin POST select-level', 'POST', '/quiz/select-level', data={
+                'team1': team1,
+                'team2': team2,
+                'level': level_label,
+                'round': 'octavos',
+                'room': room
+            })
+
+            if response is not None and '/quiz/countdown' in response.headers.get('Location', ''):
+                client.request('admin GET countdown', 'GET', '/quiz/countdown')
+                matches_started[level_key] += 1
+                return True
+
+            # Sin preguntas nuevas: reiniciar el tracking y reintentar
+            client.request('admin POST reset-question-tracking', 'POST', '/quiz/reset-question-tracking', data={
+                'level': level_label,
+                'round': 'octavos'
+            })
+
+        return False
+
+    if not start_match():
+        recorder.failure('admin start_match')
+        return
+
+    while not stop.is_set():
+        _sleep(stop, interval)
+
+        response = client.request('admin GET quiz', 'GET', '/quiz/quiz')
+        if response is None:
+            continue
+
+        location = response.headers.get('Location', '')
+
+        if 'quiz-finished' in location:
+            client.request('admin GET quiz-finished', 'GET', '/quiz/quiz-finished')
+            start_match()
+
+        elif 'assign-point' in location:
+            client.request('admin POST assign-point', 'POST', '/quiz/assign-point', data={
+                'team': random.choice(teams),
+                'points': random.choice(['1', '2'])
+            })
+            _sleep(stop, interval)
+            client.request('admin POST next-question', 'POST', '/quiz/next-question')
+
+        elif response.status_code == 200:
+            client.request('admin POST next-question', 'POST', '/quiz/next-question')
+
+
+def build_app(backend, workdir):
+    os.environ['DATA_BACKEND'] = backend
+    os.environ.setdefault('DATA_SQLITE_PATH', os.path.join(workdir, 'data.db'))
+    os.environ.setdefault('MATCH_STORE_PATH', os.path.join(workdir, 'matches.db'))
+    os.environ.setdefault('FIREBASE_WARMUP', '0')
+    os.environ.setdefault('QUESTION_TIMER_SCHEDULER', '0')
+    os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+
+    # app.py arma la aplicación al importarse: usar esa instancia y no
+    # crear otra (servicios, hilos y handlers de log duplicados)
+    from app import app
+    from services.container import get_container
+
+    app.logger.setLevel('WARNING')
+    return app, get_container
+
+
+def run(args):
+    random.seed(args.seed)
+    workdir = tempfile.mkdtemp(prefix='olimpiadas-loadtest-')
+    app, get_container = build_app(args.backend, workdir)
+    levels = {key: LEVELS[key] for key in args.levels}
+    rooms = [f"sala{index + 1}" for index in range(args.rooms)]
+
+    with app.app_context():
+        seed_repository(
+            get_container().db,
+            levels=levels,
+            teams_per_level=max(2, 2 * len(rooms)),
+            questions_per_level=args.questions
+        )
+
+    recorder = Recorder()
+    stop = threading.Event()
+    matches_started = defaultdict(int)
+    threads = []
+
+    def spawn(target, *target_args):
+        thread = threading.Thread(target=target, args=(app, recorder, stop) + target_args, daemon=True)
+        threads.append(thread)
+
+    for level_key in levels:
+        names = team_names(level_key, max(2, 2 * len(rooms)))
+
+        for index, room in enumerate(rooms):
+            spawn(admin, level_key, room, args.admin_interval, names[2 * index:2 * index + 2], matches_started)
+
+            for _ in range(args.pollers):
+                spawn(poller, level_key, room, args.poll_interval)
+
+            for _ in range(args.submitters):
+                spawn(submitter, level_key, room, args.submit_interval)
+
+    for _ in range(args.hub_pollers):
+        spawn(hub_poller, args.poll_interval)
+
+    root = logging.getLogger()
+    saved_handlers = list(root.handlers)
+    log_counter = LogCounter()
+    started = time.perf_counter()
+
+    # Los servicios registran errores esperados (respuestas fuera de
+    # tiempo, etc.); se cuentan aparte para no ensuciar el reporte.
+    root.handlers = [log_counter]
+    try:
+        for thread in threads:
+            thread.start()
+
+        stop.wait(args.duration)
+        stop.set()
+
+        for thread in threads:
+            thread.join(timeout=10)
+    finally:
+        root.handlers = saved_handlers
+
+    duration = time.perf_counter() - started
+
+    return {
+        'config': {
+            'backend': args.backend,
+            'levels': list(levels),
+            'rooms': len(rooms),
+            'pollers_per_room': args.pollers,
+            'submitters_per_room': args.submitters,
+            'hub_pollers': args.hub_pollers,
+            'poll_interval_s': args.poll_interval,
+            'submit_interval_s': args.submit_interval,
+            'admin_interval_s': args.admin_interval,
+            'duration_s': round(duration, 2),
+            'threads': len(threads)
+        },
+        'matches_started': dict(matches_started),
+        'service_log_lines': log_counter.count,
+        'endpoints': recorder.report(duration)
+    }
+
+
+def print_report(result):
+    config = result['config']
+    print(
+        f"backend={config['backend']} niveles={','.join(config['levels'])} salas={config['rooms']} "
+        f"hilos={config['threads']} duración={config['duration_s']}s"
+    )
+    print(f"enfrentamientos iniciados: {result['matches_started']}")
+    print()
+
+    header = f"{'endpoint':<34}{'n':>8}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'5xx':>6}{'exc':>6}"
+    print(header)
+    print('-' * len(header))
+
+    total = 0
+    for label, summary in result['endpoints'].items():
+        total += summary['count']
+        print(
+            f"{label:<34}{summary['count']:>8}{summary.get('rps', 0):>9.1f}"
+            f"{summary['p50_ms']:>9.2f}{summary['p95_ms']:>9.2f}{summary['p99_ms']:>9.2f}"
+            f"{summary['max_ms']:>9.2f}{summary['errors_5xx']:>6}{summary['exceptions']:>6}"
+        )
+
+    print('-' * len(header))
+    print(f"total: {total} requests, {total / config['duration_s']:.1f} req/s (latencias en ms)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', default='memory', choices=['memory', 'sqlite'])
+    parser.add_argument('--levels', nargs='+', default=list(LEVELS), choices=list(LEVELS))
+    parser.add_argument('--rooms', type=int, default=1, help='salas en paralelo por nivel')
+    parser.add_argument('--pollers', type=int, default=30, help='pantallas/celulares por sala')
+    parser.add_argument('--submitters', type=int, default=5, help='clientes que envían respuestas por sala')
+    parser.add_argument('--hub-pollers', type=int, default=2, help='pantallas del hub /quiz/versus')
+    parser.add_argument('--poll-interval', type=float, default=2.5, help='segundos entre consultas (0 = sin pausa)')
+    parser.add_argument('--submit-interval', type=float, default=3.0)
+    parser.add_argument('--admin-interval', type=float, default=2.0)
+    parser.add_argument('--questions', type=int, default=200, help='preguntas sembradas por nivel')
+    parser.add_argument('--duration', type=float, default=20.0, help='segundos de carga')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='guardar el resultado en este archivo')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    result = run(args)
+    print_report(result)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as fh:
+            json.dump(result, fh, indent=2, ensure_ascii=False)
+        print(f"\nResultado guardado en {args.json}")
+
+    errors = sum(summary['errors_5xx'] + summary['exceptions'] for summary in result['endpoints'].values())
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,413 @@
+"""
+Micro-benchmarks de las rutas calientes de los servicios.
+
+Corren contra un repositorio en memoria determinista que agrega una
+latencia fija a cada RPC (get, consulta o commit), como si fuera
+Firestore, y cuenta las RPC de cada iteración. Así una regresión se ve
+en dos números: tiempo de pared y cantidad de RPC.
+
+    python -m benchmarks.microbench                      # correr y mostrar
+    python -m benchmarks.microbench --save default       # guardar baseline
+    python -m benchmarks.microbench --compare default    # comparar (exit 1 si empeora)
+
+Los baselines se guardan en benchmarks/baselines/<nombre>.json.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+from benchmarks.common import LEVELS, seed_repository, summarize, team_names
+from repositories.memory import MemoryRepository
+
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+RPC_KINDS = ('get', 'query', 'commit', 'writes')
+
+
+class LatencyRepository(MemoryRepository):
+    """
+    MemoryRepository con latencia fija por RPC y contadores.
+    """
+
+    def __init__(self, latency_ms=0.0):
+        super().__init__()
+        self.latency = latency_ms / 1000
+        self.enabled = True
+        self.counts = dict.fromkeys(RPC_KINDS, 0)
+
+    def _rpc(self, kind, writes=0):
+        if not self.enabled:
+            return
+
+        self.counts[kind] += 1
+        self.counts['writes'] += writes
+
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _get(self, path):
+        self._rpc('get')
+        return super()._get(path)
+
+    def _query(self, collection_path, filters, orders, limit):
+        self._rpc('query')
+        return super()._query(collection_path, filters, orders, limit)
+
+    def _commit(self, writes):
+        self._rpc('commit', len(writes))
+        return super()._commit(writes)
+
+    def snapshot(self):
+        return dict(self.counts)
+
+
+class Context:
+    """
+    Aplicación, servicios y repositorio compartidos por los benchmarks.
+    """
+
+    def __init__(self, latency_ms):
+        workdir = tempfile.mkdtemp(prefix='olimpiadas-microbench-')
+        os.environ['DATA_BACKEND'] = 'memory'
+        os.environ['MATCH_STORE_PATH'] = os.path.join(workdir, 'matches.db')
+        os.environ.setdefault('FIREBASE_WARMUP', '0')
+        os.environ.setdefault('QUESTION_TIMER_SCHEDULER', '0')
+        os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+        os.environ.setdefault('PREPARE_MATCH_ON_COUNTDOWN', '0')
+
+        # La instancia que arma app.py al importarse (ver loadtest.build_app)
+        from app import app
+        from services.container import get_container
+
+        self.app = app
+        self.app.logger.setLevel('WARNING')
+        self.repo = LatencyRepository(latency_ms)
+
+        self.request_context = self.app.test_request_context()
+        self.request_context.push()
+
+        self.container = get_container()
+        self.container._db = self.repo
+
+        self.repo.enabled = False
+        seed_repository(self.repo, teams_per_level=8, questions_per_level=200)
+        self.repo.enabled = True
+
+        self.quiz_service = self.container.quiz_service
+        self.quiz_service._rng.seed(0)
+        self.team_service = self.container.team_service
+
+    def close(self):
+        self.request_context.pop()
+
+    def start_match(self, level_key='nivel1', room='sala1'):
+        quiz_service = self.quiz_service
+        quiz_service.clear_quiz_session()
+        quiz_service.reset_used_questions_tracking(level=LEVELS[level_key], round_type='octavos')
+
+        team1, team2 = team_names(level_key, 2)
+        success, message, _ = quiz_service.initialize_quiz(
+            LEVELS[level_key], team1, team2, round_type='octavos', room=room
+        )
+        if not success:
+            raise RuntimeError(message)
+
+        quiz_service.start_countdown(duration=0)
+        quiz_service.get_current_question()
+        return quiz_service.get_active_match()
+
+
+# ============================================================
+# Benchmarks
+# ============================================================
+
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(name, iterations=50):
+    """
+    Registrar un benchmark. La función recibe el Context y devuelve
+    (setup, run): setup prepara cada iteración (sin medir) y run es lo
+    que se mide.
+    """
+    def decorator(func):
+        BENCHMARKS[name] = (func, iterations)
+        return func
+    return decorator
+
+
+@benchmark('quiz.build_public_payload', iterations=200)
+def bench_build_public_payload(ctx):
+    match = ctx.start_match()
+
+    def run():
+        ctx.quiz_service._build_public_payload(match, status='in_progress')
+
+    return None, run
+
+
+@benchmark('quiz.submit_public_answer', iterations=60)
+def bench_submit_public_answer(ctx):
+    ctx.start_match()
+
+    def setup():
+        if ctx.quiz_service.is_quiz_finished(ctx.quiz_service.get_active_match()):
+            ctx.start_match()
+        ctx.quiz_service.next_question()
+        if ctx.quiz_service.is_quiz_finished(ctx.quiz_service.get_active_match()):
+            ctx.start_match()
+
+    def run():
+        success, message = ctx.quiz_service.submit_public_answer('a', level='nivel1', room='sala1')
+        if not success:
+            raise RuntimeError(message)
+
+    return setup, run
+
+
+@benchmark('quiz.resolve_correct_answer', iterations=40)
+def bench_resolve_correct_answer(ctx):
+    ctx.start_match()
+
+    def setup():
+        quiz_service = ctx.quiz_service
+        if quiz_service.is_quiz_finished(quiz_service.get_active_match()):
+            ctx.start_match()
+        quiz_service.next_question()
+        if quiz_service.is_quiz_finished(quiz_service.get_active_match()):
+            ctx.start_match()
+
+        question = quiz_service._get_current_question_raw(quiz_service.get_active_match())
+        success, message = quiz_service.submit_public_answer(question['correct'], level='nivel1', room='sala1')
+        if not success:
+            raise RuntimeError(message)
+
+    def run():
+        team = ctx.quiz_service.get_active_match()['teams'][0]
+        success, message = ctx.quiz_service.resolve_correct_answer_assignment(team, argument_valid=True)
+        if not success:
+            raise RuntimeError(message)
+
+    return setup, run
+
+
+@benchmark('quiz.initialize_quiz', iterations=30)
+def bench_initialize_quiz(ctx):
+    team1, team2 = team_names('nivel2', 2)
+
+    def setup():
+        ctx.quiz_service.clear_quiz_session()
+        ctx.quiz_service.reset_used_questions_tracking(level='Nivel II', round_type='octavos')
+
+    def run():
+        success, message, _ = ctx.quiz_service.initialize_quiz(
+            'Nivel II', team1, team2, round_type='octavos', room='sala1'
+        )
+        if not success:
+            raise RuntimeError(message)
+
+    return setup, run
+
+
+@benchmark('teams.get_all_teams+sort (frío)', iterations=100)
+def bench_teams_cold(ctx):
+    from routes.quiz_routes import sort_teams_for_scoreboard
+
+    def setup():
+        ctx.team_service._clear_cache()
+
+    def run():
+        sort_teams_for_scoreboard(ctx.team_service.get_all_teams())
+
+    return setup, run
+
+
+@benchmark('teams.get_all_teams+sort (caché)', iterations=500)
+def bench_teams_warm(ctx):
+    from routes.quiz_routes import sort_teams_for_scoreboard
+
+    ctx.team_service.get_all_teams()
+
+    def run():
+        sort_teams_for_scoreboard(ctx.team_service.get_all_teams())
+
+    return None, run
+
+
+@benchmark('bracket.advance_team', iterations=50)
+def bench_advance_team(ctx):
+    from services import bracket_service
+
+    team_ids = [name.lower() for name in team_names('nivel3', 8)]
+
+    def setup():
+        bracket_service.reset_bracket()
+        bracket_service.create_new_bracket(team_ids)
+
+    def run():
+        if not bracket_service.advance_team('quarterfinals_match1', team_ids[0]):
+            raise RuntimeError('advance_team falló')
+
+    return setup, run
+
+
+# ============================================================
+# Ejecución y baselines
+# ============================================================
+
+def run_benchmarks(latency_ms, selected=None, iterations_scale=1.0):
+    ctx = Context(latency_ms)
+    results = OrderedDict()
+    service_output = io.StringIO()
+
+    try:
+        with contextlib.redirect_stdout(service_output):
+            for name, (factory, iterations) in BENCHMARKS.items():
+                if selected and not any(token in name for token in selected):
+                    continue
+
+                ctx.repo.enabled = False
+                setup, run = factory(ctx)
+                iterations = max(1, int(iterations * iterations_scale))
+                samples = []
+                rpc_totals = dict.fromkeys(RPC_KINDS, 0)
+
+                for _ in range(iterations):
+                    ctx.repo.enabled = False
+                    if setup:
+                        setup()
+                    ctx.repo.enabled = True
+
+                    before = ctx.repo.snapshot()
+                    started = time.perf_counter()
+                    run()
+                    samples.append((time.perf_counter() - started) * 1000)
+                    after = ctx.repo.snapshot()
+
+                    for kind in RPC_KINDS:
+                        rpc_totals[kind] += after[kind] - before[kind]
+
+                summary = summarize(samples)
+                summary['rpc_per_iteration'] = {
+                    kind: round(total / iterations, 2) for kind, total in rpc_totals.items()
+                }
+                results[name] = summary
+
+    finally:
+        ctx.close()
+
+    return {
+        'config': {
+            'latency_ms': latency_ms,
+            'python': platform.python_version(),
+            'machine': platform.machine()
+        },
+        'results': results
+    }
+
+
+def baseline_path(name):
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def compare(current, baseline, tolerance):
+    """
+    Regresiones: más RPC que el baseline, o p50 más lento que
+    baseline * (1 + tolerance) por más de 0.5 ms.
+    """
+    regressions = []
+
+    for name, result in current['results'].items():
+        previous = baseline['results'].get(name)
+        if not previous:
+            continue
+
+        for kind in RPC_KINDS:
+            now_rpc = result['rpc_per_iteration'][kind]
+            before_rpc = previous['rpc_per_iteration'].get(kind, 0)
+            if now_rpc > before_rpc:
+                regressions.append(f"{name}: {kind} {before_rpc} -> {now_rpc} RPC/iteración")
+
+        limit = previous['p50_ms'] * (1 + tolerance)
+        if result['p50_ms'] > limit and result['p50_ms'] - previous['p50_ms'] > 0.5:
+            regressions.append(f"{name}: p50 {previous['p50_ms']} -> {result['p50_ms']} ms")
+
+    return regressions
+
+
+def print_results(current, baseline=None):
+    print(f"latencia por RPC: {current['config']['latency_ms']} ms")
+    header = f"{'benchmark':<36}{'n':>6}{'p50':>10}{'p95':>10}{'get':>7}{'query':>7}{'commit':>8}{'writes':>8}"
+    print(header)
+    print('-' * len(header))
+
+    for name, result in current['results'].items():
+        rpc = result['rpc_per_iteration']
+        line = (
+            f"{name:<36}{result['count']:>6}{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}"
+            f"{rpc['get']:>7g}{rpc['query']:>7g}{rpc['commit']:>8g}{rpc['writes']:>8g}"
+        )
+
+        previous = (baseline or {}).get('results', {}).get(name)
+        if previous and previous['p50_ms']:
+            change = (result['p50_ms'] - previous['p50_ms']) / previous['p50_ms'] * 100
+            line += f"   {change:+.0f}% p50"
+
+        print(line)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency-ms', type=float, default=2.0, help='latencia inyectada por RPC')
+    parser.add_argument('--only', nargs='+', help='correr solo los benchmarks que contengan estos textos')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplicador de iteraciones')
+    parser.add_argument('--save', metavar='NOMBRE', help='guardar el resultado como baseline')
+    parser.add_argument('--compare', metavar='NOMBRE', help='comparar contra un baseline guardado')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='margen de p50 antes de marcar regresión')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    baseline = None
+
+    if args.compare:
+        with open(baseline_path(args.compare), encoding='utf-8') as fh:
+            baseline = json.load(fh)
+
+        # Comparar con la misma latencia inyectada del baseline
+        args.latency_ms = baseline['config']['latency_ms']
+
+    current = run_benchmarks(args.latency_ms, selected=args.only, iterations_scale=args.scale)
+    print_results(current, baseline)
+
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path(args.save), 'w', encoding='utf-8') as fh:
+            json.dump(current, fh, indent=2, ensure_ascii=False)
+            fh.write('\n')
+        print(f"\nBaseline guardado en {baseline_path(args.save)}")
+
+    if baseline:
+        regressions = compare(current, baseline, args.tolerance)
+        if regressions:
+            print('\nRegresiones:')
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+
+        print('\nSin regresiones frente al baseline.')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
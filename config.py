@@ -7,6 +7,9 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INSTANCE_DIR = os.path.join(BASE_DIR, 'instance')
+
 
 class Config:
     """Configuración base de la aplicación"""
@@ -38,9 +41,104 @@ class Config:
     QUIZ_DURATION = 300  # 5 minutos
     QUESTIONS_PER_QUIZ = 10
 
+    # Vencimiento de los cronómetros de pregunta desde el servidor
+    # (estado time_expired, ver services/timer_scheduler.py)
+    QUESTION_TIMER_SCHEDULER = os.environ.get('QUESTION_TIMER_SCHEDULER', '1') == '1'
+    QUESTION_TIMER_RESCAN_INTERVAL = float(os.environ.get('QUESTION_TIMER_RESCAN_INTERVAL', '30'))
+
+    # Precarga de preguntas, equipos y primer estado público durante el
+    # countdown (ver QuizService.prepare_match)
+    PREPARE_MATCH_ON_COUNTDOWN = os.environ.get('PREPARE_MATCH_ON_COUNTDOWN', '1') == '1'
+
     # Session
     SESSION_PERMANENT = False
 
+    # Estado de enfrentamientos (lado servidor, compartido entre workers)
+    MATCH_STORE_PATH = os.environ.get(
+        'MATCH_STORE_PATH', os.path.join(INSTANCE_DIR, 'database.db'))
+
+    # Backend de datos: firestore | sqlite | venue | memory (ver repositories/)
+    DATA_BACKEND = os.environ.get('DATA_BACKEND', 'firestore')
+    DATA_SQLITE_PATH = os.environ.get(
+        'DATA_SQLITE_PATH', os.path.join(INSTANCE_DIR, 'database.db'))
+
+    # Modo sede (DATA_BACKEND=venue): réplica diferida a Firestore
+    VENUE_SYNC_INTERVAL = float(os.environ.get('VENUE_SYNC_INTERVAL', '2'))
+    VENUE_SYNC_BATCH = int(os.environ.get('VENUE_SYNC_BATCH', '200'))
+    VENUE_PULL_COLLECTIONS = ['teams', 'questions', 'brackets', 'used_questions', 'public_state']
+
+    # Tiempo máximo por RPC de Firestore (segundos, reintentos incluidos) y
+    # circuit breaker del repositorio (ver repositories/circuit_breaker.py)
+    FIRESTORE_DEADLINE = float(os.environ.get('FIRESTORE_DEADLINE', '5'))
+    CIRCUIT_BREAKER_ENABLED = os.environ.get('CIRCUIT_BREAKER_ENABLED', '1') == '1'
+    CIRCUIT_BREAKER_FAILURES = int(os.environ.get('CIRCUIT_BREAKER_FAILURES', '5'))
+    CIRCUIT_BREAKER_RESET_TIMEOUT = float(os.environ.get('CIRCUIT_BREAKER_RESET_TIMEOUT', '10'))
+
+    # Logging estructurado (JSON por línea, escrito desde un hilo de fondo)
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')  # json | text
+    LOG_QUEUE_SIZE = 10000
+    LOG_ERROR_BURST = int(os.environ.get('LOG_ERROR_BURST', '5'))
+    LOG_ERROR_WINDOW = int(os.environ.get('LOG_ERROR_WINDOW', '60'))
+
+    # Control de admisión de endpoints públicos (ver utils/rate_limit.py).
+    # El admin no tiene límites.
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+    RATE_LIMITS = {
+        # endpoint: (requests por segundo, ráfaga), por cliente y nivel
+        'quiz.versus_level_state': (3, 10),
+        'quiz.versus_state': (2, 10),
+        'quiz.versus_level': (0.5, 5),
+        'quiz.versus': (0.5, 5),
+        'quiz.scoreboard': (0.5, 5),
+        'quiz.submit_public_answer': (1, 3),
+        'quiz.audience_vote': (1, 3),
+        'quiz.question_content': (5, 20)
+    }
+    RATE_LIMIT_TOTALS = {
+        # endpoint: (requests por segundo, ráfaga), todos los clientes de
+        # un nivel juntos, por worker
+        'quiz.versus_level_state': (200, 400),
+        'quiz.versus_state': (100, 200),
+        'quiz.versus_level': (20, 50),
+        'quiz.versus': (20, 50),
+        'quiz.scoreboard': (20, 50),
+        'quiz.submit_public_answer': (100, 300),
+        'quiz.audience_vote': (300, 600),
+        'quiz.question_content': (200, 400)
+    }
+    RATE_LIMIT_SHARED_IP_FACTOR = 20  # clientes sin cookie: cupo por IP
+    # Proxies de confianza delante de la app (X-Forwarded-For); 0 = ninguno
+    PROXY_FIX_COUNT = int(os.environ.get('PROXY_FIX_COUNT', '0'))
+    PUBLIC_CONCURRENCY_LIMIT = int(os.environ.get('PUBLIC_CONCURRENCY_LIMIT', '16'))
+    PUBLIC_QUEUE_TIMEOUT = 0.1
+
+    # HTML renderizado y comprimido de scoreboard, versus y versus_hub por
+    # versión del estado (ver utils/page_cache.py)
+    PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', '1') == '1'
+    PAGE_CACHE_SIZE = 128
+    PAGE_CACHE_GZIP_LEVEL = 6
+    PAGE_CACHE_BROTLI_QUALITY = 5
+
+    # Métricas (/metrics en formato Prometheus, log por request)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    METRICS_LOG_REQUESTS = os.environ.get('METRICS_LOG_REQUESTS', '1') == '1'
+    # Sin token /metrics solo responde al admin con sesión
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # Perfilador de requests bajo demanda (/admin/profiler)
+    PROFILER_DIR = os.path.join(INSTANCE_DIR, 'profiles')
+    PROFILER_SETTINGS_PATH = os.path.join(INSTANCE_DIR, 'profiler.json')
+    PROFILER_TOKEN = os.environ.get('PROFILER_TOKEN')
+    PROFILER_SAMPLE_INTERVAL_MS = 1
+    PROFILER_MAX_PROFILES = 50
+    PROFILER_TOP_FUNCTIONS = 40
+
+    # Arranque: perfilado (STARTUP_PROFILE=1) y precalentamiento de Firebase
+    STARTUP_PROFILE_PATH = os.environ.get(
+        'STARTUP_PROFILE_PATH', os.path.join(INSTANCE_DIR, 'startup_profile.json'))
+    FIREBASE_WARMUP = os.environ.get('FIREBASE_WARMUP', '1') == '1'
+
 
 class DevelopmentConfig(Config):
     """Configuración para desarrollo"""
@@ -0,0 +1,26 @@
+"""
+Configuración de gunicorn.
+
+La aplicación se precarga en el proceso maestro (memoria compartida
+copy-on-write entre workers). Firebase y los clientes gRPC se crean
+de forma lazy en cada worker; el hook post_fork descarta cualquier
+estado heredado del maestro por si algo lo inicializó antes del fork
+y, si FIREBASE_WARMUP está activo, precalienta Firebase en segundo plano.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+preload_app = True
+
+
+def post_fork(server, worker):
+    from app import app
+    from services.container import get_container
+
+    with app.app_context():
+        container = get_container()
+        container.reset_after_fork()
+
+        if app.config.get('FIREBASE_WARMUP'):
+            container.warm_up_async()
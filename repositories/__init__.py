@@ -0,0 +1,122 @@
+"""
+Capa de acceso a datos.
+
+Los servicios reciben un repositorio con la API de firestore.Client
+(collection / document / where / batch / ...) y no saben qué backend hay
+detrás. El backend se elige con DATA_BACKEND:
+
+- firestore: producción (Firebase)
+- sqlite:    todo local en instance/database.db, sin red
+- venue:     SQLite primario con réplica diferida a Firestore (modo sede)
+- memory:    todo en memoria del proceso (pruebas y benchmarks)
+"""
+
+from repositories.base import (
+    ArrayRemove,
+    ArrayUnion,
+    DELETE_FIELD,
+    Increment,
+    NotFoundError,
+    Query,
+    Repository,
+    SERVER_TIMESTAMP,
+    UnavailableError,
+)
+
+
+BACKENDS = ('firestore', 'sqlite', 'venue', 'memory')
+
+
+def create_repository(app):
+    """
+    Construir el repositorio configurado en DATA_BACKEND, instrumentado
+    con métricas si METRICS_ENABLED está activo y detrás de un circuit
+    breaker si CIRCUIT_BREAKER_ENABLED está activo.
+    """
+    repository = _create_backend(app)
+
+    if app.config.get('METRICS_ENABLED', True):
+        from repositories.instrumented import InstrumentedRepository
+        repository = InstrumentedRepository(repository)
+
+    if app.config.get('CIRCUIT_BREAKER_ENABLED', True):
+        from repositories.circuit_breaker import CircuitBreaker, CircuitBreakerRepository
+        repository = CircuitBreakerRepository(repository, CircuitBreaker(
+            repository.backend,
+            failure_threshold=app.config.get('CIRCUIT_BREAKER_FAILURES', 5),
+            reset_timeout=app.config.get('CIRCUIT_BREAKER_RESET_TIMEOUT', 10),
+            deadline=app.config.get('FIRESTORE_DEADLINE')
+        ))
+
+    return repository
+
+
+def _create_backend(app):
+    backend = app.config.get('DATA_BACKEND', 'firestore')
+
+    if backend == 'memory':
+        from repositories.memory import MemoryRepository
+        return MemoryRepository()
+
+    if backend == 'sqlite':
+        from repositories.sqlite import SQLiteRepository
+        return SQLiteRepository(app.config['DATA_SQLITE_PATH'])
+
+    if backend == 'venue':
+        from repositories.venue import VenueRepository
+        repository = VenueRepository(
+            app.config['DATA_SQLITE_PATH'],
+            remote_factory=lambda: _firestore_repository(app),
+            sync_interval=app.config['VENUE_SYNC_INTERVAL'],
+            batch_size=app.config['VENUE_SYNC_BATCH']
+        )
+        repository.start_sync()
+        return repository
+
+    if backend == 'firestore':
+        return _firestore_repository(app)
+
+    raise ValueError(
+        f"DATA_BACKEND inválido: {backend}. Opciones: {', '.join(BACKENDS)}"
+    )
+
+
+def _firestore_repository(app):
+    from firebase_admin import firestore
+    from repositories.firestore import FirestoreRepository
+    from services.firebase import ensure_firebase
+
+    ensure_firebase(app)
+    return FirestoreRepository(firestore.client(), deadline=app.config.get('FIRESTORE_DEADLINE'))
+
+
+def get_repository():
+    """
+    Repositorio de la aplicación actual; fuera de un contexto de
+    aplicación (scripts) se usa Firestore directamente.
+    """
+    from flask import has_app_context
+
+    if has_app_context():
+        from services.container import get_container
+        return get_container().db
+
+    from firebase_admin import firestore
+    from repositories.firestore import FirestoreRepository
+    return FirestoreRepository(firestore.client())
+
+
+__all__ = [
+    'ArrayRemove',
+    'ArrayUnion',
+    'BACKENDS',
+    'DELETE_FIELD',
+    'Increment',
+    'NotFoundError',
+    'Query',
+    'Repository',
+    'SERVER_TIMESTAMP',
+    'UnavailableError',
+    'create_repository',
+    'get_repository',
+]
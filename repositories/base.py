@@ -0,0 +1,538 @@
+"""
+Interfaz de repositorio de documentos (subconjunto de Firestore).
+
+Los servicios trabajan con la misma API que ya usaban con
+firestore.client():
+
+    repo.collection('teams').document(team_id).get()
+    repo.collection('questions').where('level', '==', 'nivel1').limit(5).stream()
+    ref.set(data, merge=True) / ref.update({'a.b': 1}) / ref.delete()
+    repo.batch() ... batch.commit()
+    repo.run_transaction(lambda transaction: ...)
+
+Las referencias, consultas, batches y snapshots se implementan aquí una
+sola vez. Cada backend solo implementa tres primitivas:
+
+    _get(path)                                  -> dict | None
+    _query(collection_path, filters, orders, limit) -> [(doc_id, dict)]
+    _commit(writes)                             aplica una lista de Write
+                                                de forma atómica
+
+Los valores especiales (SERVER_TIMESTAMP, DELETE_FIELD, Increment,
+ArrayUnion, ArrayRemove) son propios del paquete; el adaptador de
+Firestore los traduce y los backends locales los resuelven con
+apply_write().
+"""
+
+import copy
+import threading
+import uuid
+from datetime import datetime, timezone
+
+
+# ============================================================
+# Valores especiales
+# ============================================================
+
+class _Sentinel:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+
+SERVER_TIMESTAMP = _Sentinel('SERVER_TIMESTAMP')
+DELETE_FIELD = _Sentinel('DELETE_FIELD')
+
+
+class Increment:
+    def __init__(self, value):
+        self.value = value
+
+    def __repr__(self):
+        return f"Increment({self.value!r})"
+
+
+class ArrayUnion:
+    def __init__(self, values):
+        self.values = list(values)
+
+    def __repr__(self):
+        return f"ArrayUnion({self.values!r})"
+
+
+class ArrayRemove:
+    def __init__(self, values):
+        self.values = list(values)
+
+    def __repr__(self):
+        return f"ArrayRemove({self.values!r})"
+
+
+TRANSFORMS = (Increment, ArrayUnion, ArrayRemove)
+
+
+class NotFoundError(Exception):
+    """update() sobre un documento que no existe."""
+
+
+class UnavailableError(Exception):
+    """El backend no está respondiendo (circuito abierto, ver circuit_breaker.py)."""
+
+
+# ============================================================
+# Escrituras
+# ============================================================
+
+class Write:
+    SET = 'set'
+    UPDATE = 'update'
+    DELETE = 'delete'
+
+    __slots__ = ('op', 'path', 'data', 'merge')
+
+    def __init__(self, op, path, data=None, merge=False):
+        self.op = op
+        self.path = path
+        self.data = data
+        self.merge = merge
+
+
+def split_path(path):
+    """
+    ('match_journal', 'abc', 'entries', '0001') -> ('match_journal/abc/entries', '0001')
+    """
+    return '/'.join(path[:-1]), path[-1]
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+def _resolve(value, current=None, now=None):
+    """
+    Resolver valores especiales contra el valor actual del campo.
+    """
+    if value is SERVER_TIMESTAMP:
+        return now or utcnow()
+
+    if isinstance(value, Increment):
+        base = current if isinstance(current, (int, float)) and not isinstance(current, bool) else 0
+        return base + value.value
+
+    if isinstance(value, ArrayUnion):
+        result = list(current) if isinstance(current, list) else []
+        for item in value.values:
+            if item not in result:
+                result.append(copy.deepcopy(item))
+        return result
+
+    if isinstance(value, ArrayRemove):
+        if not isinstance(current, list):
+            return []
+        return [item for item in current if item not in value.values]
+
+    if isinstance(value, dict):
+        return {
+            key: _resolve(item, None, now)
+            for key, item in value.items()
+            if item is not DELETE_FIELD
+        }
+
+    if isinstance(value, list):
+        return [_resolve(item, None, now) for item in value]
+
+    return copy.deepcopy(value)
+
+
+def _merge(target, data, now):
+    for key, value in data.items():
+        if value is DELETE_FIELD:
+            target.pop(key, None)
+
+        elif isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value, now)
+
+        else:
+            target[key] = _resolve(value, target.get(key), now)
+
+
+def _update(target, data, now):
+    for field_path, value in data.items():
+        parts = field_path.split('.')
+        node = target
+
+        for part in parts[:-1]:
+            child = node.get(part)
+            if not isinstance(child, dict):
+                if value is DELETE_FIELD:
+                    node = None
+                    break
+                child = {}
+                node[part] = child
+            node = child
+
+        if node is None:
+            continue
+
+        if value is DELETE_FIELD:
+            node.pop(parts[-1], None)
+        else:
+            node[parts[-1]] = _resolve(value, node.get(parts[-1]), now)
+
+
+def apply_write(existing, write, now=None):
+    """
+    Aplicar una escritura a los datos actuales de un documento.
+    Devuelve los datos nuevos, o None si el documento queda borrado.
+    Los datos de entrada no se modifican.
+    """
+    now = now or utcnow()
+
+    if write.op == Write.DELETE:
+        return None
+
+    if write.op == Write.UPDATE:
+        if existing is None:
+            raise NotFoundError(f"No existe el documento {'/'.join(write.path)}")
+        data = copy.deepcopy(existing)
+        _update(data, write.data, now)
+        return data
+
+    if write.merge and existing is not None:
+        data = copy.deepcopy(existing)
+        _merge(data, write.data, now)
+        return data
+
+    return _resolve(write.data, None, now)
+
+
+# ============================================================
+# Consultas
+# ============================================================
+
+_MISSING = object()
+
+
+def get_field(data, field_path):
+    node = data
+    for part in field_path.split('.'):
+        if not isinstance(node, dict) or part not in node:
+            return _MISSING
+        node = node[part]
+    return node
+
+
+def _matches(data, field_path, op, expected):
+    value = get_field(data, field_path)
+
+    if value is _MISSING:
+        return False
+
+    try:
+        if op == '==':
+            return value == expected
+        if op == '!=':
+            return value != expected
+        if op == '<':
+            return value < expected
+        if op == '<=':
+            return value <= expected
+        if op == '>':
+            return value > expected
+        if op == '>=':
+            return value >= expected
+        if op == 'in':
+            return value in expected
+        if op == 'not-in':
+            return value not in expected
+        if op == 'array_contains':
+            return isinstance(value, list) and expected in value
+        if op == 'array_contains_any':
+            return isinstance(value, list) and any(item in value for item in expected)
+
+    except TypeError:
+        return False
+
+    raise ValueError(f"Operador de consulta no soportado: {op}")
+
+
+def run_local_query(documents, filters, orders, limit):
+    """
+    Filtrar, ordenar y limitar [(doc_id, data)] como lo haría Firestore
+    (los documentos sin el campo filtrado u ordenado quedan fuera).
+    """
+    results = [
+        (doc_id, data)
+        for doc_id, data in documents
+        if all(_matches(data, field, op, value) for field, op, value in filters)
+    ]
+
+    for field, direction in reversed(orders):
+        results = [item for item in results if get_field(item[1], field) is not _MISSING]
+        results.sort(
+            key=lambda item: get_field(item[1], field),
+            reverse=direction == Query.DESCENDING
+        )
+
+    if not orders:
+        results.sort(key=lambda item: item[0])
+
+    if limit is not None:
+        results = results[:limit]
+
+    return results
+
+
+# ============================================================
+# Snapshots y referencias
+# ============================================================
+
+class DocumentSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self._data = data
+
+    @property
+    def id(self):
+        return self.reference.id
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        if self._data is None:
+            return None
+        return copy.deepcopy(self._data)
+
+    def get(self, field_path):
+        if self._data is None:
+            return None
+        value = get_field(self._data, field_path)
+        return None if value is _MISSING else copy.deepcopy(value)
+
+
+class DocumentReference:
+    def __init__(self, repository, path):
+        self._repository = repository
+        self._path = tuple(path)
+
+    @property
+    def id(self):
+        return self._path[-1]
+
+    @property
+    def path(self):
+        return '/'.join(self._path)
+
+    @property
+    def parent(self):
+        return CollectionReference(self._repository, self._path[:-1])
+
+    def collection(self, name):
+        return CollectionReference(self._repository, self._path + (name,))
+
+    def get(self):
+        return DocumentSnapshot(self, self._repository._get(self._path))
+
+    def set(self, data, merge=False):
+        self._repository._commit([Write(Write.SET, self._path, data, merge)])
+
+    def update(self, data):
+        self._repository._commit([Write(Write.UPDATE, self._path, data)])
+
+    def delete(self):
+        self._repository._commit([Write(Write.DELETE, self._path)])
+
+    def __eq__(self, other):
+        return isinstance(other, DocumentReference) and self._path == other._path
+
+    def __hash__(self):
+        return hash(self._path)
+
+    def __repr__(self):
+        return f"<DocumentReference {self.path}>"
+
+
+class Query:
+    ASCENDING = 'ASCENDING'
+    DESCENDING = 'DESCENDING'
+
+    def __init__(self, repository, path, filters=(), orders=(), limit=None):
+        self._repository = repository
+        self._path = tuple(path)
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+
+    def _copy(self, **changes):
+        params = {
+            'filters': self._filters,
+            'orders': self._orders,
+            'limit': self._limit
+        }
+        params.update(changes)
+        return Query(self._repository, self._path, **params)
+
+    def where(self, field_path, op_string, value):
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path, direction=ASCENDING):
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def stream(self):
+        results = self._repository._query(
+            '/'.join(self._path),
+            self._filters,
+            self._orders,
+            self._limit
+        )
+
+        for doc_id, data in results:
+            reference = DocumentReference(self._repository, self._path + (doc_id,))
+            yield DocumentSnapshot(reference, data)
+
+    def get(self):
+        return list(self.stream())
+
+
+class CollectionReference(Query):
+    def __init__(self, repository, path):
+        super().__init__(repository, path)
+
+    @property
+    def id(self):
+        return self._path[-1]
+
+    def document(self, document_id=None):
+        document_id = document_id or uuid.uuid4().hex[:20]
+        return DocumentReference(self._repository, self._path + (document_id,))
+
+    def add(self, data, document_id=None):
+        """
+        Igual que Firestore: devuelve (fecha de escritura, referencia).
+        """
+        reference = self.document(document_id)
+        reference.set(data)
+        return utcnow(), reference
+
+
+class WriteBatch:
+    def __init__(self, repository):
+        self._repository = repository
+        self._writes = []
+        self._failure_callbacks = []
+
+    def __len__(self):
+        return len(self._writes)
+
+    def set(self, reference, data, merge=False):
+        self._writes.append(Write(Write.SET, reference._path, data, merge))
+        return self
+
+    def update(self, reference, data):
+        self._writes.append(Write(Write.UPDATE, reference._path, data))
+        return self
+
+    def delete(self, reference):
+        self._writes.append(Write(Write.DELETE, reference._path))
+        return self
+
+    def on_failure(self, callback):
+        """
+        callback(error) si el commit falla, para que quien agregó
+        escrituras al batch de otro sepa que no se aplicaron.
+        """
+        self._failure_callbacks.append(callback)
+        return self
+
+    def commit(self):
+        writes, self._writes = self._writes, []
+        callbacks, self._failure_callbacks = self._failure_callbacks, []
+
+        if writes:
+            try:
+                self._repository._commit(writes)
+            except Exception as e:
+                for callback in callbacks:
+                    callback(e)
+                raise
+
+        return writes
+
+
+class Transaction(WriteBatch):
+    """
+    Lecturas consistentes + escrituras que se aplican juntas al terminar
+    la función de run_transaction().
+    """
+
+    def get(self, reference_or_query):
+        if isinstance(reference_or_query, DocumentReference):
+            return reference_or_query.get()
+        return reference_or_query.stream()
+
+
+# ============================================================
+# Repositorio
+# ============================================================
+
+class Repository:
+    """
+    Clase base de los backends. Los backends locales (memoria, SQLite)
+    serializan las transacciones con un candado propio; el adaptador de
+    Firestore usa transacciones nativas.
+    """
+
+    backend = None
+
+    def __init__(self):
+        self._transaction_lock = threading.RLock()
+
+    # --- API pública (misma forma que firestore.Client) ---
+
+    def collection(self, *path):
+        return CollectionReference(self, self._join(path))
+
+    def document(self, *path):
+        return DocumentReference(self, self._join(path))
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def run_transaction(self, function):
+        """
+        Ejecuta function(transaction) y aplica sus escrituras de forma atómica.
+        Devuelve lo que devuelva function.
+        """
+        with self._transaction_lock:
+            transaction = Transaction(self)
+            result = function(transaction)
+            transaction.commit()
+            return result
+
+    def reset_after_fork(self):
+        pass
+
+    # --- Primitivas de cada backend ---
+
+    def _get(self, path):
+        raise NotImplementedError
+
+    def _query(self, collection_path, filters, orders, limit):
+        raise NotImplementedError
+
+    def _commit(self, writes):
+        raise NotImplementedError
+
+    @staticmethod
+    def _join(path):
+        parts = []
+        for segment in path:
+            parts.extend(part for part in str(segment).split('/') if part)
+        return tuple(parts)
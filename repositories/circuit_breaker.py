@@ -0,0 +1,246 @@
+"""
+Circuit breaker alrededor del repositorio de datos.
+
+Cuando Firestore anda lento o caído, cada request que lo consulta queda
+bloqueado hasta el timeout y ocupa un thread del worker. El breaker
+cuenta los fallos seguidos (errores o llamadas que superan `deadline`)
+y al llegar a `failure_threshold` abre el circuito: durante
+`reset_timeout` segundos las operaciones fallan enseguida con
+UnavailableError sin tocar la red, y los servicios responden con lo que
+tienen en memoria (ver QuizService.get_public_quiz_state, que sirve el
+último estado bueno con `stale: true`).
+
+Pasado ese tiempo se deja pasar una sola operación de prueba
+(half-open): si responde bien el circuito se cierra, si no vuelve a
+abrirse.
+
+El deadline de cada llamada lo aplica el adaptador de Firestore
+(timeout por RPC, ver FIRESTORE_DEADLINE); aquí además se cuenta como
+fallo cualquier llamada más lenta que el deadline, aunque haya
+respondido, para que un backend degradado abra el circuito igual.
+
+Solo cuentan como fallo los errores de disponibilidad (servicio caído,
+deadline, error interno, timeouts y errores de conexión, ver
+is_unavailability_error). Los errores lógicos (argumento inválido,
+precondición, contención de transacciones, excepciones de la función
+de una transacción) se propagan sin tocar el contador.
+"""
+
+import logging
+import sys
+import threading
+import time
+import weakref
+
+from repositories.base import NotFoundError, Repository, UnavailableError
+from utils.metrics import REGISTRY
+
+
+logger = logging.getLogger(__name__)
+
+_breakers = weakref.WeakSet()
+
+_TRANSIENT_API_ERRORS = ('ServiceUnavailable', 'DeadlineExceeded', 'InternalServerError', 'RetryError')
+
+
+def is_unavailability_error(error):
+    """
+    True si `error` indica que el backend no responde. Las excepciones
+    de google.api_core se reconocen solo si el módulo ya está cargado
+    (lo importa el adaptador de Firestore), para no importar gRPC con
+    los backends locales.
+    """
+    if isinstance(error, (UnavailableError, TimeoutError, ConnectionError)):
+        return True
+
+    api_exceptions = sys.modules.get('google.api_core.exceptions')
+    if api_exceptions is not None:
+        transient = tuple(
+            getattr(api_exceptions, name)
+            for name in _TRANSIENT_API_ERRORS
+            if hasattr(api_exceptions, name)
+        )
+        if transient and isinstance(error, transient):
+            return True
+
+    return False
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=10, deadline=None,
+                 clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.deadline = deadline
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.rejected = 0
+        self.trips = 0
+        self._probing = False
+
+        _breakers.add(self)
+
+    def before_call(self):
+        """
+        Autorizar una operación; UnavailableError si el circuito está
+        abierto (o ya hay una prueba en curso).
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+
+            if self.state == self.OPEN and self._clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probing = False
+
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+
+            self.rejected += 1
+
+        raise UnavailableError(f"Circuito abierto: {self.name} no está respondiendo")
+
+    def record(self, seconds, error=None):
+        """Registrar el resultado de una operación autorizada"""
+        failed = error is not None or (self.deadline is not None and seconds > self.deadline)
+
+        with self._lock:
+            self._probing = False
+
+            if not failed:
+                if self.state != self.CLOSED:
+                    logger.info("Circuito cerrado: %s volvió a responder", self.name)
+                self.state = self.CLOSED
+                self.failures = 0
+                return
+
+            self.failures += 1
+
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.failures >= self.failure_threshold
+            ):
+                if self.state == self.CLOSED:
+                    self.trips += 1
+                self.state = self.OPEN
+                self.opened_at = self._clock()
+                logger.warning(
+                    "Circuito abierto: %s (%s fallos seguidos, último: %s)",
+                    self.name,
+                    self.failures,
+                    error or f"{seconds:.2f} s"
+                )
+
+    def release(self):
+        """Terminar una operación autorizada sin contarla (error lógico)"""
+        with self._lock:
+            self._probing = False
+
+    def call(self, function, *args):
+        self.before_call()
+        started = time.perf_counter()
+
+        try:
+            result = function(*args)
+        except NotFoundError:
+            # Error lógico (update sobre un documento inexistente): el
+            # backend respondió
+            self.record(time.perf_counter() - started)
+            raise
+        except Exception as e:
+            if is_unavailability_error(e):
+                self.record(time.perf_counter() - started, error=e)
+            else:
+                self.release()
+            raise
+
+        self.record(time.perf_counter() - started)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'trips': self.trips,
+                'rejected': self.rejected
+            }
+
+
+def circuit_breaker_stats():
+    return {breaker.name: breaker.stats() for breaker in list(_breakers)}
+
+
+_STATE_VALUES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+CIRCUIT_STATE = REGISTRY.callback(
+    'olimpiadas_circuit_breaker_state',
+    'Estado del circuit breaker del repositorio (0 cerrado, 1 half-open, 2 abierto).',
+    'gauge', ('breaker',),
+    lambda: [((name,), _STATE_VALUES[stats['state']]) for name, stats in circuit_breaker_stats().items()]
+)
+CIRCUIT_REJECTED = REGISTRY.callback(
+    'olimpiadas_circuit_breaker_rejected_total',
+    'Operaciones rechazadas sin llamar al backend por circuito abierto.',
+    'counter', ('breaker',),
+    lambda: [((name,), stats['rejected']) for name, stats in circuit_breaker_stats().items()]
+)
+
+
+class CircuitBreakerRepository(Repository):
+    """
+    Repositorio que pasa cada RPC de `inner` por un CircuitBreaker.
+
+    Una transacción cuenta como una sola operación (y una sola prueba en
+    half-open): las lecturas y escrituras que hace por dentro, en el
+    mismo thread, no vuelven a pasar por el breaker.
+    """
+
+    def __init__(self, inner, breaker):
+        super().__init__()
+        self.inner = inner
+        self.breaker = breaker
+        self.backend = inner.backend
+        self._local = threading.local()
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    def reset_after_fork(self):
+        self._local = threading.local()
+        self.inner.reset_after_fork()
+
+    def _call(self, function, *args):
+        if getattr(self._local, 'in_transaction', False):
+            return function(*args)
+        return self.breaker.call(function, *args)
+
+    def _get(self, path):
+        return self._call(self.inner._get, path)
+
+    def _query(self, collection_path, filters, orders, limit):
+        return self._call(self.inner._query, collection_path, filters, orders, limit)
+
+    def _commit(self, writes):
+        return self._call(self.inner._commit, writes)
+
+    def run_transaction(self, function):
+        if getattr(self._local, 'in_transaction', False):
+            return self.inner.run_transaction(function)
+
+        def run():
+            self._local.in_transaction = True
+            try:
+                return self.inner.run_transaction(function)
+            finally:
+                self._local.in_transaction = False
+
+        return self.breaker.call(run)
@@ -0,0 +1,164 @@
+"""
+Adaptador de Firestore.
+
+Traduce las primitivas del repositorio al cliente de firebase_admin y
+los valores especiales del paquete a los de Firestore. Las
+transacciones usan transacciones nativas de Firestore.
+
+Con `deadline` cada RPC (lectura, consulta, commit) tiene ese tiempo
+máximo en segundos, reintentos incluidos; sin él se usan los timeouts y
+reintentos por defecto del cliente (hasta un minuto).
+"""
+
+from repositories.base import (
+    ArrayRemove,
+    ArrayUnion,
+    DELETE_FIELD,
+    DocumentReference,
+    DocumentSnapshot,
+    Increment,
+    NotFoundError,
+    Query,
+    Repository,
+    SERVER_TIMESTAMP,
+    Transaction,
+    Write,
+)
+from utils.lazy_import import lazy_import
+
+firestore = lazy_import('google.cloud.firestore_v1')
+api_exceptions = lazy_import('google.api_core.exceptions')
+api_retry = lazy_import('google.api_core.retry')
+
+
+class FirestoreRepository(Repository):
+    backend = 'firestore'
+
+    def __init__(self, client, deadline=None):
+        super().__init__()
+        self.client = client
+        self.deadline = deadline
+        self._call_options = {}
+
+        if deadline:
+            self._call_options = {
+                'timeout': deadline,
+                'retry': api_retry.Retry(predicate=api_retry.if_transient_error, deadline=deadline)
+            }
+
+    # ============================================================
+    # Primitivas
+    # ============================================================
+
+    def _get(self, path, transaction=None):
+        snapshot = self._ref(path).get(transaction=transaction, **self._call_options)
+        return snapshot.to_dict() if snapshot.exists else None
+
+    def _query(self, collection_path, filters, orders, limit, transaction=None):
+        query = self.client.collection(collection_path)
+
+        for field, op, value in filters:
+            query = query.where(filter=firestore.FieldFilter(field, op, value))
+
+        for field, direction in orders:
+            query = query.order_by(
+                field,
+                direction=firestore.Query.DESCENDING
+                if direction == Query.DESCENDING
+                else firestore.Query.ASCENDING
+            )
+
+        if limit is not None:
+            query = query.limit(limit)
+
+        return [
+            (doc.id, doc.to_dict())
+            for doc in query.stream(transaction=transaction, **self._call_options)
+        ]
+
+    def _commit(self, writes):
+        batch = self.client.batch()
+        self._stage(batch, writes)
+
+        try:
+            batch.commit(**self._call_options)
+        except api_exceptions.NotFound as e:
+            raise NotFoundError(str(e)) from e
+
+    def run_transaction(self, function):
+        native = self.client.transaction()
+
+        @firestore.transactional
+        def run(native_transaction):
+            transaction = _FirestoreTransaction(self, native_transaction)
+            result = function(transaction)
+            self._stage(native_transaction, transaction._writes)
+            transaction._writes = []
+            return result
+
+        return run(native)
+
+    # ============================================================
+    # Traducción
+    # ============================================================
+
+    def _ref(self, path):
+        return self.client.document('/'.join(path))
+
+    def _stage(self, target, writes):
+        for write in writes:
+            ref = self._ref(write.path)
+
+            if write.op == Write.DELETE:
+                target.delete(ref)
+            elif write.op == Write.UPDATE:
+                target.update(ref, self._translate(write.data))
+            else:
+                target.set(ref, self._translate(write.data), merge=write.merge)
+
+    def _translate(self, value):
+        if value is SERVER_TIMESTAMP:
+            return firestore.SERVER_TIMESTAMP
+        if value is DELETE_FIELD:
+            return firestore.DELETE_FIELD
+        if isinstance(value, Increment):
+            return firestore.Increment(value.value)
+        if isinstance(value, ArrayUnion):
+            return firestore.ArrayUnion(value.values)
+        if isinstance(value, ArrayRemove):
+            return firestore.ArrayRemove(value.values)
+        if isinstance(value, dict):
+            return {key: self._translate(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._translate(item) for item in value]
+        return value
+
+
+class _FirestoreTransaction(Transaction):
+    """
+    Las lecturas pasan por la transacción nativa para que Firestore
+    reintente la función si los documentos leídos cambian.
+    """
+
+    def __init__(self, repository, native):
+        super().__init__(repository)
+        self._native = native
+
+    def get(self, reference_or_query):
+        if isinstance(reference_or_query, DocumentReference):
+            data = self._repository._get(reference_or_query._path, transaction=self._native)
+            return DocumentSnapshot(reference_or_query, data)
+
+        query = reference_or_query
+        results = self._repository._query(
+            '/'.join(query._path),
+            query._filters,
+            query._orders,
+            query._limit,
+            transaction=self._native
+        )
+
+        return [
+            DocumentSnapshot(DocumentReference(self._repository, query._path + (doc_id,)), data)
+            for doc_id, data in results
+        ]
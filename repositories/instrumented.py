@@ -0,0 +1,111 @@
+"""
+Repositorio instrumentado: envuelve a otro backend y mide cada RPC.
+
+Por operación (get, query, commit, transaction) registra cantidad,
+latencia, documentos y bytes aproximados, etiquetados con el endpoint
+de Flask que la originó (utils/metrics.py). Los métodos propios del
+backend envuelto (status de modo sede, import_documents, ...) se
+delegan tal cual.
+"""
+
+import json
+import time
+
+from repositories.base import Repository, Write, split_path
+from utils.metrics import record_datastore_operation
+
+
+def _collection_label(collection_path):
+    """
+    'match_journal/abc123/entries' -> 'match_journal/*/entries'
+    """
+    parts = collection_path.split('/')
+    return '/'.join(part if index % 2 == 0 else '*' for index, part in enumerate(parts))
+
+
+def _size(data):
+    if data is None:
+        return 0
+    return len(json.dumps(data, separators=(',', ':'), default=str))
+
+
+class InstrumentedRepository(Repository):
+    def __init__(self, inner):
+        super().__init__()
+        self.inner = inner
+        self.backend = inner.backend
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    def reset_after_fork(self):
+        self.inner.reset_after_fork()
+
+    def _get(self, path):
+        started = time.perf_counter()
+        collection = _collection_label(split_path(path)[0])
+
+        try:
+            data = self.inner._get(path)
+        except Exception:
+            record_datastore_operation('get', collection, time.perf_counter() - started, error=True)
+            raise
+
+        record_datastore_operation(
+            'get',
+            collection,
+            time.perf_counter() - started,
+            documents=1 if data is not None else 0,
+            bytes_read=_size(data)
+        )
+        return data
+
+    def _query(self, collection_path, filters, orders, limit):
+        started = time.perf_counter()
+        collection = _collection_label(collection_path)
+
+        try:
+            results = self.inner._query(collection_path, filters, orders, limit)
+        except Exception:
+            record_datastore_operation('query', collection, time.perf_counter() - started, error=True)
+            raise
+
+        record_datastore_operation(
+            'query',
+            collection,
+            time.perf_counter() - started,
+            documents=len(results),
+            bytes_read=sum(_size(data) for _doc_id, data in results)
+        )
+        return results
+
+    def _commit(self, writes):
+        started = time.perf_counter()
+        collections = {_collection_label(split_path(write.path)[0]) for write in writes}
+        collection = collections.pop() if len(collections) == 1 else 'batch'
+
+        try:
+            self.inner._commit(writes)
+        except Exception:
+            record_datastore_operation('commit', collection, time.perf_counter() - started, error=True)
+            raise
+
+        record_datastore_operation(
+            'commit',
+            collection,
+            time.perf_counter() - started,
+            documents=len(writes),
+            bytes_written=sum(_size(write.data) for write in writes if write.op != Write.DELETE)
+        )
+
+    def run_transaction(self, function):
+        started = time.perf_counter()
+
+        try:
+            result = self.inner.run_transaction(function)
+        except Exception:
+            record_datastore_operation('transaction', 'transaction', time.perf_counter() - started, error=True)
+            raise
+
+        record_datastore_operation('transaction', 'transaction', time.perf_counter() - started)
+        return result
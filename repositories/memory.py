@@ -0,0 +1,74 @@
+"""
+Backend en memoria: un diccionario por proceso.
+
+Pensado para pruebas locales y benchmarks: no necesita credenciales ni
+red. Cada worker de gunicorn tiene su propia copia de los datos, así que
+en producción con varios workers se debe usar SQLite o Firestore.
+
+Los documentos guardados nunca se modifican en sitio (apply_write
+devuelve datos nuevos) y DocumentSnapshot copia al leer, así que las
+lecturas no necesitan copiar.
+"""
+
+import copy
+
+from repositories.base import Repository, apply_write, run_local_query, split_path, utcnow
+
+
+class MemoryRepository(Repository):
+    backend = 'memory'
+
+    def __init__(self, data=None):
+        super().__init__()
+        # {'ruta/de/coleccion': {doc_id: datos}}
+        self._collections = {}
+
+        for collection_path, documents in (data or {}).items():
+            for doc_id, document in documents.items():
+                self.collection(collection_path).document(doc_id).set(document)
+
+    def _get(self, path):
+        collection_path, doc_id = split_path(path)
+
+        with self._transaction_lock:
+            return self._collections.get(collection_path, {}).get(doc_id)
+
+    def _query(self, collection_path, filters, orders, limit):
+        with self._transaction_lock:
+            documents = list(self._collections.get(collection_path, {}).items())
+
+        return run_local_query(documents, filters, orders, limit)
+
+    def _commit(self, writes):
+        now = utcnow()
+
+        with self._transaction_lock:
+            # Calcular todo antes de modificar para que el batch sea atómico
+            pending = {}
+
+            for write in writes:
+                key = split_path(write.path)
+
+                if key in pending:
+                    existing = pending[key]
+                else:
+                    existing = self._collections.get(key[0], {}).get(key[1])
+
+                pending[key] = apply_write(existing, write, now)
+
+            for (collection_path, doc_id), data in pending.items():
+                if data is None:
+                    self._collections.get(collection_path, {}).pop(doc_id, None)
+                else:
+                    self._collections.setdefault(collection_path, {})[doc_id] = data
+
+    def clear(self):
+        with self._transaction_lock:
+            self._collections.clear()
+
+    def dump(self):
+        """
+        Copia de todos los datos: {'ruta/de/coleccion': {doc_id: datos}}.
+        """
+        with self._transaction_lock:
+            return copy.deepcopy(self._collections)
@@ -0,0 +1,181 @@
+"""
+Backend SQLite (instance/database.db por defecto).
+
+Todos los documentos viven en una tabla (colección, id, JSON). Sirve
+para correr torneos completos sin red y lo comparten los workers de
+gunicorn de una misma máquina (WAL + BEGIN IMMEDIATE en cada commit).
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+from repositories.base import Repository, Transaction, apply_write, run_local_query, split_path, utcnow
+
+
+_PUSHDOWN_FIELD = re.compile(r'^[A-Za-z0-9_]+(\.[A-Za-z0-9_]+)*$')
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def _decode(obj):
+    if len(obj) == 1 and '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    return obj
+
+
+class SQLiteRepository(Repository):
+    backend = 'sqlite'
+    TABLE = 'repository_documents'
+
+    def __init__(self, db_path):
+        super().__init__()
+        self.db_path = db_path
+        self._local = threading.local()
+        self._ensure_schema()
+
+    def reset_after_fork(self):
+        self._local = threading.local()
+        self._transaction_lock = threading.RLock()
+
+    # ============================================================
+    # Primitivas
+    # ============================================================
+
+    def _get(self, path):
+        collection_path, doc_id = split_path(path)
+        row = self._connect().execute(
+            f"SELECT data FROM {self.TABLE} WHERE collection = ? AND doc_id = ?",
+            (collection_path, doc_id)
+        ).fetchone()
+
+        return self._loads(row[0]) if row else None
+
+    def _query(self, collection_path, filters, orders, limit):
+        sql = f"SELECT doc_id, data FROM {self.TABLE} WHERE collection = ?"
+        params = [collection_path]
+
+        # Prefiltrar igualdades simples en SQLite; el filtro completo se
+        # aplica después igual que en los demás backends.
+        for field, op, value in filters:
+            if (
+                op == '=='
+                and isinstance(value, (str, int, float, bool))
+                and _PUSHDOWN_FIELD.match(field)
+            ):
+                sql += " AND json_extract(data, ?) = ?"
+                params.extend([f"$.{field}", value])
+
+        rows = self._connect().execute(sql, params).fetchall()
+        documents = [(doc_id, self._loads(data)) for doc_id, data in rows]
+
+        return run_local_query(documents, filters, orders, limit)
+
+    def _commit(self, writes):
+        conn = self._connect()
+
+        with self._transaction_lock:
+            if conn.in_transaction:
+                self._apply(conn, writes)
+                return
+
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._apply(conn, writes)
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+    def run_transaction(self, function):
+        """
+        La transacción mantiene BEGIN IMMEDIATE durante toda la función,
+        así las lecturas quedan protegidas también frente a otros workers.
+        """
+        conn = self._connect()
+
+        with self._transaction_lock:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                transaction = Transaction(self)
+                result = function(transaction)
+                transaction.commit()
+                conn.execute('COMMIT')
+                return result
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+    # ============================================================
+    # Helpers internos
+    # ============================================================
+
+    def _apply(self, conn, writes):
+        now = utcnow()
+        pending = {}
+
+        for write in writes:
+            key = split_path(write.path)
+
+            if key in pending:
+                existing = pending[key]
+            else:
+                existing = self._get(write.path)
+
+            pending[key] = apply_write(existing, write, now)
+
+        for (collection_path, doc_id), data in pending.items():
+            if data is None:
+                conn.execute(
+                    f"DELETE FROM {self.TABLE} WHERE collection = ? AND doc_id = ?",
+                    (collection_path, doc_id)
+                )
+            else:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.TABLE} (collection, doc_id, data, updated_at) "
+                    f"VALUES (?, ?, ?, ?)",
+                    (collection_path, doc_id, self._dumps(data), now.timestamp())
+                )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+
+        if conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=5,
+                isolation_level=None,
+                check_same_thread=False
+            )
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+
+        return conn
+
+    def _ensure_schema(self):
+        self._connect().execute(
+            f"CREATE TABLE IF NOT EXISTS {self.TABLE} ("
+            f"collection TEXT NOT NULL, "
+            f"doc_id TEXT NOT NULL, "
+            f"data TEXT NOT NULL, "
+            f"updated_at REAL NOT NULL, "
+            f"PRIMARY KEY (collection, doc_id))"
+        )
+
+    def _dumps(self, data):
+        return json.dumps(data, separators=(',', ':'), default=_encode)
+
+    def _loads(self, raw):
+        return json.loads(raw, object_hook=_decode)
@@ -0,0 +1,377 @@
+"""
+Modo sede (DATA_BACKEND=venue): SQLite primario + réplica diferida a Firestore.
+
+Durante el evento todas las lecturas y escrituras (enfrentamientos,
+puntajes, estado público) van a instance/database.db, así que las
+pantallas de la red local no dependen del Wi-Fi de la sede.
+
+Cada commit local marca como pendientes, en la misma transacción de
+SQLite, las rutas de documento que tocó (tabla repository_outbox). Un
+hilo de fondo las replica a Firestore:
+- se envía el documento completo tal como está en SQLite (o un borrado),
+  así que reenviar es idempotente y varias escrituras sobre el mismo
+  documento se agrupan en una sola
+- una ruta solo sale de la cola si su versión no cambió mientras se
+  enviaba
+- si Firestore no responde se reintenta con espera exponencial
+- entre workers de gunicorn solo replica el que tiene la concesión
+  (repository_sync_lease), para no enviar versiones viejas fuera de orden
+
+Antes del evento: `flask venue-pull` copia a SQLite los datos de
+Firestore (equipos, preguntas, brackets, ...). Al final:
+`flask venue-push` vacía la cola y `flask venue-status` la muestra.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from repositories.base import Write
+from repositories.sqlite import SQLiteRepository
+
+
+logger = logging.getLogger(__name__)
+
+
+class VenueRepository(SQLiteRepository):
+    backend = 'venue'
+    OUTBOX_TABLE = 'repository_outbox'
+    LEASE_TABLE = 'repository_sync_lease'
+    LEASE_NAME = 'firestore'
+    LEASE_SECONDS = 15
+    FIRESTORE_BATCH_LIMIT = 500
+    MAX_BACKOFF = 30
+
+    def __init__(self, db_path, remote_factory=None, sync_interval=2.0, batch_size=200):
+        self.remote_factory = remote_factory
+        self.sync_interval = sync_interval
+        self.batch_size = min(batch_size, self.FIRESTORE_BATCH_LIMIT)
+        self._remote = None
+        self._sync_thread = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._owner = f"{os.getpid()}:{id(self)}"
+        self.last_sync_at = None
+        self.last_error = None
+
+        super().__init__(db_path)
+
+    def reset_after_fork(self):
+        super().reset_after_fork()
+        self._remote = None
+        self._sync_thread = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._owner = f"{os.getpid()}:{id(self)}"
+
+    # ============================================================
+    # Escrituras locales + cola
+    # ============================================================
+
+    def _apply(self, conn, writes):
+        super()._apply(conn, writes)
+
+        now = time.time()
+        for path in {'/'.join(write.path) for write in writes}:
+            conn.execute(
+                f"INSERT INTO {self.OUTBOX_TABLE} (path, version, queued_at, attempts) "
+                f"VALUES (?, 1, ?, 0) "
+                f"ON CONFLICT(path) DO UPDATE SET version = version + 1, queued_at = excluded.queued_at",
+                (path, now)
+            )
+
+    def _commit(self, writes):
+        super()._commit(writes)
+        self._wake_sync()
+
+    def run_transaction(self, function):
+        result = super().run_transaction(function)
+        self._wake_sync()
+        return result
+
+    def import_documents(self, collection_path, documents):
+        """
+        Guardar documentos traídos de Firestore sin encolarlos de vuelta.
+        documents: [(doc_id, datos)]
+        """
+        conn = self._connect()
+        writes = [
+            Write(Write.SET, tuple(collection_path.split('/')) + (doc_id,), data)
+            for doc_id, data in documents
+        ]
+
+        with self._transaction_lock:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                SQLiteRepository._apply(self, conn, writes)
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+        return len(writes)
+
+    # ============================================================
+    # Réplica a Firestore
+    # ============================================================
+
+    @property
+    def remote(self):
+        if self._remote is None:
+            if self.remote_factory is None:
+                raise RuntimeError("Modo sede sin Firestore configurado")
+            self._remote = self.remote_factory()
+        return self._remote
+
+    def pending_count(self):
+        row = self._connect().execute(f"SELECT COUNT(*) FROM {self.OUTBOX_TABLE}").fetchone()
+        return row[0]
+
+    def status(self):
+        row = self._connect().execute(
+            f"SELECT COUNT(*), MIN(queued_at), MAX(attempts) FROM {self.OUTBOX_TABLE}"
+        ).fetchone()
+        lease = self._connect().execute(
+            f"SELECT owner, expires_at FROM {self.LEASE_TABLE} WHERE name = ?",
+            (self.LEASE_NAME,)
+        ).fetchone()
+
+        return {
+            'pending': row[0],
+            'oldest_pending_age': round(time.time() - row[1], 1) if row[1] else None,
+            'max_attempts': row[2] or 0,
+            'lease_owner': lease[0] if lease and lease[1] > time.time() else None,
+            'last_sync_at': self.last_sync_at,
+            'last_error': self.last_error
+        }
+
+    def sync_once(self):
+        """
+        Enviar a Firestore un lote de la cola.
+        Devuelve cuántas rutas se replicaron.
+        """
+        conn = self._connect()
+        rows = conn.execute(
+            f"SELECT path, version FROM {self.OUTBOX_TABLE} ORDER BY queued_at LIMIT ?",
+            (self.batch_size,)
+        ).fetchall()
+
+        if not rows:
+            return 0
+
+        writes = []
+        for path, _version in rows:
+            parts = tuple(path.split('/'))
+            data = self._get(parts)
+
+            if data is None:
+                writes.append(Write(Write.DELETE, parts))
+            else:
+                writes.append(Write(Write.SET, parts, data))
+
+        try:
+            self.remote._commit(writes)
+
+        except Exception as e:
+            self.last_error = str(e)
+
+            try:
+                self._write_outbox(
+                    f"UPDATE {self.OUTBOX_TABLE} SET attempts = attempts + 1, last_error = ? "
+                    f"WHERE path IN ({', '.join('?' for _ in rows)})",
+                    [[str(e)[:500]] + [path for path, _version in rows]]
+                )
+            except Exception as bookkeeping_error:
+                logger.warning("No se pudo registrar el intento fallido en la cola: %s", bookkeeping_error)
+
+            raise
+
+        # Solo salen las rutas cuya versión no cambió mientras se enviaban
+        self._write_outbox(
+            f"DELETE FROM {self.OUTBOX_TABLE} WHERE path = ? AND version = ?",
+            rows
+        )
+
+        self.last_sync_at = time.time()
+        self.last_error = None
+        return len(rows)
+
+    def _write_outbox(self, statement, parameters):
+        """
+        Escribir en la cola con el mismo lock y BEGIN IMMEDIATE que los
+        commits locales (comparten la conexión del thread).
+        """
+        conn = self._connect()
+
+        with self._transaction_lock:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany(statement, parameters)
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+    def flush(self, timeout=None):
+        """
+        Replicar toda la cola ahora (venue-push, fin del evento).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        total = 0
+
+        while deadline is None or time.monotonic() < deadline:
+            sent = self.sync_once()
+            if not sent:
+                break
+            total += sent
+
+        return total
+
+    def start_sync(self):
+        if self.remote_factory is None:
+            return None
+
+        if self._sync_thread is None or not self._sync_thread.is_alive():
+            with self._transaction_lock:
+                if self._sync_thread is None or not self._sync_thread.is_alive():
+                    self._sync_thread = threading.Thread(
+                        target=self._sync_loop,
+                        name='venue-sync',
+                        daemon=True
+                    )
+                    self._sync_thread.start()
+
+        return self._sync_thread
+
+    def stop_sync(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _wake_sync(self):
+        self.start_sync()
+        self._wake.set()
+
+    def _sync_loop(self):
+        failures = 0
+
+        while not self._stop.is_set():
+            if failures:
+                # Durante la espera exponencial las escrituras nuevas no
+                # adelantan el reintento
+                self._stop.wait(min(self.sync_interval * 2 ** min(failures, 10), self.MAX_BACKOFF))
+            else:
+                self._wake.wait(self.sync_interval)
+            self._wake.clear()
+
+            if self._stop.is_set():
+                break
+
+            try:
+                if not self.pending_count():
+                    continue
+
+                if not self._acquire_lease():
+                    self._stop.wait(self.LEASE_SECONDS / 3)
+                    continue
+
+                while self.sync_once() and self._acquire_lease():
+                    pass
+
+                failures = 0
+
+            except Exception as e:
+                failures += 1
+                logger.warning("Error replicando a Firestore (intento %s, se reintentará): %s", failures, e)
+
+    def _acquire_lease(self):
+        conn = self._connect()
+        now = time.time()
+
+        with self._transaction_lock:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute(
+                    f"SELECT owner, expires_at FROM {self.LEASE_TABLE} WHERE name = ?",
+                    (self.LEASE_NAME,)
+                ).fetchone()
+
+                if row and row[0] != self._owner and row[1] > now:
+                    conn.execute('COMMIT')
+                    return False
+
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.LEASE_TABLE} (name, owner, expires_at) "
+                    f"VALUES (?, ?, ?)",
+                    (self.LEASE_NAME, self._owner, now + self.LEASE_SECONDS)
+                )
+                conn.execute('COMMIT')
+                return True
+
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+    def _ensure_schema(self):
+        super()._ensure_schema()
+
+        conn = self._connect()
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.OUTBOX_TABLE} ("
+            f"path TEXT PRIMARY KEY, "
+            f"version INTEGER NOT NULL, "
+            f"queued_at REAL NOT NULL, "
+            f"attempts INTEGER NOT NULL DEFAULT 0, "
+            f"last_error TEXT)"
+        )
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.LEASE_TABLE} ("
+            f"name TEXT PRIMARY KEY, "
+            f"owner TEXT NOT NULL, "
+            f"expires_at REAL NOT NULL)"
+        )
+
+
+# ============================================================
+# Comandos de consola
+# ============================================================
+
+def register_commands(app):
+    """
+    flask venue-pull | venue-push | venue-status
+    """
+    import click
+
+    def get_venue_repository():
+        from services.container import get_container
+
+        if app.config.get('DATA_BACKEND') != 'venue':
+            raise click.ClickException("Estos comandos requieren DATA_BACKEND=venue")
+
+        return get_container().db
+
+    @app.cli.command('venue-pull')
+    def venue_pull():
+        """Copiar a SQLite los datos de Firestore antes del evento."""
+        repository = get_venue_repository()
+
+        for collection_path in app.config['VENUE_PULL_COLLECTIONS']:
+            documents = [
+                (doc.id, doc.to_dict())
+                for doc in repository.remote.collection(collection_path).stream()
+            ]
+            count = repository.import_documents(collection_path, documents)
+            click.echo(f"{collection_path}: {count} documentos")
+
+    @app.cli.command('venue-push')
+    def venue_push():
+        """Replicar a Firestore todo lo pendiente."""
+        repository = get_venue_repository()
+        sent = repository.flush()
+        click.echo(f"Replicados: {sent}. Pendientes: {repository.pending_count()}")
+
+    @app.cli.command('venue-status')
+    def venue_status():
+        """Estado de la cola de réplica."""
+        for key, value in get_venue_repository().status().items():
+            click.echo(f"{key}: {value}")
@@ -1,8 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from flask_login import login_required
-from firebase_admin import firestore
 
-from services.team_service import TeamService
+from services.container import get_container
 from utils.decorators import handle_errors
 
 bracket_bp = Blueprint('bracket', __name__, url_prefix='/brackets')
@@ -16,8 +15,7 @@ def manage_brackets():
     Seleccionar 8 equipos para generar el bracket.
     Actualmente maneja Nivel I y Nivel II.
     """
-    db = firestore.client()
-    team_service = TeamService(db)
+    team_service = get_container().team_service
 
     if request.method == 'POST':
         level = request.form.get('level')  # nivel1 o nivel2
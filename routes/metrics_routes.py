@@ -0,0 +1,33 @@
+import hmac
+
+from flask import Blueprint, Response, abort, current_app, request
+from flask_login import current_user
+
+from utils.metrics import REGISTRY
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+def _authorized():
+    if current_user.is_authenticated:
+        return True
+
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token:
+        return False
+
+    provided = request.args.get('token') or request.headers.get('Authorization', '').removeprefix('Bearer ')
+    return hmac.compare_digest(provided.encode('utf-8'), token.encode('utf-8'))
+
+
+@metrics_bp.route('/metrics')
+def metrics():
+    """
+    Métricas en formato Prometheus, solo para el admin con sesión o con
+    METRICS_TOKEN (Bearer token o ?token=). Sin token configurado el
+    scraper no tiene acceso: 404 para todo el que no sea admin.
+    """
+    if not _authorized():
+        abort(404)
+
+    return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
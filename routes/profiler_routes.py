@@ -0,0 +1,84 @@
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, send_from_directory, abort
+from flask_login import login_required
+
+from utils.decorators import handle_errors
+from utils.profiler import PROFILE_EXTENSIONS, get_settings_store, list_profiles
+
+profiler_bp = Blueprint('profiler', __name__, url_prefix='/admin/profiler')
+
+
+# Pantallas admin (GET) que se pueden abrir ya perfiladas con un clic.
+# En assign_point el formulario hereda ?_profile=1: se perfila el POST,
+# que es donde se asignan los puntos
+QUICK_PROFILE_ENDPOINTS = [
+    ('quiz.quiz_question', 'Pregunta actual'),
+    ('quiz.assign_point', 'Asignar puntos (envío)'),
+    ('quiz.select_level', 'Seleccionar nivel'),
+    ('quiz.scoreboard', 'Scoreboard'),
+    ('quiz.versus', 'Hub de pantallas'),
+]
+
+
+@profiler_bp.route('', methods=['GET', 'POST'])
+@login_required
+@handle_errors
+def profiler():
+    settings_store = get_settings_store()
+
+    if request.method == 'POST':
+        action = request.form.get('action')
+
+        if action == 'stop':
+            settings_store.clear()
+            flash('Muestreo de perfiles detenido', 'success')
+            return redirect(url_for('profiler.profiler'))
+
+        try:
+            rate = float(request.form.get('rate', '0'))
+            minutes = int(request.form.get('minutes', '10'))
+        except ValueError:
+            flash('Porcentaje o duración no válidos', 'error')
+            return redirect(url_for('profiler.profiler'))
+
+        endpoint = request.form.get('endpoint') or None
+        if endpoint and endpoint not in current_app.view_functions:
+            flash('Endpoint no válido', 'error')
+            return redirect(url_for('profiler.profiler'))
+
+        minutes = max(1, min(minutes, 120))
+        settings = settings_store.save(rate=rate, endpoint=endpoint, minutes=minutes)
+        flash(f"Perfilando {settings['rate']:g}% de {endpoint or 'todos los endpoints'} durante {minutes} min", 'success')
+        return redirect(url_for('profiler.profiler'))
+
+    endpoints = sorted(
+        endpoint for endpoint in current_app.view_functions
+        if endpoint != 'static' and not endpoint.startswith('profiler.')
+    )
+
+    quick_links = [
+        (label, url_for(endpoint, _profile=1))
+        for endpoint, label in QUICK_PROFILE_ENDPOINTS
+        if endpoint in current_app.view_functions
+    ]
+
+    return render_template(
+        'profiler.html',
+        settings=settings_store.active(),
+        endpoints=endpoints,
+        quick_links=quick_links,
+        profiles=list_profiles()
+    )
+
+
+@profiler_bp.route('/files/<path:filename>')
+@login_required
+def profile_file(filename):
+    if not filename.endswith(PROFILE_EXTENSIONS):
+        abort(404)
+
+    return send_from_directory(
+        current_app.config['PROFILER_DIR'],
+        filename,
+        mimetype='text/plain' if not filename.endswith('.prof') else None,
+        as_attachment=filename.endswith('.prof')
+    )
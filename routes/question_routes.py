@@ -1,12 +1,14 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required
 from utils.decorators import handle_errors
-from services.question_service import QuestionService
-from firebase_admin import storage
+from services.container import get_container
+from utils.lazy_import import lazy_import
 from werkzeug.utils import secure_filename
 import os
 import uuid
 
+storage = lazy_import('firebase_admin.storage')
+
 question_bp = Blueprint('question', __name__, url_prefix='/questions')
 
 
@@ -14,7 +16,7 @@ ALLOWED_IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp'}
 
 
 def get_question_service():
-    return QuestionService()
+    return get_container().question_service
 
 
 def is_allowed_image(filename):
@@ -1,16 +1,21 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required
+from services.container import get_container
 from services.quiz_service import QuizService
-from services.team_service import TeamService
-from firebase_admin import firestore
+from services.state_feed import state_version
 from utils.decorators import handle_errors
+from utils.page_cache import render_cached
+from utils.rate_limit import set_client_cookie, signed_client_id
+import time
 
 quiz_bp = Blueprint('quiz', __name__, url_prefix='/quiz')
 
+QUESTION_CONTENT_MAX_AGE = 365 * 24 * 3600
+
 
 def get_services():
-    db = firestore.client()
-    return QuizService(), TeamService(db)
+    container = get_container()
+    return container.quiz_service, container.team_service
 
 
 def sort_teams_for_scoreboard(teams):
@@ -37,6 +42,13 @@ def normalize_public_level(level_slug):
     return mapping.get(str(level_slug).strip().lower())
 
 
+def normalize_public_room(room):
+    """
+    Normaliza la sala pública de la URL. Sin sala se usa la sala principal.
+    """
+    return QuizService.normalize_room(room)
+
+
 def get_public_level_label(level_slug):
     labels = {
         'nivel1': 'Nivel I',
@@ -72,6 +84,8 @@ def select_level():
         team2 = request.form.get('team2')
         level = request.form.get('level')
         round_type = request.form.get('round', 'octavos')
+        room = request.form.get('room') or None
+        audience_voting = request.form.get('audience_voting') == '1'
 
         if not team1 or not team2 or not level:
             flash('Debes seleccionar ambos equipos y un nivel', 'error')
@@ -85,7 +99,9 @@ def select_level():
             level=level,
             team1=team1,
             team2=team2,
-            round_type=round_type
+            round_type=round_type,
+            room=room,
+            audience_voting=audience_voting
         )
 
         if not success:
@@ -103,10 +119,29 @@ def select_level():
         'select_level.html',
         teams_n1=teams_n1,
         teams_n2=teams_n2,
-        teams_n3=teams_n3
+        teams_n3=teams_n3,
+        resumable_matches=quiz_service.get_resumable_matches()
     )
 
 
+@quiz_bp.route('/resume-match', methods=['POST'])
+@login_required
+@handle_errors
+def resume_match():
+    """
+    Reanuda un enfrentamiento en curso (reinicio del worker o cookie perdida).
+    """
+    quiz_service, _ = get_services()
+
+    success, message = quiz_service.resume_match(request.form.get('match_id'))
+    flash(message, 'success' if success else 'error')
+
+    if not success:
+        return redirect(url_for('quiz.select_level'))
+
+    return redirect(url_for('quiz.quiz_question'))
+
+
 @quiz_bp.route('/reset-question-tracking', methods=['POST'])
 @login_required
 @handle_errors
@@ -134,14 +169,15 @@ def countdown():
     El countdown bonito se ve en /quiz/versus/<nivel>.
     """
     quiz_service, _ = get_services()
+    match = quiz_service.get_active_match()
 
-    if 'quiz_teams' not in session or 'quiz_level' not in session:
+    if not match:
         flash('Debes seleccionar equipos y nivel primero', 'error')
         return redirect(url_for('quiz.select_level'))
 
-    teams = session.get('quiz_teams', ['Equipo 1', 'Equipo 2'])
-    level = session.get('quiz_level', 'Nivel I')
-    round_type = session.get('quiz_round', 'octavos')
+    teams = match.get('teams', ['Equipo 1', 'Equipo 2'])
+    level = match.get('level', 'Nivel I')
+    round_type = match.get('round', 'octavos')
 
     quiz_service.start_countdown(duration=12)
 
@@ -153,17 +189,59 @@ def countdown():
     )
 
 
+@quiz_bp.route('/prepare-selection', methods=['POST'])
+@login_required
+@handle_errors
+def prepare_selection():
+    """
+    Precarga de select_level: se llama al elegir nivel, ronda o equipos.
+    """
+    quiz_service, _ = get_services()
+
+    success, message = quiz_service.prepare_selection(
+        level=request.form.get('level'),
+        round_type=request.form.get('round', 'octavos'),
+        teams=[request.form.get('team1'), request.form.get('team2')],
+        room=request.form.get('room') or None
+    )
+
+    return jsonify({
+        'success': success,
+        'message': message
+    })
+
+
+@quiz_bp.route('/prepare-match', methods=['POST'])
+@login_required
+@handle_errors
+def prepare_match():
+    """
+    Precarga del enfrentamiento activo durante el countdown. Devuelve las
+    imágenes de las preguntas para que el navegador las pida de antemano.
+    """
+    quiz_service, _ = get_services()
+
+    success, message, images = quiz_service.prepare_match()
+
+    return jsonify({
+        'success': success,
+        'message': message,
+        'images': images
+    })
+
+
 @quiz_bp.route('/quiz')
 @login_required
 @handle_errors
 def quiz_question():
     quiz_service, _ = get_services()
+    match = quiz_service.get_active_match()
 
-    if 'quiz_question_ids' not in session:
+    if not match:
         flash('Debes iniciar un enfrentamiento primero', 'error')
         return redirect(url_for('quiz.select_level'))
 
-    if quiz_service.is_quiz_finished():
+    if quiz_service.is_quiz_finished(match):
         return redirect(url_for('quiz.quiz_finished'))
 
     question = quiz_service.get_current_question()
@@ -171,14 +249,12 @@ def quiz_question():
         flash('Error al cargar la pregunta actual', 'error')
         return redirect(url_for('quiz.dashboard'))
 
-    current_index = session.get('current_question_index', 0)
-    total_questions = len(session.get('quiz_question_ids', []))
-    teams = session.get('quiz_teams', [])
-    scores = session.get('quiz_scores', {})
+    current_index = match.get('current_question_index', 0)
+    total_questions = len(match.get('question_ids', []))
+    teams = match.get('teams', [])
+    scores = match.get('scores', {})
 
-    public_state = quiz_service.get_public_quiz_state(
-        level=session.get('quiz_firestore_level')
-    )
+    public_state = quiz_service.get_match_public_state(match)
     public_question = public_state.get('question') or {}
 
     public_selected_answer = public_question.get('selected_answer')
@@ -193,6 +269,11 @@ def quiz_question():
 
     return render_template(
         'quiz.html',
+        public_state_url=url_for(
+            'quiz.versus_level_state',
+            level_slug=match.get('firestore_level'),
+            room=match.get('room')
+        ),
         question=question,
         question_number=current_index + 1,
         current_index=current_index,
@@ -204,7 +285,8 @@ def quiz_question():
         argument_validation_required=argument_validation_required,
         show_correct_answer=show_correct_answer,
         validated_team_name=validated_team_name,
-        question_timer=question_timer
+        question_timer=question_timer,
+        public_status=public_state.get('status') or 'in_progress'
     )
 
 
@@ -217,14 +299,13 @@ def assign_point():
     cuando la respuesta pública ya fue validada automáticamente como correcta.
     """
     quiz_service, _ = get_services()
+    match = quiz_service.get_active_match()
 
-    if 'quiz_question_ids' not in session:
+    if not match:
         flash('Debes iniciar un enfrentamiento primero', 'error')
         return redirect(url_for('quiz.select_level'))
 
-    public_state = quiz_service.get_public_quiz_state(
-        level=session.get('quiz_firestore_level')
-    )
+    public_state = quiz_service.get_match_public_state(match)
     public_question = public_state.get('question') or {}
 
     if public_question.get('admin_validation_result') != 'correct':
@@ -252,7 +333,8 @@ def assign_point():
 
         success, message = quiz_service.resolve_correct_answer_assignment(
             team_name=team_name,
-            argument_valid=argument_valid
+            argument_valid=argument_valid,
+            public_state=public_state
         )
 
         flash(message, 'success' if success else 'error')
@@ -263,10 +345,10 @@ def assign_point():
         flash('No se pudo cargar la pregunta actual', 'error')
         return redirect(url_for('quiz.quiz_question'))
 
-    current_index = session.get('current_question_index', 0)
-    total_questions = len(session.get('quiz_question_ids', []))
-    teams = session.get('quiz_teams', [])
-    scores = session.get('quiz_scores', {})
+    current_index = match.get('current_question_index', 0)
+    total_questions = len(match.get('question_ids', []))
+    teams = match.get('teams', [])
+    scores = match.get('scores', {})
     public_selected_answer = public_question.get('selected_answer')
     question_timer = public_state.get('question_timer') or {}
 
@@ -291,117 +373,219 @@ def assign_point():
 def versus():
     """
     Pantalla pública general.
-    Muestra un panel con los enfrentamientos activos por nivel.
+    Muestra un panel con las salas activas de cada nivel.
     """
     quiz_service, _ = get_services()
-    all_states = quiz_service.get_all_public_quiz_states()
+    live_rooms = build_live_room_summaries(quiz_service.get_live_rooms())
 
     cards = []
 
     for level_key in ['nivel1', 'nivel2', 'nivel3']:
-        state = all_states.get(level_key) or {}
-        status = state.get('status', 'idle')
-        teams = state.get('teams', []) or []
+        rooms = live_rooms.get(level_key, [])
 
         cards.append({
             'level_key': level_key,
             'level_label': get_public_level_label(level_key),
-            'status': status,
-            'teams': teams,
-            'has_active_match': status not in (None, '', 'idle'),
-            'url': url_for('quiz.versus_level', level_slug=level_key)
+            'rooms': rooms,
+            'has_active_match': len(rooms) > 0
         })
 
-    return render_template(
+    return render_cached(
         'versus_hub.html',
+        'hub',
+        state_version(cards),
         cards=cards
     )
 
 
+def build_live_room_summaries(live_rooms):
+    """
+    Resumen ligero de cada sala activa para el hub público.
+    """
+    summaries = {}
+
+    for level_key, states in live_rooms.items():
+        summaries[level_key] = [
+            {
+                'room': state.get('room') or QuizService.DEFAULT_ROOM,
+                'status': state.get('status', 'idle'),
+                'teams': state.get('teams', []) or [],
+                'round': state.get('round'),
+                'url': url_for(
+                    'quiz.versus_level',
+                    level_slug=level_key,
+                    room=state.get('room') or QuizService.DEFAULT_ROOM
+                )
+            }
+            for state in states
+        ]
+
+    return summaries
+
+
 @quiz_bp.route('/versus/state')
 @handle_errors
 def versus_state():
     """
-    Estado general de todos los niveles.
-    Lo usa versus_hub.html.
+    Salas activas de todos los niveles.
+    Lo usa versus_hub.html; poll_after_ms es el intervalo de consulta
+    recomendado y server_time la hora del servidor. stale: true si el
+    repositorio no respondió y es la última lista conocida.
     """
     quiz_service, _ = get_services()
-    return jsonify(quiz_service.get_all_public_quiz_states())
+    live_rooms = quiz_service.get_live_rooms()
+    summaries = build_live_room_summaries(live_rooms)
 
+    has_rooms = any(summaries.values())
+    stale = any(state.get('stale') for states in live_rooms.values() for state in states)
 
-@quiz_bp.route('/versus/<level_slug>')
+    if stale:
+        poll_ms = QuizService.POLL_STALE_MS
+    else:
+        poll_ms = QuizService.POLL_ACTIVE_MS if has_rooms else QuizService.POLL_IDLE_MS
+
+    summaries['poll_after_ms'] = quiz_service.jitter_poll_ms(poll_ms)
+    summaries['server_time'] = time.time()
+    if stale:
+        summaries['stale'] = True
+    return jsonify(summaries)
+
+
+@quiz_bp.route('/versus/<level_slug>', defaults={'room': None})
+@quiz_bp.route('/versus/<level_slug>/<room>')
 @handle_errors
-def versus_level(level_slug):
+def versus_level(level_slug, room):
     """
-    Pantalla pública específica por nivel.
+    Pantalla pública específica por nivel y sala.
     """
     quiz_service, _ = get_services()
 
     normalized_level = normalize_public_level(level_slug)
-    if not normalized_level:
-        flash('Nivel público no válido.', 'error')
+    normalized_room = normalize_public_room(room)
+    if not normalized_level or not normalized_room:
+        flash('Nivel o sala pública no válidos.', 'error')
         return redirect(url_for('quiz.versus'))
 
-    public_state = quiz_service.get_public_quiz_state(level=normalized_level)
+    public_state = quiz_service.get_public_quiz_state(
+        level=normalized_level,
+        room=normalized_room
+    )
     status = public_state.get('status') if public_state else 'idle'
     has_active_match = bool(public_state) and status not in (None, '', 'idle')
 
     if status == 'countdown':
-        return render_template(
-            'contador_versus.html',
-            match_state=public_state,
-            has_active_match=has_active_match,
-            level_slug=normalized_level
-        )
-
-    return render_template(
-        'versus.html',
-        match_state=public_state,
+        template = 'contador_versus.html'
+        match_state = public_state
+    else:
+        template = 'versus.html'
+        match_state = quiz_service.with_question_content(public_state)
+
+    # La página depende solo del estado de la sala: misma versión, mismo HTML
+    return render_cached(
+        template,
+        (normalized_level, normalized_room),
+        state_version(match_state),
+        match_state=match_state,
         has_active_match=has_active_match,
-        level_slug=normalized_level
+        level_slug=normalized_level,
+        room=normalized_room
     )
 
 
-@quiz_bp.route('/versus/<level_slug>/state')
+@quiz_bp.route('/versus/<level_slug>/state', defaults={'room': None})
+@quiz_bp.route('/versus/<level_slug>/<room>/state')
 @handle_errors
-def versus_level_state(level_slug):
+def versus_level_state(level_slug, room):
     """
-    Estado público específico por nivel.
-    Lo usan versus.html y contador_versus.html.
+    Estado público específico por nivel y sala, con poll_after_ms
+    (intervalo de consulta recomendado según estado y cronómetros) y
+    server_time (hora del servidor, para que las pantallas calculen los
+    cronómetros con su diferencia de reloj y no con la hora local).
+    Lo usan versus.html, contador_versus.html y quiz.html.
+
+    Con ?since=<versión> responde solo los cambios desde esa versión
+    ({since, patch, version}, ver services/state_feed.py) o, si no
+    puede, el estado completo con su version.
+
+    stale: true indica que el repositorio no respondió y se está
+    sirviendo el último estado conocido.
     """
     quiz_service, _ = get_services()
 
     normalized_level = normalize_public_level(level_slug)
-    if not normalized_level:
+    normalized_room = normalize_public_room(room)
+    if not normalized_level or not normalized_room:
+        return jsonify({}), 404
+
+    since = request.args.get('since')
+    public_state, version, patch = quiz_service.get_public_state_update(
+        level=normalized_level,
+        room=normalized_room,
+        since=since
+    )
+
+    if patch is not None:
+        payload = {'since': since, 'patch': patch}
+        if public_state.get('stale'):
+            payload['stale'] = True
+    else:
+        # El estado es compartido entre requests (single-flight): copiar
+        payload = dict(public_state or {})
+
+    payload['version'] = version
+    payload['poll_after_ms'] = quiz_service.recommended_poll_ms(public_state)
+    payload['server_time'] = time.time()
+    return jsonify(payload)
+
+
+@quiz_bp.route('/question-content/<question_id>/<content_hash>')
+@handle_errors
+def question_content(question_id, content_hash):
+    """
+    Imagen y opciones de una pregunta. La URL cambia si cambia el
+    contenido (content_hash), así que las pantallas la cachean sin
+    volver a pedirla.
+    """
+    quiz_service, _ = get_services()
+
+    content = quiz_service.get_question_content(question_id, content_hash)
+    if content is None:
         return jsonify({}), 404
 
-    public_state = quiz_service.get_public_quiz_state(level=normalized_level)
-    return jsonify(public_state or {})
+    response = jsonify(content)
+    response.cache_control.public = True
+    response.cache_control.max_age = QUESTION_CONTENT_MAX_AGE
+    response.cache_control.immutable = True
+    response.set_etag(content_hash)
+    return response.make_conditional(request)
 
 
-@quiz_bp.route('/submit-public-answer/<level_slug>', methods=['POST'])
+@quiz_bp.route('/submit-public-answer/<level_slug>', methods=['POST'], defaults={'room': None})
+@quiz_bp.route('/submit-public-answer/<level_slug>/<room>', methods=['POST'])
 @handle_errors
-def submit_public_answer(level_slug):
+def submit_public_answer(level_slug, room):
     """
-    El público envía respuesta para un nivel específico.
+    El público envía respuesta para un nivel y sala específicos.
     """
     quiz_service, _ = get_services()
 
     normalized_level = normalize_public_level(level_slug)
-    if not normalized_level:
+    normalized_room = normalize_public_room(room)
+    if not normalized_level or not normalized_room:
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return jsonify({
                 'success': False,
-                'message': 'Nivel no válido.'
+                'message': 'Nivel o sala no válidos.'
             }), 400
 
-        flash('Nivel no válido.', 'error')
+        flash('Nivel o sala no válidos.', 'error')
         return redirect(url_for('quiz.versus'))
 
     answer = request.form.get('answer')
     success, message = quiz_service.submit_public_answer(
         answer,
-        level=normalized_level
+        level=normalized_level,
+        room=normalized_room
     )
 
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -411,7 +595,55 @@ def submit_public_answer(level_slug):
         }), 200 if success else 400
 
     flash(message, 'success' if success else 'error')
-    return redirect(url_for('quiz.versus_level', level_slug=normalized_level))
+    return redirect(url_for(
+        'quiz.versus_level',
+        level_slug=normalized_level,
+        room=normalized_room
+    ))
+
+
+@quiz_bp.route('/audience-vote/<level_slug>', methods=['POST'], defaults={'room': None})
+@quiz_bp.route('/audience-vote/<level_slug>/<room>', methods=['POST'])
+@handle_errors
+def audience_vote(level_slug, room):
+    """
+    Voto de un espectador (modo votación del público). El dispositivo se
+    identifica con la cookie firmada del cliente (utils/rate_limit.py),
+    la misma que se entrega con las páginas públicas: sin una cookie
+    válida el voto se rechaza y se entrega una nueva.
+    """
+    quiz_service, _ = get_services()
+
+    normalized_level = normalize_public_level(level_slug)
+    normalized_room = normalize_public_room(room)
+    if not normalized_level or not normalized_room:
+        return jsonify({
+            'success': False,
+            'message': 'Nivel o sala no válidos.'
+        }), 400
+
+    token = signed_client_id()
+    if not token:
+        response = jsonify({
+            'success': False,
+            'message': 'No se pudo identificar el dispositivo. Vuelve a votar.'
+        })
+        response.status_code = 403
+        return set_client_cookie(response)
+
+    success, message = quiz_service.submit_audience_vote(
+        request.form.get('answer'),
+        token,
+        level=normalized_level,
+        room=normalized_room
+    )
+
+    response = jsonify({
+        'success': success,
+        'message': message
+    })
+    response.status_code = 200 if success else 400
+    return response
 
 
 # ============================================================
@@ -469,11 +701,12 @@ def next_question():
 @handle_errors
 def quiz_finished():
     quiz_service, _ = get_services()
-    results = quiz_service.get_quiz_results()
+    match = quiz_service.get_active_match() or {}
+    results = quiz_service.get_quiz_results(match)
 
     if isinstance(results, list):
-        scores = session.get('quiz_scores', {})
-        teams = session.get('quiz_teams', [])
+        scores = match.get('scores', {})
+        teams = match.get('teams', [])
 
         if scores:
             max_score = max(scores.values())
@@ -550,8 +783,10 @@ def scoreboard():
     teams_n2_sorted = sort_teams_for_scoreboard(teams_n2)
     teams_n3_sorted = sort_teams_for_scoreboard(teams_n3)
 
-    return render_template(
+    return render_cached(
         'scoreboard.html',
+        'scoreboard',
+        state_version(teams),
         scores_n1=teams_n1_sorted,
         scores_n2=teams_n2_sorted,
         scores_n3=teams_n3_sorted,
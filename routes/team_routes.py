@@ -1,16 +1,14 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required
-from firebase_admin import firestore
 
-from services.team_service import TeamService
+from services.container import get_container
 from utils.decorators import handle_errors
 
 team_bp = Blueprint('team', __name__)
 
 
 def get_team_service():
-    db = firestore.client()
-    return TeamService(db)
+    return get_container().team_service
 
 
 @team_bp.route('/manage-teams', methods=['GET', 'POST'])
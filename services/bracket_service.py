@@ -3,46 +3,54 @@ Servicio para gestión de brackets
 Olimpiadas Matemáticas - Tuluá
 """
 
+import copy
+import logging
 from datetime import datetime
-from firebase_admin import firestore
+from flask import has_app_context
+
+from repositories import get_repository
+from utils.cache import LRUCache, cached
+
+logger = logging.getLogger(__name__)
 
 _db = None
 
 BRACKET_COLLECTION = 'brackets'
 
+# Lecturas del bracket activo y de nombres de equipos (las plantillas
+# llaman get_team_name por cada casilla). Las escrituras de este módulo
+# invalidan; advance_team lee siempre sin caché.
+BRACKET_CACHE_TTL = 10
+TEAM_NAME_CACHE_TTL = 30
+_cache = LRUCache(maxsize=256, ttl=BRACKET_CACHE_TTL, name='brackets')
+
 
 def get_db():
     """
-    Obtener instancia de Firestore de forma lazy.
+    Obtener el repositorio de datos de forma lazy.
+    Dentro de la aplicación se reutiliza el del contenedor de servicios.
     """
     global _db
 
+    if has_app_context():
+        return get_repository()
+
     if _db is None:
-        _db = firestore.client()
+        _db = get_repository()
 
     return _db
 
 
-def get_or_create_bracket(team_ids=None):
+def get_or_create_bracket(team_ids=None, use_cache=True):
     """
     Obtener bracket actual o crear uno nuevo.
     """
     try:
-        db = get_db()
-        brackets_ref = db.collection(BRACKET_COLLECTION)
+        load = _load_active_bracket if use_cache else _load_active_bracket.uncached
+        bracket_data = load()
 
-        active_brackets = (
-            brackets_ref
-            .where('status', '==', 'active')
-            .limit(1)
-            .get()
-        )
-
-        if active_brackets:
-            bracket_doc = list(active_brackets)[0]
-            bracket_data = bracket_doc.to_dict() or {}
-            bracket_data['id'] = bracket_doc.id
-            return bracket_data
+        if bracket_data:
+            return copy.deepcopy(bracket_data)
 
         if team_ids and len(team_ids) == 8:
             return create_new_bracket(team_ids)
@@ -50,9 +58,32 @@ def get_or_create_bracket(team_ids=None):
         return None
 
     except Exception as e:
-        print(f"Error en get_or_create_bracket: {e}")
+        logger.exception("Error en get_or_create_bracket: %s", e)
+        return None
+
+
+@cached(_cache, key=lambda: 'active_bracket', cache_none=True)
+def _load_active_bracket():
+    active_brackets = (
+        get_db()
+        .collection(BRACKET_COLLECTION)
+        .where('status', '==', 'active')
+        .limit(1)
+        .get()
+    )
+
+    if not active_brackets:
         return None
 
+    bracket_doc = list(active_brackets)[0]
+    bracket_data = bracket_doc.to_dict() or {}
+    bracket_data['id'] = bracket_doc.id
+    return bracket_data
+
+
+def clear_cache():
+    _cache.clear()
+
 
 def create_new_bracket(team_ids):
     """
@@ -119,12 +150,13 @@ def create_new_bracket(team_ids):
 
         doc_ref = db.collection(BRACKET_COLLECTION).add(bracket_structure)
         bracket_id = doc_ref[1].id
+        clear_cache()
 
         bracket_structure['id'] = bracket_id
         return bracket_structure
 
     except Exception as e:
-        print(f"Error en create_new_bracket: {e}")
+        logger.exception("Error en create_new_bracket: %s", e)
         return None
 
 
@@ -137,7 +169,7 @@ def advance_team(match_id, winner_team_id):
             return False
 
         db = get_db()
-        bracket = get_or_create_bracket()
+        bracket = get_or_create_bracket(use_cache=False)
 
         if not bracket:
             return False
@@ -192,10 +224,11 @@ def advance_team(match_id, winner_team_id):
             update_data['completed_at'] = datetime.now().isoformat()
 
         bracket_ref.update(update_data)
+        clear_cache()
         return True
 
     except Exception as e:
-        print(f"Error en advance_team: {e}")
+        logger.exception("Error en advance_team: %s", e)
         return False
 
 
@@ -216,7 +249,7 @@ def get_bracket_status():
         }
 
     except Exception as e:
-        print(f"Error en get_bracket_status: {e}")
+        logger.exception("Error en get_bracket_status: %s", e)
         return {
             'status': 'error',
             'message': str(e)
@@ -235,10 +268,11 @@ def reset_bracket():
         for bracket in active_brackets:
             bracket.reference.delete()
 
+        clear_cache()
         return True
 
     except Exception as e:
-        print(f"Error en reset_bracket: {e}")
+        logger.exception("Error en reset_bracket: %s", e)
         return False
 
 
@@ -250,15 +284,18 @@ def get_team_name(team_id):
         if not team_id or team_id == 'None':
             return 'TBD'
 
-        db = get_db()
-        team_ref = db.collection('teams').document(team_id)
-        team = team_ref.get()
-
-        if team.exists:
-            return (team.to_dict() or {}).get('name', 'Equipo Desconocido')
+        return _load_team_name(team_id)
 
+    except Exception as e:
+        logger.exception("Error en get_team_name: %s", e)
         return 'Equipo Desconocido'
 
-    except Exception as e:
-        print(f"Error en get_team_name: {e}")
-        return 'Equipo Desconocido'
\ No newline at end of file
+
+@cached(_cache, key=lambda team_id: ('team_name', team_id), ttl=TEAM_NAME_CACHE_TTL)
+def _load_team_name(team_id):
+    team = get_db().collection('teams').document(team_id).get()
+
+    if team.exists:
+        return (team.to_dict() or {}).get('name', 'Equipo Desconocido')
+
+    return 'Equipo Desconocido'
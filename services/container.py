@@ -0,0 +1,182 @@
+"""
+Contenedor de servicios con alcance de aplicación.
+
+Se crea una sola vez en create_app y se guarda en
+app.extensions['services']. Los servicios se construyen una vez por
+proceso (de forma lazy) y se comparten entre requests y threads,
+así que sus cachés internas sobreviven entre requests y todos usan
+el mismo repositorio de datos (ver repositories/, DATA_BACKEND).
+
+Firebase y el cliente se crean en el primer uso dentro de cada worker
+(o en segundo plano justo después del fork, ver warm_up_async).
+Si el proceso cambia de pid (fork de gunicorn con --preload) todo lo
+construido en el padre se descarta y se vuelve a crear.
+"""
+
+import os
+import sys
+import threading
+
+from flask import current_app
+
+from utils.startup_profiler import startup_profiler
+
+
+class ServiceContainer:
+    EXTENSION_NAME = 'services'
+
+    def __init__(self, app):
+        self.app = app
+        self.config = app.config
+        self._lock = threading.RLock()
+        self._pid = os.getpid()
+        self._clear()
+
+    def _clear(self):
+        self._db = None
+        self._question_service = None
+        self._team_service = None
+        self._quiz_service = None
+        self._match_store = None
+        self._timer_scheduler = None
+
+    def reset_after_fork(self):
+        """
+        Descarta clientes, conexiones y servicios heredados del proceso padre.
+        Lo llama el hook post_fork de gunicorn (gunicorn.conf.py).
+        """
+        with self._lock:
+            if self._match_store is not None:
+                self._match_store.reset_after_fork()
+
+            if self._db is not None:
+                self._db.reset_after_fork()
+
+            if self._timer_scheduler is not None:
+                self._timer_scheduler.reset_after_fork()
+
+            self._clear()
+            self._pid = os.getpid()
+
+        # Si el padre nunca inicializó Firebase no hay nada que descartar:
+        # no importar firebase_admin (gRPC, protobuf) con backends locales
+        firebase = sys.modules.get('services.firebase')
+        if firebase is not None:
+            firebase.reset_firebase_after_fork()
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            self.reset_after_fork()
+
+    def warm_up_async(self):
+        """
+        Crea el repositorio de datos (Firebase + cliente de Firestore en
+        producción) en un hilo de fondo,
+        para que el primer request del worker no pague ese costo.
+        """
+        def warm_up():
+            try:
+                self.db
+            except Exception as e:
+                self.app.logger.error(f"Error al precalentar Firebase: {e}")
+
+        thread = threading.Thread(target=warm_up, name='firebase-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def db(self):
+        self._check_pid()
+
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    from repositories import create_repository
+
+                    with startup_profiler.phase('data_repository'):
+                        self._db = create_repository(self.app)
+
+        return self._db
+
+    @property
+    def match_store(self):
+        self._check_pid()
+
+        if self._match_store is None:
+            with self._lock:
+                if self._match_store is None:
+                    from services.match_store import get_match_store
+                    self._match_store = get_match_store()
+
+        return self._match_store
+
+    @property
+    def question_service(self):
+        self._check_pid()
+
+        if self._question_service is None:
+            with self._lock:
+                if self._question_service is None:
+                    from services.question_service import QuestionService
+                    self._question_service = QuestionService(self.db)
+
+        return self._question_service
+
+    @property
+    def team_service(self):
+        self._check_pid()
+
+        if self._team_service is None:
+            with self._lock:
+                if self._team_service is None:
+                    from services.team_service import TeamService
+                    self._team_service = TeamService(self.db)
+
+        return self._team_service
+
+    @property
+    def quiz_service(self):
+        self._check_pid()
+
+        if self._quiz_service is None:
+            with self._lock:
+                if self._quiz_service is None:
+                    from services.quiz_service import QuizService
+                    quiz_service = QuizService(
+                        db=self.db,
+                        question_service=self.question_service,
+                        team_service=self.team_service,
+                        match_store=self.match_store,
+                        content_key=self.config.get('SECRET_KEY'),
+                        prepare_on_countdown=self.config.get('PREPARE_MATCH_ON_COUNTDOWN', True)
+                    )
+
+                    if self.config.get('QUESTION_TIMER_SCHEDULER', True):
+                        from services.timer_scheduler import QuestionTimerScheduler
+                        self._timer_scheduler = QuestionTimerScheduler(
+                            quiz_service.expire_question_timer,
+                            quiz_service.running_question_timers,
+                            rescan_interval=self.config.get('QUESTION_TIMER_RESCAN_INTERVAL', 30)
+                        )
+                        quiz_service.timer_scheduler = self._timer_scheduler
+                        self._timer_scheduler.start()
+
+                    self._quiz_service = quiz_service
+
+        return self._quiz_service
+
+
+def init_services(app):
+    """
+    Registrar el contenedor de servicios en la aplicación.
+    """
+    container = ServiceContainer(app)
+    app.extensions[ServiceContainer.EXTENSION_NAME] = container
+    return container
+
+
+def get_container():
+    """
+    Contenedor de servicios de la aplicación actual.
+    """
+    return current_app.extensions[ServiceContainer.EXTENSION_NAME]
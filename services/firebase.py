@@ -0,0 +1,132 @@
+"""
+Inicialización de Firebase Admin SDK segura frente a fork.
+
+Los canales gRPC de Firestore no sobreviven a un fork, así que Firebase
+no se inicializa al importar la aplicación: se inicializa en el primer
+uso dentro de cada worker. Esto permite arrancar gunicorn con
+--preload (memoria compartida copy-on-write entre workers).
+
+firebase_admin (y con él gRPC y protobuf) se importa dentro de las
+funciones: con DATA_BACKEND=memory/sqlite no se carga nunca.
+"""
+
+import json
+import os
+
+from config import BASE_DIR
+from utils.startup_profiler import startup_profiler
+
+
+_initialized_pid = None
+
+
+@startup_profiler.profiled('initialize_firebase')
+def initialize_firebase(app):
+    """
+    Inicializa Firebase Admin SDK.
+    Se llama de forma lazy desde el contenedor de servicios, en el primer
+    uso dentro de cada worker, nunca en el proceso maestro de gunicorn.
+
+    Soporta:
+    - Variable de entorno FIREBASE_CREDENTIALS (JSON string) para producción
+    - Archivo local firebase_credentials.json para desarrollo local
+    """
+    import firebase_admin
+    from firebase_admin import credentials
+
+    try:
+        if firebase_admin._apps:
+            app.logger.info("Firebase ya estaba inicializado")
+            return
+
+        firebase_creds_json = os.getenv('FIREBASE_CREDENTIALS')
+
+        if firebase_creds_json:
+            app.logger.info("Usando credenciales de Firebase desde variable de entorno")
+
+            try:
+                cred_dict = json.loads(firebase_creds_json)
+                cred = credentials.Certificate(cred_dict)
+
+                firebase_admin.initialize_app(cred, {
+                    'storageBucket': 'olympic-math.firebasestorage.app'
+                })
+
+                app.logger.info(
+                    "Firebase inicializado desde variable de entorno "
+                    "(bucket olympic-math.firebasestorage.app)"
+                )
+
+            except json.JSONDecodeError as e:
+                app.logger.error(f"Error al parsear JSON de credenciales: {e}")
+                raise
+
+        else:
+            app.logger.info("Usando credenciales de Firebase desde archivo local")
+
+            cred_path = app.config.get(
+                'FIREBASE_CREDENTIALS',
+                os.path.join(BASE_DIR, 'firebase_credentials.json')
+            )
+
+            if not os.path.exists(cred_path):
+                raise FileNotFoundError(
+                    f"No se encontró el archivo de credenciales: {cred_path}\n"
+                    f"Tampoco está configurada la variable de entorno FIREBASE_CREDENTIALS"
+                )
+
+            cred = credentials.Certificate(cred_path)
+
+            firebase_admin.initialize_app(cred, {
+                'storageBucket': 'olympic-math.firebasestorage.app'
+            })
+
+            app.logger.info(
+                f"Firebase inicializado desde archivo local {cred_path} "
+                "(bucket olympic-math.firebasestorage.app)"
+            )
+
+        app.logger.info("Firebase inicializado correctamente")
+
+    except Exception as e:
+        app.logger.error(f"Error crítico al inicializar Firebase: {str(e)}")
+        raise
+
+
+def ensure_firebase(app):
+    """
+    Inicializa Firebase una sola vez por proceso.
+    """
+    global _initialized_pid
+
+    import firebase_admin
+
+    if _initialized_pid == os.getpid() and firebase_admin._apps:
+        return
+
+    if _initialized_pid is not None and _initialized_pid != os.getpid():
+        reset_firebase_after_fork()
+
+    initialize_firebase(app)
+    _initialized_pid = os.getpid()
+
+
+def reset_firebase_after_fork():
+    """
+    Descarta la app de Firebase heredada del proceso padre, si la hubiera,
+    para que el worker cree sus propios canales gRPC.
+    """
+    global _initialized_pid
+
+    if _initialized_pid is None or _initialized_pid == os.getpid():
+        return
+
+    import firebase_admin
+
+    for firebase_app in list(firebase_admin._apps.values()):
+        try:
+            firebase_admin.delete_app(firebase_app)
+        except Exception:
+            firebase_admin._apps.pop(firebase_app.name, None)
+
+    _initialized_pid = None
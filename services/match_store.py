@@ -0,0 +1,628 @@
+"""
+Almacén del estado de enfrentamientos del lado del servidor.
+
+La cookie de sesión del admin solo guarda el id del enfrentamiento
+(quiz_match_id). El estado completo (preguntas, puntajes, timers,
+banderas de validación) vive aquí:
+- SQLite en instance/database.db como almacenamiento compartido
+  entre workers de gunicorn
+- un diccionario en memoria por proceso como caché de lectura,
+  validado contra la versión guardada en SQLite
+
+Persistencia a prueba de reinicios:
+- cada transición se agrega a un journal (solo inserciones) con
+  únicamente los campos que cambiaron
+- cada SNAPSHOT_EVERY entradas se reescribe el snapshot completo
+- el estado se reconstruye con el último snapshot + la cola del journal
+- el journal se replica en Firestore (match_journal/<match_id>) para
+  poder reanudar aunque se pierda el disco local del worker. Si una
+  entrada no se pudo replicar, va en el reintento de su batch o, si no
+  hay reintento, la siguiente lleva el snapshot completo; la
+  reconstrucción desde Firestore no aplica entradas después de un hueco
+  en la secuencia
+"""
+
+import copy
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from flask import current_app, has_app_context
+
+
+logger = logging.getLogger(__name__)
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class MatchStore:
+    TABLE = 'quiz_matches'
+    JOURNAL_TABLE = 'quiz_match_journal'
+    SNAPSHOT_EVERY = 25
+
+    STATUS_ACTIVE = 'active'
+    STATUS_FINISHED = 'finished'
+    STATUS_CLOSED = 'closed'
+
+    def __init__(self, db_path, mirror=None):
+        self.db_path = db_path
+        self.mirror = mirror
+        self._memory = {}
+        self._mirror_gaps = set()  # match_ids con una entrada sin replicar
+        self._mirror_pending = {}  # match_id -> última entrada cuyo batch falló
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._ensure_schema()
+
+    # ============================================================
+    # API pública
+    # ============================================================
+
+    def create(self, data, batch=None):
+        """
+        Registra un nuevo enfrentamiento y devuelve su id.
+        Con `batch` la réplica en Firestore se agrega a ese batch y se
+        aplica en el commit del llamador.
+        """
+        match_id = uuid.uuid4().hex
+        now = time.time()
+
+        payload = dict(data)
+        payload['match_id'] = match_id
+        changes = {'set': payload}
+
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+
+        try:
+            conn.execute(
+                f"INSERT INTO {self.TABLE} "
+                f"(match_id, version, snapshot_seq, status, data, created_at, updated_at) "
+                f"VALUES (?, 1, 1, ?, ?, ?, ?)",
+                (match_id, self.STATUS_ACTIVE, self._dumps(payload), now, now)
+            )
+            self._append_journal(conn, match_id, 1, 'create', changes, now)
+            conn.execute('COMMIT')
+
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        self._remember(match_id, 1, payload)
+        self._mirror(match_id, 1, 'create', changes, payload, self.STATUS_ACTIVE, snapshot=payload,
+                     batch=batch)
+        return match_id
+
+    def get(self, match_id):
+        """
+        Devuelve una copia del estado del enfrentamiento o None.
+        Solo se reconstruye desde SQLite si otro worker lo modificó
+        desde la última lectura en este proceso.
+        """
+        if not match_id:
+            return None
+
+        conn = self._connect()
+        row = conn.execute(
+            f"SELECT version FROM {self.TABLE} WHERE match_id = ?",
+            (match_id,)
+        ).fetchone()
+
+        if row is None:
+            self._forget(match_id)
+            return None
+
+        version = row[0]
+
+        with self._lock:
+            cached = self._memory.get(match_id)
+
+        if cached and cached[0] == version:
+            return copy.deepcopy(cached[1])
+
+        version, data = self._rebuild(conn, match_id)
+        if data is None:
+            self._forget(match_id)
+            return None
+
+        self._remember(match_id, version, data)
+        return copy.deepcopy(data)
+
+    def save(self, match_id, data, action='update', status=None, batch=None):
+        """
+        Registra una transición del enfrentamiento.
+        Solo se escribe en el journal lo que cambió respecto al estado anterior.
+        Con `batch` la réplica en Firestore se agrega a ese batch (ver create).
+        """
+        if not match_id:
+            return False
+
+        now = time.time()
+        payload = dict(data)
+        payload['match_id'] = match_id
+
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+
+        try:
+            row = conn.execute(
+                f"SELECT version, snapshot_seq, status FROM {self.TABLE} WHERE match_id = ?",
+                (match_id,)
+            ).fetchone()
+
+            if row is None:
+                conn.execute('ROLLBACK')
+                return False
+
+            version, snapshot_seq, current_status = row
+
+            with self._lock:
+                cached = self._memory.get(match_id)
+
+            if cached and cached[0] == version:
+                previous = cached[1]
+            else:
+                previous = self._rebuild(conn, match_id)[1] or {}
+
+            changes = self._diff(previous, payload)
+            new_status = status or current_status
+
+            if not changes and new_status == current_status:
+                conn.execute('COMMIT')
+                # Reintento de un batch que falló: el estado local ya tiene
+                # la transición, pero la entrada tiene que ir en este batch
+                if batch is not None:
+                    self._mirror_retry(match_id, version, batch)
+                return True
+
+            seq = version + 1
+            self._append_journal(conn, match_id, seq, action, changes, now)
+
+            snapshot = None
+            if seq - snapshot_seq >= self.SNAPSHOT_EVERY:
+                snapshot = payload
+                conn.execute(
+                    f"UPDATE {self.TABLE} "
+                    f"SET version = ?, snapshot_seq = ?, data = ?, status = ?, updated_at = ? "
+                    f"WHERE match_id = ?",
+                    (seq, seq, self._dumps(payload), new_status, now, match_id)
+                )
+            else:
+                conn.execute(
+                    f"UPDATE {self.TABLE} "
+                    f"SET version = ?, status = ?, updated_at = ? "
+                    f"WHERE match_id = ?",
+                    (seq, new_status, now, match_id)
+                )
+
+            conn.execute('COMMIT')
+
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        self._remember(match_id, seq, payload)
+        self._mirror(match_id, seq, action, changes, payload, new_status, snapshot=snapshot, batch=batch)
+        return True
+
+    def set_status(self, match_id, status):
+        """
+        Cambia el estado del enfrentamiento (active / finished / closed).
+        """
+        data = self.get(match_id)
+        if data is None:
+            return False
+
+        return self.save(match_id, data, action=status, status=status)
+
+    def list_resumable(self, limit=20):
+        """
+        Enfrentamientos que siguen activos, del más reciente al más antiguo.
+        Si el disco local se perdió, se consultan en la réplica de Firestore.
+        """
+        conn = self._connect()
+        rows = conn.execute(
+            f"SELECT match_id, updated_at FROM {self.TABLE} "
+            f"WHERE status = ? ORDER BY updated_at DESC LIMIT ?",
+            (self.STATUS_ACTIVE, limit)
+        ).fetchall()
+
+        matches = []
+        seen = set()
+
+        for match_id, updated_at in rows:
+            data = self.get(match_id)
+            if data:
+                matches.append(self._summary(data, updated_at))
+                seen.add(match_id)
+
+        if self.mirror and len(matches) < limit:
+            for header in self.mirror.list_active(limit):
+                if header.get('match_id') not in seen:
+                    matches.append(header)
+
+        matches.sort(key=lambda item: item.get('updated_at') or 0, reverse=True)
+        return matches[:limit]
+
+    def restore(self, match_id):
+        """
+        Devuelve el estado local o, si no existe en este disco,
+        lo reconstruye desde la réplica de Firestore y lo guarda localmente.
+        """
+        data = self.get(match_id)
+        if data is not None or not self.mirror:
+            return data
+
+        version, status, data = self.mirror.rebuild(match_id, self._apply)
+        if data is None:
+            return None
+
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            f"INSERT OR REPLACE INTO {self.TABLE} "
+            f"(match_id, version, snapshot_seq, status, data, created_at, updated_at) "
+            f"VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (match_id, version, version, status, self._dumps(data), now, now)
+        )
+
+        self._remember(match_id, version, data)
+        return copy.deepcopy(data)
+
+    def reset_after_fork(self):
+        """
+        Las conexiones SQLite no se pueden compartir entre procesos:
+        tras un fork cada worker abre las suyas.
+        """
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        with self._lock:
+            self._memory.clear()
+            self._mirror_gaps.clear()
+            self._mirror_pending.clear()
+
+    def delete(self, match_id):
+        if not match_id:
+            return False
+
+        conn = self._connect()
+        conn.execute(f"DELETE FROM {self.JOURNAL_TABLE} WHERE match_id = ?", (match_id,))
+        conn.execute(f"DELETE FROM {self.TABLE} WHERE match_id = ?", (match_id,))
+        self._forget(match_id)
+        return True
+
+    # ============================================================
+    # Helpers internos
+    # ============================================================
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+
+        if conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=5,
+                isolation_level=None,
+                check_same_thread=False
+            )
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+
+        return conn
+
+    def _ensure_schema(self):
+        conn = self._connect()
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.TABLE} ("
+            f"match_id TEXT PRIMARY KEY, "
+            f"version INTEGER NOT NULL, "
+            f"snapshot_seq INTEGER NOT NULL DEFAULT 0, "
+            f"status TEXT NOT NULL, "
+            f"data TEXT NOT NULL, "
+            f"created_at REAL NOT NULL, "
+            f"updated_at REAL NOT NULL)"
+        )
+
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({self.TABLE})")}
+        if 'snapshot_seq' not in columns:
+            conn.execute(
+                f"ALTER TABLE {self.TABLE} "
+                f"ADD COLUMN snapshot_seq INTEGER NOT NULL DEFAULT 0"
+            )
+            conn.execute(f"UPDATE {self.TABLE} SET snapshot_seq = version")
+
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.JOURNAL_TABLE} ("
+            f"match_id TEXT NOT NULL, "
+            f"seq INTEGER NOT NULL, "
+            f"action TEXT NOT NULL, "
+            f"changes TEXT NOT NULL, "
+            f"created_at REAL NOT NULL, "
+            f"PRIMARY KEY (match_id, seq))"
+        )
+
+    def _append_journal(self, conn, match_id, seq, action, changes, now):
+        conn.execute(
+            f"INSERT INTO {self.JOURNAL_TABLE} "
+            f"(match_id, seq, action, changes, created_at) VALUES (?, ?, ?, ?, ?)",
+            (match_id, seq, action, self._dumps(changes), now)
+        )
+
+    def _rebuild(self, conn, match_id):
+        """
+        Reconstruye el estado: snapshot + entradas posteriores del journal.
+        """
+        row = conn.execute(
+            f"SELECT version, snapshot_seq, data FROM {self.TABLE} WHERE match_id = ?",
+            (match_id,)
+        ).fetchone()
+
+        if row is None:
+            return 0, None
+
+        version, snapshot_seq, snapshot = row
+        data = json.loads(snapshot)
+
+        tail = conn.execute(
+            f"SELECT changes FROM {self.JOURNAL_TABLE} "
+            f"WHERE match_id = ? AND seq > ? AND seq <= ? ORDER BY seq",
+            (match_id, snapshot_seq, version)
+        ).fetchall()
+
+        for (changes,) in tail:
+            self._apply(data, json.loads(changes))
+
+        return version, data
+
+    @staticmethod
+    def _diff(previous, current):
+        changed = {
+            key: value
+            for key, value in current.items()
+            if key not in previous or previous[key] != value
+        }
+        removed = [key for key in previous if key not in current]
+
+        changes = {}
+        if changed:
+            changes['set'] = changed
+        if removed:
+            changes['unset'] = removed
+
+        return changes
+
+    @staticmethod
+    def _apply(data, changes):
+        data.update(copy.deepcopy(changes.get('set', {})))
+
+        for key in changes.get('unset', []):
+            data.pop(key, None)
+
+        return data
+
+    def _summary(self, data, updated_at):
+        return {
+            'match_id': data.get('match_id'),
+            'level': data.get('level'),
+            'room': data.get('room'),
+            'round': data.get('round'),
+            'teams': data.get('teams', []),
+            'scores': data.get('scores', {}),
+            'question_number': data.get('current_question_index', 0) + 1,
+            'total_questions': len(data.get('question_ids', [])),
+            'updated_at': updated_at
+        }
+
+    def _mirror(self, match_id, seq, action, changes, data, status, snapshot=None, batch=None):
+        if not self.mirror:
+            return
+
+        with self._lock:
+            self._mirror_pending.pop(match_id, None)
+
+            # Falta una entrada en la réplica: esta lleva el estado completo
+            if match_id in self._mirror_gaps:
+                snapshot = data
+                self._mirror_gaps.discard(match_id)
+
+        entry = (seq, action, changes, self._summary(data, time.time()), status, snapshot)
+        self._mirror_entry(match_id, entry, batch)
+
+    def _mirror_retry(self, match_id, version, batch):
+        """Volver a agregar al batch la entrada `version` si su batch falló"""
+        if not self.mirror:
+            return
+
+        with self._lock:
+            entry = self._mirror_pending.get(match_id)
+            if entry is None or entry[0] != version:
+                return
+
+            del self._mirror_pending[match_id]
+            self._mirror_gaps.discard(match_id)
+
+        self._mirror_entry(match_id, entry, batch)
+
+    def _mirror_entry(self, match_id, entry, batch):
+        seq, action, changes, summary, status, snapshot = entry
+
+        if batch is not None:
+            batch.on_failure(lambda error: self._mirror_failed(match_id, seq, error, entry))
+
+        try:
+            self.mirror.append(match_id, seq, action, changes, summary, status, snapshot=snapshot, batch=batch)
+        except Exception as e:
+            self._mirror_failed(match_id, seq, e)
+
+    def _mirror_failed(self, match_id, seq, error, entry=None):
+        logger.warning(
+            "Error al replicar journal del enfrentamiento %s (entrada %s): %s; "
+            "la próxima entrada lleva el snapshot completo",
+            match_id,
+            seq,
+            error
+        )
+
+        with self._lock:
+            self._mirror_gaps.add(match_id)
+            if entry is not None:
+                self._mirror_pending[match_id] = entry
+
+    def _remember(self, match_id, version, data):
+        with self._lock:
+            self._memory[match_id] = (version, copy.deepcopy(data))
+
+    def _forget(self, match_id):
+        with self._lock:
+            self._memory.pop(match_id, None)
+
+    def _dumps(self, data):
+        return json.dumps(data, separators=(',', ':'))
+
+
+class FirestoreJournalMirror:
+    """
+    Réplica del journal en Firestore:
+        match_journal/<match_id>                 cabecera + último snapshot
+        match_journal/<match_id>/entries/<seq>   una entrada por transición
+    """
+
+    COLLECTION = 'match_journal'
+    ENTRIES = 'entries'
+
+    @property
+    def db(self):
+        from repositories import get_repository
+        return get_repository()
+
+    def append(self, match_id, seq, action, changes, summary, status, snapshot=None, batch=None):
+        """Sin `batch` las escrituras se aplican en un commit propio"""
+        header_ref = self.db.collection(self.COLLECTION).document(match_id)
+        entry_ref = header_ref.collection(self.ENTRIES).document(f"{seq:08d}")
+
+        header = dict(summary)
+        header['status'] = status
+        header['version'] = seq
+
+        if snapshot is not None:
+            header['snapshot'] = snapshot
+            header['snapshot_seq'] = seq
+
+        own_batch = batch is None
+        if own_batch:
+            batch = self.db.batch()
+
+        batch.set(entry_ref, {
+            'seq': seq,
+            'action': action,
+            'changes': changes,
+            'created_at': time.time()
+        })
+        # Con snapshot la cabecera se reescribe entera: con merge el mapa
+        # anidado conservaría las claves que se quitaron del estado
+        batch.set(header_ref, header, merge=snapshot is None)
+
+        if own_batch:
+            batch.commit()
+
+    def list_active(self, limit=20):
+        try:
+            docs = (
+                self.db.collection(self.COLLECTION)
+                .where('status', '==', MatchStore.STATUS_ACTIVE)
+                .limit(limit)
+                .stream()
+            )
+
+            headers = []
+            for doc in docs:
+                header = doc.to_dict() or {}
+                header.pop('snapshot', None)
+                header['match_id'] = doc.id
+                headers.append(header)
+
+            return headers
+
+        except Exception as e:
+            logger.exception("Error al listar enfrentamientos replicados: %s", e)
+            return []
+
+    def rebuild(self, match_id, apply_changes):
+        """
+        Devuelve (versión, estado, datos) reconstruidos desde Firestore.
+        """
+        try:
+            header_ref = self.db.collection(self.COLLECTION).document(match_id)
+            header_doc = header_ref.get()
+
+            if not header_doc.exists:
+                return 0, None, None
+
+            header = header_doc.to_dict() or {}
+            data = header.get('snapshot')
+            snapshot_seq = header.get('snapshot_seq', 0)
+
+            if data is None:
+                return 0, None, None
+
+            entries = (
+                header_ref.collection(self.ENTRIES)
+                .where('seq', '>', snapshot_seq)
+                .stream()
+            )
+
+            version = snapshot_seq
+            for entry in sorted((doc.to_dict() or {} for doc in entries), key=lambda e: e.get('seq', 0)):
+                seq = entry.get('seq', 0)
+
+                if seq != version + 1:
+                    # Las entradas son diferencias: saltar una deja el
+                    # estado mal. Se queda en la última entrada contigua.
+                    logger.error(
+                        "Journal replicado del enfrentamiento %s con hueco: falta la entrada %s; "
+                        "se reconstruye hasta la %s",
+                        match_id,
+                        version + 1,
+                        version
+                    )
+                    break
+
+                apply_changes(data, entry.get('changes') or {})
+                version = seq
+
+            return version, header.get('status', MatchStore.STATUS_ACTIVE), data
+
+        except Exception as e:
+            logger.exception("Error al reconstruir enfrentamiento %s desde Firestore: %s", match_id, e)
+            return 0, None, None
+
+
+def get_match_store():
+    """
+    Obtener el almacén de enfrentamientos de forma lazy (uno por proceso).
+    """
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if has_app_context():
+                    db_path = current_app.config['MATCH_STORE_PATH']
+                else:
+                    from config import Config
+                    db_path = Config.MATCH_STORE_PATH
+
+                _store = MatchStore(db_path, mirror=FirestoreJournalMirror())
+
+    return _store
@@ -1,13 +1,33 @@
-from firebase_admin import firestore
+import copy
+import logging
+
+from repositories import SERVER_TIMESTAMP, get_repository
+from utils.cache import LRUCache, cached
+from utils.singleflight import SingleFlight
+
+
+logger = logging.getLogger(__name__)
 
 
 class QuestionService:
-    def __init__(self):
+    # Las preguntas casi no cambian durante el evento; las escrituras de
+    # este proceso invalidan al instante, las de otros workers al expirar.
+    QUESTION_CACHE_TTL = 120
+    LIST_CACHE_TTL = 30
+    CACHE_SIZE = 2048
+
+    def __init__(self, db=None):
         self.collection_name = 'questions'
+        self._db = db
+        self.cache = LRUCache(maxsize=self.CACHE_SIZE, ttl=self.QUESTION_CACHE_TTL, name='questions')
+        self._flight = SingleFlight('questions')
 
     @property
     def db(self):
-        return firestore.client()
+        if self._db is None:
+            self._db = get_repository()
+
+        return self._db
 
     @property
     def collection(self):
@@ -25,14 +45,16 @@ class QuestionService:
                 'question_image': question_data.get('question_image', '').strip(),
                 'options': question_data.get('options', {}),
                 'correct': question_data.get('correct', '').strip().lower(),
-                'created_at': firestore.SERVER_TIMESTAMP
+                'created_at': SERVER_TIMESTAMP
             }
 
             if doc_id:
                 self.collection.document(doc_id).set(payload, merge=True)
+                self._invalidate(doc_id)
                 return True, f'Pregunta "{doc_id}" guardada correctamente.'
 
             self.collection.document().set(payload)
+            self._invalidate()
             return True, 'Pregunta guardada correctamente.'
 
         except Exception as e:
@@ -40,46 +62,88 @@ class QuestionService:
 
     def get_question_by_id(self, question_id):
         """
-        Obtiene una pregunta por ID.
+        Obtiene una pregunta por ID (desde la caché si está).
         """
         try:
-            doc = self.collection.document(question_id).get()
-
-            if not doc.exists:
-                return None
-
-            data = doc.to_dict() or {}
-            data['id'] = doc.id
-            return data
+            question = self._load_question(question_id)
+            return copy.deepcopy(question) if question else None
 
         except Exception as e:
-            print(f"Error al obtener pregunta por id: {e}")
+            logger.exception("Error al obtener pregunta por id: %s", e)
             return None
 
+    def preload_questions(self, question_ids):
+        """
+        Carga las preguntas de un enfrentamiento en la caché (con el TTL
+        normal: las ediciones de otros workers se ven al expirar).
+        Devuelve las que existen, en el mismo orden.
+        """
+        questions = []
+
+        for question_id in question_ids:
+            question = self._load_question(question_id)
+            if question:
+                questions.append(copy.deepcopy(question))
+
+        return questions
+
     def get_questions_by_level_and_round(self, level, round_type):
         """
         Obtiene preguntas por nivel y ronda.
         """
         try:
-            docs = (
-                self.collection
-                .where('level', '==', level)
-                .where('round', '==', round_type)
-                .stream()
-            )
+            return [dict(question) for question in self._load_questions_by_level_and_round(level, round_type)]
 
-            questions = []
+        except Exception as e:
+            logger.exception("Error al obtener preguntas por nivel/ronda: %s", e)
+            return []
 
-            for doc in docs:
-                data = doc.to_dict() or {}
-                data['id'] = doc.id
-                questions.append(data)
+    @cached(lambda self: self.cache, key=lambda self, question_id: ('question', question_id))
+    def _load_question(self, question_id):
+        # Fallo de caché: los pedidos simultáneos de la misma pregunta
+        # comparten una lectura
+        return self._flight.do(('question', question_id), lambda: self._fetch_question(question_id))
 
-            return questions
+    def _fetch_question(self, question_id):
+        doc = self.collection.document(question_id).get()
 
-        except Exception as e:
-            print(f"Error al obtener preguntas por nivel/ronda: {e}")
-            return []
+        if not doc.exists:
+            return None
+
+        data = doc.to_dict() or {}
+        data['id'] = doc.id
+        return data
+
+    @cached(
+        lambda self: self.cache,
+        key=lambda self, level, round_type: ('by_level_and_round', level, round_type),
+        ttl=LIST_CACHE_TTL
+    )
+    def _load_questions_by_level_and_round(self, level, round_type):
+        docs = (
+            self.collection
+            .where('level', '==', level)
+            .where('round', '==', round_type)
+            .stream()
+        )
+
+        questions = []
+
+        for doc in docs:
+            data = doc.to_dict() or {}
+            data['id'] = doc.id
+            questions.append(data)
+
+            # El enfrentamiento va a pedir algunas de estas por id
+            self.cache.set(('question', doc.id), data)
+
+        return questions
+
+    def _invalidate(self, question_id=None):
+        if question_id:
+            self.cache.delete(('question', question_id))
+            self._flight.forget(('question', question_id))
+        self.cache.delete_where(lambda key: key[0] == 'by_level_and_round')
 
     def get_all_questions(self):
         """
@@ -97,7 +161,7 @@ class QuestionService:
             return questions
 
         except Exception as e:
-            print(f"Error al obtener todas las preguntas: {e}")
+            logger.exception("Error al obtener todas las preguntas: %s", e)
             return []
 
     def update_question(self, question_id, question_data):
@@ -126,10 +190,11 @@ class QuestionService:
                     'd': question_data.get('option_d', '').strip(),
                 },
                 'correct': question_data.get('correct', '').strip().lower(),
-                'updated_at': firestore.SERVER_TIMESTAMP
+                'updated_at': SERVER_TIMESTAMP
             }
 
             doc_ref.set(payload, merge=True)
+            self._invalidate(question_id)
             return True, f'Pregunta "{question_id}" actualizada correctamente.'
 
         except Exception as e:
@@ -150,6 +215,7 @@ class QuestionService:
                 return False, "La pregunta no existe o ya fue eliminada."
 
             doc_ref.delete()
+            self._invalidate(question_id)
             return True, f'Pregunta "{question_id}" eliminada correctamente.'
 
         except Exception as e:
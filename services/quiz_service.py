@@ -18,32 +18,95 @@ Versión actualizada:
     public_state/nivel1
     public_state/nivel2
     public_state/nivel3
+- El estado del enfrentamiento vive en el servidor (MatchStore).
+  La cookie del admin solo guarda quiz_match_id.
+- Cada nivel admite varias salas con enfrentamientos en paralelo.
+  La sala principal (sala1) conserva el documento public_state/nivelN;
+  las demás usan public_state/nivelN__<sala>.
 """
 
 from flask import session
+from services.audience_votes import VOTE_OPTIONS, AudienceVoteAggregator, empty_tally
+from services.match_store import get_match_store
 from services.question_service import QuestionService
+from services.state_feed import PublicStateFeed
 from services.team_service import TeamService
-from firebase_admin import firestore
+from repositories import SERVER_TIMESTAMP, ArrayUnion, UnavailableError, get_repository
+from utils.cache import LRUCache
+from utils.singleflight import SingleFlight
+import hashlib
+import hmac
+import json
+import logging
 import random
+import re
+import threading
 import time
 
 
+logger = logging.getLogger(__name__)
+
+
 class QuizService:
     PUBLIC_STATE_COLLECTION = 'public_state'
     USED_QUESTIONS_COLLECTION = 'used_questions'
-
-    def __init__(self):
-        self.db = firestore.client()
-        self.question_service = QuestionService()
-        self.team_service = TeamService(self.db)
+    SESSION_MATCH_KEY = 'quiz_match_id'
+    DEFAULT_ROOM = 'sala1'
+    RESERVED_ROOMS = {'state'}
+    ROOM_PATTERN = re.compile(r'^[a-z0-9][a-z0-9_-]{0,23}$')
+
+    # Intervalo de consulta recomendado a las pantallas públicas (ms)
+    POLL_ACTIVE_MS = 2500
+    POLL_FAST_MS = 700
+    POLL_IDLE_MS = 8000
+    POLL_FINISHED_MS = 10000
+    POLL_DORMANT_MS = 20000
+    POLL_STALE_MS = 5000  # el repositorio no responde: consultar menos
+    POLL_DORMANT_AFTER = 600  # segundos en idle sin cambios
+    POLL_FAST_WINDOW = 5  # segundos antes de que termine un contador
+    POLL_JITTER = 0.2
+
+    # Versiones recientes del estado público por sala (feed con deltas)
+    STATE_FEED_SIZE = 16
+
+    # Si el repositorio falla se sirve el último estado leído de cada
+    # sala (con stale: true) durante a lo sumo este tiempo (segundos)
+    STALE_STATE_TTL = 900
+
+    # Votación del público (ver services/audience_votes.py)
+    AUDIENCE_VOTE_FLUSH_INTERVAL = 2.0
+    VOTE_STATE_TTL = 1  # segundos que se reutiliza el estado para validar votos
+    VOTER_TOKEN_PATTERN = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+    def __init__(self, db=None, question_service=None, team_service=None, match_store=None,
+                 timer_scheduler=None, content_key=None, prepare_on_countdown=True):
+        self.db = db or get_repository()
+        self.question_service = question_service or QuestionService(self.db)
+        self.team_service = team_service or TeamService(self.db)
+        self.match_store = match_store or get_match_store()
         self._rng = random.Random()
         self._rng.seed(int(time.time()))
+        self._rng_lock = threading.Lock()
+        self._public_state_flight = SingleFlight('public_state')
+        self._last_good_states = LRUCache(maxsize=256, ttl=self.STALE_STATE_TTL, name='public_state_last_good')
+        self._last_live_rooms = None
+        self.state_feed = PublicStateFeed(self.STATE_FEED_SIZE)
+        self.audience_votes = AudienceVoteAggregator(
+            self.db,
+            self._publish_vote_tally,
+            flush_interval=self.AUDIENCE_VOTE_FLUSH_INTERVAL
+        )
+        self._vote_state_cache = LRUCache(maxsize=64, ttl=self.VOTE_STATE_TTL, name='vote_state')
+        self.timer_scheduler = timer_scheduler
+        self._content_key = (content_key or '').encode('utf-8')
+        self.prepare_on_countdown = prepare_on_countdown
 
     # ============================================================
     # Flujo principal
     # ============================================================
 
-    def initialize_quiz(self, level, team1, team2, questions_count=10, round_type='octavos'):
+    def initialize_quiz(self, level, team1, team2, questions_count=10, round_type='octavos', room=None,
+                        audience_voting=False):
         try:
             level_map = {
                 "Nivel I": "nivel1",
@@ -57,6 +120,19 @@ class QuizService:
 
             round_type = self._normalize_round(round_type)
 
+            room = self.normalize_room(room)
+            if not room:
+                return False, "Sala no válida", None
+
+            previous_match_id = session.get(self.SESSION_MATCH_KEY)
+
+            if self._is_room_busy(firestore_level, room, previous_match_id):
+                return (
+                    False,
+                    f"La sala {room} de {level} ya tiene un enfrentamiento en curso",
+                    None
+                )
+
             all_questions = self.question_service.get_questions_by_level_and_round(
                 firestore_level,
                 round_type
@@ -84,41 +160,60 @@ class QuizService:
                     None
                 )
 
-            selected_ids = self._rng.sample(available_question_ids, questions_count)
-            self._rng.shuffle(selected_ids)
+            with self._rng_lock:
+                selected_ids = self._rng.sample(available_question_ids, questions_count)
+                self._rng.shuffle(selected_ids)
 
-            session['quiz_level'] = level
-            session['quiz_firestore_level'] = firestore_level
-            session['quiz_teams'] = [team1, team2]
-            session['quiz_round'] = round_type
-            session['quiz_question_ids'] = selected_ids
-            session['current_question_index'] = 0
-            session['quiz_scores'] = {team1: 0, team2: 0}
+            match = {
+                'level': level,
+                'firestore_level': firestore_level,
+                'room': room,
+                'teams': [team1, team2],
+                'round': round_type,
+                'question_ids': selected_ids,
+                'current_question_index': 0,
+                'scores': {team1: 0, team2: 0},
 
-            session['question_start_time'] = None
-            session['question_timer_started_at'] = None
-            session['question_timer_duration'] = 300
+                'question_start_time': None,
+                'question_timer_started_at': None,
+                'question_timer_duration': 300,
 
-            session['countdown_started_at'] = None
-            session['countdown_duration'] = 0
+                'countdown_started_at': None,
+                'countdown_duration': 0,
 
-            session['show_correct_answer'] = False
-            session['last_submitted_answer'] = None
-            session['public_selected_answer'] = None
-            session['admin_validation_result'] = None
-            session['argument_validation_required'] = False
-            session['validated_team_name'] = None
+                'show_correct_answer': False,
+                'last_submitted_answer': None,
+                'public_selected_answer': None,
+                'admin_validation_result': None,
+                'argument_validation_required': False,
+                'validated_team_name': None,
 
-            session['match_finished_manually'] = False
-            session.modified = True
+                'match_finished_manually': False,
+                'audience_voting': bool(audience_voting)
+            }
 
-            self._mark_questions_as_used(firestore_level, round_type, selected_ids)
+            previous_match = self.match_store.get(previous_match_id)
+            if (
+                previous_match
+                and previous_match.get('firestore_level') == firestore_level
+                and previous_match.get('room') == room
+            ):
+                # Se reemplaza en la misma sala; si no, queda disponible para reanudar
+                self.match_store.set_status(previous_match_id, self.match_store.STATUS_CLOSED)
 
-            self._publish_current_state(
-                status='countdown',
-                question_override=None,
-                level=firestore_level
-            )
+            # Réplica del enfrentamiento, preguntas usadas y estado
+            # público en un solo commit
+            batch = self.db.batch()
+
+            match['match_id'] = self.match_store.create(match, batch=batch)
+            session[self.SESSION_MATCH_KEY] = match['match_id']
+
+            self._stage_questions_as_used(batch, firestore_level, round_type, selected_ids)
+
+            if not self._publish_current_state(match, status='countdown', batch=batch):
+                self.match_store.set_status(match['match_id'], self.match_store.STATUS_CLOSED)
+                session.pop(self.SESSION_MATCH_KEY, None)
+                return False, "No se pudo publicar el enfrentamiento. Intenta de nuevo.", None
 
             return True, "Quiz iniciado correctamente", selected_ids
 
@@ -127,50 +222,69 @@ class QuizService:
 
     def start_countdown(self, duration=12):
         try:
-            session['countdown_started_at'] = time.time()
-            session['countdown_duration'] = int(duration)
-            session.modified = True
+            match = self._load_match()
+            if not match:
+                return False
+
+            match['countdown_started_at'] = time.time()
+            match['countdown_duration'] = int(duration)
+            self._save_match(match, action='countdown')
 
             self._publish_current_state(
+                match,
                 status='countdown',
-                question_override=None,
-                level=session.get('quiz_firestore_level')
+                question_override=None
             )
+
+            if self.prepare_on_countdown:
+                # Los segundos del countdown alcanzan para dejar todo en caché
+                self._prepare_in_background(match)
+
             return True
 
         except Exception as e:
-            print(f"Error al iniciar countdown: {e}")
+            logger.exception("Error al iniciar countdown: %s", e)
             return False
 
     def get_current_question(self):
         """
         Obtiene la pregunta actual y publica estado público.
-        Si la misma pregunta ya está en awaiting_argument_validation o answer_revealed,
-        preserva ese estado.
+        Si la misma pregunta ya está en awaiting_argument_validation,
+        answer_revealed o time_expired, preserva ese estado.
         """
         try:
-            question = self._get_current_question_raw()
+            match = self._load_match()
+            if not match:
+                return None
+
+            question = self._get_current_question_raw(match)
             if not question:
                 return None
 
             question['display_options'] = self._normalize_options(question.get('options', {}))
 
-            if session.get('question_start_time') is None:
-                session['question_start_time'] = time.time()
+            changed = False
 
-            if session.get('question_timer_started_at') is None:
-                session['question_timer_started_at'] = time.time()
-                session['question_timer_duration'] = 300
+            if match.get('question_start_time') is None:
+                match['question_start_time'] = time.time()
+                changed = True
 
-            session.modified = True
+            if match.get('question_timer_started_at') is None:
+                match['question_timer_started_at'] = time.time()
+                match['question_timer_duration'] = 300
+                changed = True
 
-            existing_state = self.get_public_quiz_state(level=session.get('quiz_firestore_level'))
+            if changed:
+                self._save_match(match, action='question_started')
+
+            existing_state = self.get_match_public_state(match)
             existing_status = existing_state.get('status')
             existing_question = existing_state.get('question') or {}
 
             preserve_statuses = {
                 'awaiting_argument_validation',
-                'answer_revealed'
+                'answer_revealed',
+                'time_expired'
             }
 
             if (
@@ -182,24 +296,27 @@ class QuizService:
                 status_to_publish = 'in_progress'
 
             self._publish_current_state(
+                match,
                 status=status_to_publish,
-                question_override=question,
-                level=session.get('quiz_firestore_level')
+                question_override=question
             )
 
             return question
 
         except Exception as e:
-            print(f"Error al obtener pregunta actual: {e}")
+            logger.exception("Error al obtener pregunta actual: %s", e)
             return None
 
-    def submit_public_answer(self, user_answer, level=None):
+    def submit_public_answer(self, user_answer, level=None, room=None):
         """
         El público responde y el sistema valida automáticamente
         si la respuesta es correcta o incorrecta.
         """
         try:
-            public_state = self.get_public_quiz_state(level=level)
+            public_state = self.get_public_quiz_state(level=level, room=room)
+
+            if public_state and public_state.get('status') == 'time_expired':
+                return False, "Se agotó el tiempo de respuesta"
 
             if not public_state or public_state.get('status') != 'in_progress':
                 return False, "No hay pregunta en curso"
@@ -226,18 +343,23 @@ class QuizService:
             correct_answer = current_question.get('correct')
             is_correct = user_answer == correct_answer
 
-            session['public_selected_answer'] = user_answer
-            session['last_submitted_answer'] = user_answer
-            session['admin_validation_result'] = 'correct' if is_correct else 'incorrect'
-            session['argument_validation_required'] = bool(is_correct)
-            session['show_correct_answer'] = not is_correct
-            session['validated_team_name'] = None
-            session.modified = True
+            # Réplica del enfrentamiento y estado público en un solo commit
+            batch = self.db.batch()
+
+            match = self.match_store.get(public_state.get('match_id'))
+            previous_match = dict(match) if match else None
+            if match:
+                match['public_selected_answer'] = user_answer
+                match['last_submitted_answer'] = user_answer
+                match['admin_validation_result'] = 'correct' if is_correct else 'incorrect'
+                match['argument_validation_required'] = bool(is_correct)
+                match['show_correct_answer'] = not is_correct
+                match['validated_team_name'] = None
+                self._save_match(match, action='public_answer', batch=batch)
 
             updated_question = {
                 'id': question_id,
-                'image': public_question.get('image'),
-                'options': public_question.get('options', {}),
+                'content_hash': public_question.get('content_hash'),
                 'correct_answer': None,
                 'show_correct_answer': False,
                 'selected_answer': user_answer,
@@ -246,42 +368,100 @@ class QuizService:
                 'validated_team_name': None
             }
 
-            if is_correct:
-                self._public_state_ref(level=level).set({
-                    'status': 'awaiting_argument_validation',
+            if not is_correct:
+                updated_question['correct_answer'] = correct_answer
+                updated_question['show_correct_answer'] = True
+                updated_question['argument_validation_required'] = False
+
+            try:
+                self._set_public_state(self._public_state_ref(level=level, room=room), {
+                    'status': 'awaiting_argument_validation' if is_correct else 'answer_revealed',
                     'question': updated_question,
-                    'updated_at': firestore.SERVER_TIMESTAMP
-                }, merge=True)
+                    'updated_at': SERVER_TIMESTAMP
+                }, merge=True, batch=batch)
+            except Exception:
+                if previous_match:
+                    self._save_match(previous_match, action='public_answer_failed')
+                raise
 
+            if is_correct:
                 return True, "Respuesta correcta. Esperando asignación del administrador."
 
-            updated_question['correct_answer'] = correct_answer
-            updated_question['show_correct_answer'] = True
-            updated_question['argument_validation_required'] = False
-
-            self._public_state_ref(level=level).set({
-                'status': 'answer_revealed',
-                'question': updated_question,
-                'updated_at': firestore.SERVER_TIMESTAMP
-            }, merge=True)
-
             return True, "Respuesta incorrecta. Se revelará la opción correcta."
 
         except Exception as e:
-            print(f"Error en submit_public_answer: {e}")
+            logger.exception("Error en submit_public_answer: %s", e)
             return False, f"Error al registrar respuesta pública: {str(e)}"
 
-    def resolve_correct_answer_assignment(self, team_name, argument_valid):
+    def submit_audience_vote(self, user_answer, token, level=None, room=None):
+        """
+        Voto de un espectador en modo votación del público: uno por
+        dispositivo y pregunta, no bloquea la pregunta. Los votos se
+        cuentan en memoria y se guardan por lotes.
+        """
+        try:
+            if user_answer not in VOTE_OPTIONS:
+                return False, "Respuesta no válida"
+
+            if not token or not self.VOTER_TOKEN_PATTERN.match(token):
+                return False, "Dispositivo no válido"
+
+            doc_name = self._get_public_state_doc_name(level, room)
+            public_state = self._vote_state_cache.get_or_set(
+                doc_name,
+                lambda: self.get_public_quiz_state(level=level, room=room)
+            )
+
+            if not public_state.get('audience_voting'):
+                return False, "La votación del público no está activa"
+
+            if public_state.get('status') != 'in_progress' or self._is_question_timer_expired(public_state):
+                return False, "La votación de esta pregunta está cerrada"
+
+            question_id = (public_state.get('question') or {}).get('id')
+            if not question_id:
+                return False, "No hay pregunta activa"
+
+            if not self.audience_votes.add(doc_name, question_id, token, user_answer):
+                return False, "Este dispositivo ya votó en esta pregunta"
+
+            return True, "Voto registrado"
+
+        except Exception as e:
+            logger.exception("Error en submit_audience_vote: %s", e)
+            return False, f"Error al registrar el voto: {str(e)}"
+
+    def _publish_vote_tally(self, state_doc, tally, transaction):
+        ref = self.db.collection(self.PUBLIC_STATE_COLLECTION).document(state_doc)
+        snapshot = transaction.get(ref)
+        state = snapshot.to_dict() if snapshot.exists else None
+
+        if not state or (state.get('question') or {}).get('id') != tally['question_id']:
+            return
+
+        transaction.update(ref, {
+            'votes': tally,
+            'updated_at': SERVER_TIMESTAMP
+        })
+        self._public_state_flight.forget(ref.path)
+
+    def resolve_correct_answer_assignment(self, team_name, argument_valid, public_state=None):
         """
         Completa la asignación de puntos cuando la respuesta ya fue
-        validada automáticamente como correcta.
+        validada automáticamente como correcta. `public_state` evita
+        releer el estado si el llamador ya lo tiene.
         """
         try:
-            current_question = self._get_current_question_raw()
+            match = self._load_match()
+            if not match:
+                return False, "No hay un enfrentamiento activo"
+
+            current_question = self._get_current_question_raw(match)
             if not current_question:
                 return False, "No hay una pregunta activa"
 
-            public_state = self.get_public_quiz_state(level=session.get('quiz_firestore_level'))
+            if public_state is None:
+                public_state = self.get_match_public_state(match)
             public_question = public_state.get('question') or {}
 
             if public_question.get('admin_validation_result') != 'correct':
@@ -297,29 +477,17 @@ class QuizService:
             if not team_name:
                 return False, "Debes seleccionar un equipo"
 
-            success_base = self.assign_points(team_name, 1, publish_status=False)
-            if not success_base:
+            if team_name not in match.get('scores', {}):
                 return False, "No se pudo asignar el punto base"
 
-            total_awarded = 1
-
-            if argument_valid:
-                success_extra = self.assign_points(team_name, 1, publish_status=False)
-                if not success_extra:
-                    return False, "No se pudo asignar el punto extra"
-                total_awarded = 2
-
-            session['argument_validation_required'] = False
-            session['show_correct_answer'] = True
-            session['validated_team_name'] = team_name
-            session.modified = True
+            total_awarded = 2 if argument_valid else 1
 
-            updated_scores = session.get('quiz_scores', {}).copy()
+            updated_scores = match.get('scores', {}).copy()
+            updated_scores[team_name] += total_awarded
 
             updated_question = {
                 'id': current_question.get('id'),
-                'image': current_question.get('question_image'),
-                'options': self._normalize_options(current_question.get('options', {})),
+                'content_hash': self.question_content_hash(self.question_content(current_question)),
                 'correct_answer': current_question.get('correct'),
                 'show_correct_answer': True,
                 'selected_answer': selected_answer,
@@ -328,12 +496,29 @@ class QuizService:
                 'validated_team_name': team_name
             }
 
-            self._public_state_ref(level=session.get('quiz_firestore_level')).set({
-                'status': 'answer_revealed',
-                'question': updated_question,
-                'scores': updated_scores,
-                'updated_at': firestore.SERVER_TIMESTAMP
-            }, merge=True)
+            previous_match = {**match, 'scores': match.get('scores', {}).copy()}
+            match['scores'] = updated_scores
+            match['argument_validation_required'] = False
+            match['show_correct_answer'] = True
+            match['validated_team_name'] = team_name
+
+            def commit(batch):
+                self._save_match(match, action='answer_validated', batch=batch)
+                self._set_public_state(self._match_public_state_ref(match), {
+                    'status': 'answer_revealed',
+                    'question': updated_question,
+                    'scores': updated_scores,
+                    'updated_at': SERVER_TIMESTAMP
+                }, merge=True, batch=batch)
+
+            # Puntos del equipo, réplica del enfrentamiento y estado
+            # público en un solo commit
+            try:
+                self.team_service.commit_score_update(team_name, total_awarded, commit)
+            except Exception:
+                # No se aplicó nada en Firestore: la asignación sigue pendiente
+                self._save_match(previous_match, action='answer_validation_failed')
+                raise
 
             if total_awarded == 2:
                 return True, f"Asignación completada: {team_name} recibe 2 puntos."
@@ -341,108 +526,132 @@ class QuizService:
             return True, f"Asignación completada: {team_name} recibe 1 punto."
 
         except Exception as e:
-            print(f"Error en resolve_correct_answer_assignment: {e}")
+            logger.exception("Error en resolve_correct_answer_assignment: %s", e)
             return False, f"Error al completar la asignación: {str(e)}"
 
-    def assign_points(self, team_name, points=1, publish_status=True):
+    def assign_points(self, team_name, points=1, publish_status=True, match=None):
         try:
-            if 'quiz_scores' not in session or team_name not in session['quiz_scores']:
+            match = match if match is not None else self._load_match()
+            if not match or team_name not in match.get('scores', {}):
                 return False
 
             points = int(points)
-            session['quiz_scores'][team_name] += points
-            session.modified = True
 
-            self.team_service.update_team_score(team_name, points)
+            match['scores'][team_name] += points
 
-            if publish_status:
-                self._publish_current_state(
-                    status='answer_revealed',
-                    level=session.get('quiz_firestore_level')
-                )
+            def commit(batch):
+                self._save_match(match, action='points_assigned', batch=batch)
+
+                if publish_status:
+                    self._set_public_state(
+                        self._match_public_state_ref(match),
+                        self._build_public_payload(match, status='answer_revealed'),
+                        batch=batch
+                    )
+                else:
+                    batch.commit()
+
+            # Puntos del equipo, réplica del enfrentamiento y estado
+            # público en un solo commit
+            try:
+                self.team_service.commit_score_update(team_name, points, commit)
+            except Exception:
+                match['scores'][team_name] -= points
+                self._save_match(match, action='points_reverted')
+                raise
 
             return True
 
         except Exception as e:
-            print(f"Error al asignar puntos: {e}")
+            logger.exception("Error al asignar puntos: %s", e)
             return False
 
     def next_question(self):
         try:
-            session['current_question_index'] = session.get('current_question_index', 0) + 1
-            session['question_start_time'] = None
-            session['show_correct_answer'] = False
-            session['last_submitted_answer'] = None
-            session['public_selected_answer'] = None
-            session['admin_validation_result'] = None
-            session['argument_validation_required'] = False
-            session['validated_team_name'] = None
+            match = self._load_match()
+            if not match:
+                return False
 
-            session['question_timer_started_at'] = None
-            session['question_timer_duration'] = 300
+            match['current_question_index'] = match.get('current_question_index', 0) + 1
+            match['question_start_time'] = None
+            match['show_correct_answer'] = False
+            match['last_submitted_answer'] = None
+            match['public_selected_answer'] = None
+            match['admin_validation_result'] = None
+            match['argument_validation_required'] = False
+            match['validated_team_name'] = None
 
-            session.modified = True
+            match['question_timer_started_at'] = None
+            match['question_timer_duration'] = 300
 
-            if self.is_quiz_finished():
+            if self.is_quiz_finished(match):
+                self._save_match(match, action='next_question', status=self.match_store.STATUS_FINISHED)
                 self._publish_current_state(
-                    status='finished',
-                    level=session.get('quiz_firestore_level')
+                    match,
+                    status='finished'
                 )
             else:
-                next_question = self._get_current_question_raw()
+                next_question = self._get_current_question_raw(match)
                 if next_question:
                     next_question['display_options'] = self._normalize_options(
                         next_question.get('options', {})
                     )
 
-                session['question_timer_started_at'] = time.time()
-                session['question_timer_duration'] = 300
-                session.modified = True
+                match['question_timer_started_at'] = time.time()
+                match['question_timer_duration'] = 300
+                self._save_match(match, action='next_question')
 
                 self._publish_current_state(
+                    match,
                     status='in_progress',
-                    question_override=next_question,
-                    level=session.get('quiz_firestore_level')
+                    question_override=next_question
                 )
 
             return True
 
         except Exception as e:
-            print(f"Error al avanzar pregunta: {e}")
+            logger.exception("Error al avanzar pregunta: %s", e)
             return False
 
     def finish_match(self):
         try:
-            session['match_finished_manually'] = True
-            session.modified = True
+            match = self._load_match()
+            if not match:
+                return False
+
+            match['match_finished_manually'] = True
+            self._save_match(match, action='finished', status=self.match_store.STATUS_FINISHED)
 
             self._publish_current_state(
-                status='finished',
-                level=session.get('quiz_firestore_level')
+                match,
+                status='finished'
             )
             return True
 
         except Exception as e:
-            print(f"Error al finalizar enfrentamiento: {e}")
+            logger.exception("Error al finalizar enfrentamiento: %s", e)
             return False
 
-    def is_quiz_finished(self):
+    def is_quiz_finished(self, match=None):
         try:
-            if session.get('match_finished_manually', False):
+            match = match if match is not None else (self._load_match() or {})
+
+            if match.get('match_finished_manually', False):
                 return True
 
-            question_ids = session.get('quiz_question_ids', [])
-            current_index = session.get('current_question_index', 0)
+            question_ids = match.get('question_ids', [])
+            current_index = match.get('current_question_index', 0)
             return current_index >= len(question_ids)
 
         except Exception as e:
-            print(f"Error al verificar fin de quiz: {e}")
+            logger.exception("Error al verificar fin de quiz: %s", e)
             return True
 
-    def get_quiz_results(self):
+    def get_quiz_results(self, match=None):
         try:
-            teams = session.get('quiz_teams', [])
-            scores = session.get('quiz_scores', {})
+            match = match if match is not None else (self._load_match() or {})
+            teams = match.get('teams', [])
+            scores = match.get('scores', {})
 
             results = []
             for team in teams:
@@ -455,77 +664,454 @@ class QuizService:
             return results
 
         except Exception as e:
-            print(f"Error al obtener resultados: {e}")
+            logger.exception("Error al obtener resultados: %s", e)
             return []
 
     def clear_quiz_session(self):
         try:
-            current_level = session.get('quiz_firestore_level')
-
-            quiz_keys = [
-                'quiz_level',
-                'quiz_firestore_level',
-                'quiz_teams',
-                'quiz_round',
-                'quiz_question_ids',
-                'current_question_index',
-                'quiz_scores',
-                'question_start_time',
-                'show_correct_answer',
-                'last_submitted_answer',
-                'public_selected_answer',
-                'admin_validation_result',
-                'argument_validation_required',
-                'validated_team_name',
-                'countdown_started_at',
-                'countdown_duration',
-                'question_timer_started_at',
-                'question_timer_duration',
-                'match_finished_manually'
-            ]
+            match = self._load_match() or {}
 
-            for key in quiz_keys:
-                session.pop(key, None)
+            match_id = session.pop(self.SESSION_MATCH_KEY, None)
+            if match_id:
+                self.match_store.set_status(match_id, self.match_store.STATUS_CLOSED)
 
-            session.modified = True
-            self._clear_public_state(level=current_level)
+            if match:
+                self._clear_public_state(
+                    level=match.get('firestore_level'),
+                    room=match.get('room')
+                )
             return True
 
         except Exception as e:
-            print(f"Error al limpiar sesión: {e}")
+            logger.exception("Error al limpiar sesión: %s", e)
             return False
 
     # ============================================================
-    # Estado público por nivel
+    # Precarga del enfrentamiento
     # ============================================================
 
-    def get_public_quiz_state(self, level=None):
+    def prepare_selection(self, level, round_type='octavos', teams=(), room=None):
+        """
+        Precarga lo que va a leer initialize_quiz mientras el admin
+        termina de elegir en select_level: preguntas de la ronda, lista
+        de equipos y conexión con el estado público de la sala.
+        """
         try:
-            doc = self._public_state_ref(level=level).get()
+            level_map = {
+                "Nivel I": "nivel1",
+                "Nivel II": "nivel2",
+                "Nivel III": "nivel3"
+            }
 
-            if not doc.exists:
-                return self._empty_public_state()
+            firestore_level = level_map.get(level)
+            if not firestore_level:
+                return False, "Nivel no válido"
+
+            round_type = self._normalize_round(round_type)
+
+            room = self.normalize_room(room)
+            if not room:
+                return False, "Sala no válida"
+
+            questions = self.question_service.get_questions_by_level_and_round(
+                firestore_level,
+                round_type
+            )
+
+            for team in teams:
+                if team:
+                    self.team_service.get_team_reference(team)
+
+            self._read_public_state(self._public_state_ref(firestore_level, room))
+
+            return True, f"{len(questions)} preguntas precargadas para {level} en ronda {round_type}"
+
+        except Exception as e:
+            logger.warning("No se pudo precargar la selección: %s", e)
+            return False, f"Error al precargar: {str(e)}"
+
+    def prepare_match(self, match=None):
+        """
+        Precarga lo que necesita el enfrentamiento armado antes de que
+        termine el countdown: las preguntas elegidas, las referencias de
+        los equipos y el payload público de la primera pregunta, que se
+        arma y se descarta.
+
+        Devuelve (success, message, imágenes de las preguntas) para que el
+        navegador del admin las pida antes de necesitarlas.
+        """
+        try:
+            match = match or self._load_match()
+            if not match:
+                return False, "No hay enfrentamiento activo", []
+
+            questions = self.question_service.preload_questions(match.get('question_ids', []))
+
+            for team in match.get('teams', []):
+                self.team_service.get_team_reference(team)
+
+            current_index = match.get('current_question_index', 0)
+            if current_index < len(questions):
+                self._build_public_payload(
+                    match,
+                    status='in_progress',
+                    question_override=questions[current_index]
+                )
+
+            images = [
+                question['question_image']
+                for question in questions
+                if question.get('question_image')
+            ]
 
-            return doc.to_dict() or self._empty_public_state()
+            return True, f"{len(questions)} preguntas precargadas", images
 
         except Exception as e:
-            print(f"Error al obtener estado público del quiz: {e}")
+            logger.warning("No se pudo precargar el enfrentamiento: %s", e)
+            return False, f"Error al precargar: {str(e)}", []
+
+    def _prepare_in_background(self, match):
+        threading.Thread(
+            target=self.prepare_match,
+            args=(match,),
+            name='match-warmup',
+            daemon=True
+        ).start()
+
+    # ============================================================
+    # Estado del enfrentamiento (lado servidor)
+    # ============================================================
+
+    def get_active_match(self):
+        """
+        Devuelve el estado del enfrentamiento del admin actual o None.
+        """
+        return self._load_match()
+
+    def get_resumable_matches(self):
+        """
+        Enfrentamientos sin terminar que se pueden reanudar.
+        """
+        try:
+            return self.match_store.list_resumable()
+
+        except Exception as e:
+            logger.exception("Error al listar enfrentamientos reanudables: %s", e)
+            return []
+
+    def resume_match(self, match_id):
+        """
+        Reanuda un enfrentamiento tras perder la cookie o reiniciar el worker.
+        El estado se reconstruye desde el último snapshot + journal
+        (local o replicado en Firestore) y, si la sala ya no lo muestra,
+        se vuelve a publicar su estado público.
+        """
+        try:
+            if not match_id:
+                return False, "No se indicó el enfrentamiento a reanudar"
+
+            match = self.match_store.restore(match_id)
+            if not match:
+                return False, "No se encontró el enfrentamiento"
+
+            if self._is_room_busy(match.get('firestore_level'), match.get('room'), match_id):
+                return False, "La sala ya tiene otro enfrentamiento en curso"
+
+            session[self.SESSION_MATCH_KEY] = match_id
+
+            public_state = self.get_match_public_state(match)
+            if not public_state.get('live') or public_state.get('match_id') != match_id:
+                self._publish_current_state(
+                    match,
+                    status=self._resume_status(match)
+                )
+
+            return True, "Enfrentamiento reanudado correctamente"
+
+        except Exception as e:
+            logger.exception("Error al reanudar enfrentamiento: %s", e)
+            return False, f"Error al reanudar enfrentamiento: {str(e)}"
+
+    def _resume_status(self, match):
+        if self.is_quiz_finished(match):
+            return 'finished'
+
+        if match.get('question_timer_started_at') is None:
+            return 'countdown'
+
+        if match.get('argument_validation_required'):
+            return 'awaiting_argument_validation'
+
+        if match.get('show_correct_answer'):
+            return 'answer_revealed'
+
+        return 'in_progress'
+
+    def _load_match(self):
+        return self.match_store.get(session.get(self.SESSION_MATCH_KEY))
+
+    def _save_match(self, match, action='update', status=None, batch=None):
+        return self.match_store.save(match.get('match_id'), match, action=action, status=status, batch=batch)
+
+    # ============================================================
+    # Estado público por nivel
+    # ============================================================
+
+    def get_public_quiz_state(self, level=None, room=None):
+        """
+        Las consultas simultáneas de la misma sala comparten una sola
+        lectura (el dict devuelto es compartido: solo lectura).
+
+        Si el repositorio falla (o su circuito está abierto) devuelve el
+        último estado leído de la sala con `stale: True`, así las
+        pantallas no vuelven a "idle" en medio de un enfrentamiento.
+        """
+        ref = self._public_state_ref(level=level, room=room)
+
+        try:
+            return self._public_state_flight.do(ref.path, lambda: self._read_public_state(ref))
+
+        except UnavailableError as e:
+            logger.warning("Estado público no disponible (%s): %s", ref.path, e)
+            return self._stale_public_state(ref)
+
+        except Exception as e:
+            logger.exception("Error al obtener estado público del quiz: %s", e)
+            return self._stale_public_state(ref)
+
+    def _stale_public_state(self, ref):
+        last_good = self._last_good_states.get(ref.path)
+
+        if last_good is None:
             return self._empty_public_state()
 
-    def get_all_public_quiz_states(self):
+        return {**last_good, 'stale': True}
+
+    def get_public_state_update(self, level=None, room=None, since=None):
+        """
+        Estado público para el feed de las pantallas:
+        (estado, versión, patch). patch son los cambios desde la versión
+        `since` (JSON-Patch) o None si hay que enviar el estado completo.
+        """
+        public_state = self.get_public_quiz_state(level=level, room=room)
+
+        # Un estado stale es el último bueno: no es una versión nueva
+        feed_state = public_state
+        if public_state.get('stale'):
+            feed_state = {key: value for key, value in public_state.items() if key != 'stale'}
+
+        version, patch = self.state_feed.update(
+            self._get_public_state_doc_name(level, room),
+            feed_state,
+            since=since
+        )
+        return public_state, version, patch
+
+    def _read_public_state(self, ref):
+        doc = ref.get()
+        state = (doc.to_dict() if doc.exists else None) or self._empty_public_state()
+        self._last_good_states.set(ref.path, state)
+        return state
+
+    def _set_public_state(self, ref, data, merge=False, batch=None):
+        """
+        Con `batch` el estado se agrega a sus escrituras pendientes y se
+        aplica todo junto en un solo commit.
+        """
+        if batch is None:
+            ref.set(data, merge=merge)
+        else:
+            batch.set(ref, data, merge=merge)
+            batch.commit()
+
+        self._public_state_flight.forget(ref.path)
+        self._schedule_question_timer(data)
+
+    # ============================================================
+    # Vencimiento del cronómetro de pregunta (ver services/timer_scheduler.py)
+    # ============================================================
+
+    def _schedule_question_timer(self, public_state):
+        if self.timer_scheduler is None or public_state.get('status') != 'in_progress':
+            return
+
+        timer = public_state.get('question_timer') or {}
+        started_seconds = self._timestamp_seconds(timer.get('started_at'))
+
+        if started_seconds is not None:
+            self.timer_scheduler.schedule(
+                public_state.get('level_key'),
+                public_state.get('room'),
+                started_seconds,
+                timer.get('duration', 300)
+            )
+
+    def running_question_timers(self):
+        """
+        Cronómetros de las salas con pregunta en curso:
+        [(level_key, room, started_at, duration)]
+        """
+        timers = []
+
+        for level_rooms in self.get_live_rooms().values():
+            for state in level_rooms:
+                if state.get('status') != 'in_progress':
+                    continue
+
+                timer = state.get('question_timer') or {}
+                started_seconds = self._timestamp_seconds(timer.get('started_at'))
+
+                if started_seconds is not None:
+                    timers.append((
+                        state.get('level_key'),
+                        state.get('room'),
+                        started_seconds,
+                        timer.get('duration', 300)
+                    ))
+
+        return timers
+
+    def expire_question_timer(self, level, room, started_at):
+        """
+        Pasar la sala a time_expired si sigue en curso con el mismo
+        cronómetro y este ya venció. Devuelve True si cambió el estado.
+        """
+        ref = self._public_state_ref(level=level, room=room)
+
+        def expire(transaction):
+            snapshot = transaction.get(ref)
+            state = snapshot.to_dict() if snapshot.exists else None
+
+            if not state or state.get('status') != 'in_progress':
+                return False
+
+            timer = state.get('question_timer') or {}
+            started_seconds = self._timestamp_seconds(timer.get('started_at'))
+
+            if started_seconds is None or abs(started_seconds - float(started_at)) > 0.001:
+                return False
+
+            if not self._is_question_timer_expired(state):
+                return False
+
+            transaction.update(ref, {
+                'status': 'time_expired',
+                'updated_at': SERVER_TIMESTAMP
+            })
+            return True
+
+        expired = self.db.run_transaction(expire)
+        self._public_state_flight.forget(ref.path)
+        return expired
+
+    # ============================================================
+    # Contenido de la pregunta (inmutable, fuera del estado público)
+    # ============================================================
+
+    def question_content(self, question):
+        """
+        Lo que no cambia mientras la pregunta está en pantalla: imagen y
+        opciones. El estado público solo lleva el id y content_hash; las
+        pantallas lo piden una vez a /quiz/question-content/<id>/<hash>.
+        """
+        return {
+            'id': question.get('id'),
+            'image': question.get('question_image'),
+            'options': self._normalize_options(question.get('options', {}))
+        }
+
+    def question_content_hash(self, content):
+        # Con la clave de la aplicación: sin el estado público no se puede
+        # armar la URL del contenido de una pregunta que aún no salió
+        payload = json.dumps(content, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        return hmac.new(self._content_key, payload, hashlib.sha256).hexdigest()[:20]
+
+    def get_question_content(self, question_id, content_hash):
+        """
+        Contenido de la pregunta si content_hash corresponde a su versión
+        actual; None si no existe o cambió.
+        """
+        question = self.question_service.get_question_by_id(question_id)
+        if not question:
+            return None
+
+        content = self.question_content(question)
+        if not hmac.compare_digest(self.question_content_hash(content), str(content_hash)):
+            return None
+
+        return content
+
+    def with_question_content(self, public_state):
+        """
+        Copia del estado público con imagen y opciones de la pregunta
+        (para el render inicial de versus.html).
+        """
+        question = (public_state or {}).get('question')
+        if not question or not question.get('id'):
+            return public_state
+
+        stored = self.question_service.get_question_by_id(question['id'])
+        if not stored:
+            return public_state
+
+        state = dict(public_state)
+        state['question'] = {**self.question_content(stored), **question}
+        return state
+
+    def get_match_public_state(self, match):
+        return self.get_public_quiz_state(
+            level=match.get('firestore_level'),
+            room=match.get('room')
+        )
+
+    def get_live_rooms(self):
+        """
+        Lista las salas con enfrentamiento publicado en una sola consulta,
+        agrupadas por nivel y ordenadas por sala.
+        """
+        rooms = {'nivel1': [], 'nivel2': [], 'nivel3': []}
+
         try:
-            return {
-                'nivel1': self.get_public_quiz_state(level='nivel1'),
-                'nivel2': self.get_public_quiz_state(level='nivel2'),
-                'nivel3': self.get_public_quiz_state(level='nivel3'),
-            }
+            docs = (
+                self.db.collection(self.PUBLIC_STATE_COLLECTION)
+                .where('live', '==', True)
+                .stream()
+            )
+
+            for doc in docs:
+                state = doc.to_dict() or {}
+                level_key = state.get('level_key')
+
+                if level_key in rooms:
+                    rooms[level_key].append(state)
+
+            for level_rooms in rooms.values():
+                level_rooms.sort(key=lambda state: str(state.get('room') or ''))
+
+            self._last_live_rooms = (time.monotonic(), rooms)
+            return rooms
+
+        except UnavailableError as e:
+            logger.warning("Salas activas no disponibles: %s", e)
+            return self._stale_live_rooms(rooms)
+
         except Exception as e:
-            print(f"Error al obtener todos los estados públicos: {e}")
-            return {
-                'nivel1': self._empty_public_state(),
-                'nivel2': self._empty_public_state(),
-                'nivel3': self._empty_public_state()
-            }
+            logger.exception("Error al obtener salas activas: %s", e)
+            return self._stale_live_rooms(rooms)
+
+    def _stale_live_rooms(self, empty_rooms):
+        """Última lista de salas leída, cada sala con `stale: True`"""
+        if self._last_live_rooms is None:
+            return empty_rooms
+
+        read_at, rooms = self._last_live_rooms
+        if time.monotonic() - read_at > self.STALE_STATE_TTL:
+            return empty_rooms
+
+        return {
+            level_key: [{**state, 'stale': True} for state in level_rooms]
+            for level_key, level_rooms in rooms.items()
+        }
 
     def reset_used_questions_tracking(self, level=None, round_type=None):
         try:
@@ -560,10 +1146,10 @@ class QuizService:
     # Helpers internos
     # ============================================================
 
-    def _get_current_question_raw(self):
+    def _get_current_question_raw(self, match):
         try:
-            question_ids = session.get('quiz_question_ids', [])
-            current_index = session.get('current_question_index', 0)
+            question_ids = match.get('question_ids', [])
+            current_index = match.get('current_question_index', 0)
 
             if current_index >= len(question_ids):
                 return None
@@ -577,7 +1163,7 @@ class QuizService:
             return question
 
         except Exception as e:
-            print(f"Error al obtener pregunta raw: {e}")
+            logger.exception("Error al obtener pregunta raw: %s", e)
             return None
 
     def _normalize_options(self, options):
@@ -622,32 +1208,51 @@ class QuizService:
             return data.get('question_ids', [])
 
         except Exception as e:
-            print(f"Error al obtener preguntas usadas: {e}")
+            logger.exception("Error al obtener preguntas usadas: %s", e)
             return []
 
-    def _mark_questions_as_used(self, firestore_level, round_type, question_ids):
-        try:
-            doc_id = self._used_questions_doc_id(firestore_level, round_type)
-            doc_ref = self.db.collection(self.USED_QUESTIONS_COLLECTION).document(doc_id)
+    def _stage_questions_as_used(self, batch, firestore_level, round_type, question_ids):
+        """Agregar al batch las preguntas usadas (ArrayUnion: sin leer las anteriores)"""
+        doc_id = self._used_questions_doc_id(firestore_level, round_type)
+        doc_ref = self.db.collection(self.USED_QUESTIONS_COLLECTION).document(doc_id)
 
-            existing_ids = set(self._get_used_question_ids(firestore_level, round_type))
-            existing_ids.update(question_ids)
+        batch.set(doc_ref, {
+            'level': firestore_level,
+            'round': round_type,
+            'question_ids': ArrayUnion(question_ids),
+            'updated_at': SERVER_TIMESTAMP
+        }, merge=True)
 
-            doc_ref.set({
-                'level': firestore_level,
-                'round': round_type,
-                'question_ids': list(existing_ids),
-                'updated_at': firestore.SERVER_TIMESTAMP
-            }, merge=True)
+    @classmethod
+    def normalize_room(cls, room):
+        """
+        Devuelve el slug de sala normalizado o None si no es válido.
+        """
+        if not room:
+            return cls.DEFAULT_ROOM
 
-            return True
+        normalized = str(room).strip().lower()
 
-        except Exception as e:
-            print(f"Error al marcar preguntas usadas: {e}")
+        if normalized in cls.RESERVED_ROOMS or not cls.ROOM_PATTERN.match(normalized):
+            return None
+
+        return normalized
+
+    def _is_room_busy(self, firestore_level, room, own_match_id=None):
+        existing = self.get_public_quiz_state(level=firestore_level, room=room)
+        existing_match_id = existing.get('match_id')
+
+        if not existing.get('live') or not existing_match_id:
             return False
 
-    def _get_public_state_doc_name(self, level=None):
-        level_value = level or session.get('quiz_firestore_level')
+        if existing_match_id == own_match_id:
+            return False
+
+        # Un documento vivo de un enfrentamiento que ya no existe no bloquea la sala
+        return self.match_store.get(existing_match_id) is not None
+
+    def _get_public_state_doc_name(self, level=None, room=None):
+        level_value = level
 
         if not level_value:
             return 'general'
@@ -663,41 +1268,131 @@ class QuizService:
             'nivel iii': 'nivel3'
         }
 
-        return level_map.get(normalized, normalized)
+        doc_name = level_map.get(normalized, normalized)
+        room = self.normalize_room(room)
 
-    def _public_state_ref(self, level=None):
-        doc_name = self._get_public_state_doc_name(level)
+        if room and room != self.DEFAULT_ROOM:
+            return f"{doc_name}__{room}"
+
+        return doc_name
+
+    def _public_state_ref(self, level=None, room=None):
+        doc_name = self._get_public_state_doc_name(level, room)
         return self.db.collection(self.PUBLIC_STATE_COLLECTION).document(doc_name)
 
+    def _match_public_state_ref(self, match):
+        return self._public_state_ref(
+            level=match.get('firestore_level'),
+            room=match.get('room')
+        )
+
     def _is_question_timer_expired(self, public_state):
         try:
             timer = public_state.get('question_timer') or {}
-            started_at = timer.get('started_at')
+            started_seconds = self._timestamp_seconds(timer.get('started_at'))
             duration = int(timer.get('duration', 300))
 
-            if started_at is None:
+            if started_seconds is None:
                 return False
 
-            if isinstance(started_at, dict):
-                if '_seconds' in started_at:
-                    started_seconds = started_at['_seconds']
-                elif 'seconds' in started_at:
-                    started_seconds = started_at['seconds']
-                else:
-                    return False
-            else:
-                started_seconds = float(started_at)
-
             elapsed = time.time() - started_seconds
             return elapsed >= duration
 
         except Exception:
             return False
 
+    @staticmethod
+    def _timestamp_seconds(value):
+        """
+        Epoch en segundos de un timestamp del estado público (número,
+        datetime o {'seconds': ...} / {'_seconds': ...}); None si no hay.
+        """
+        if value is None:
+            return None
+
+        if isinstance(value, dict):
+            if '_seconds' in value:
+                return float(value['_seconds'])
+            if 'seconds' in value:
+                return float(value['seconds'])
+            return None
+
+        if hasattr(value, 'timestamp'):
+            return value.timestamp()
+
+        return float(value)
+
+    # ============================================================
+    # Intervalo de consulta de las pantallas
+    # ============================================================
+
+    def recommended_poll_ms(self, public_state, now=None):
+        """
+        Cuánto debería esperar una pantalla antes de volver a consultar
+        el estado: corto cerca del fin de un contador, largo en idle
+        (y más largo si la sala lleva mucho tiempo sin cambios), con
+        jitter para que las pantallas no consulten todas a la vez.
+        """
+        now = time.time() if now is None else now
+        state = public_state or {}
+        status = state.get('status') or 'idle'
+
+        try:
+            if state.get('stale'):
+                delay = self.POLL_STALE_MS
+
+            elif status == 'countdown':
+                countdown = state.get('countdown') or {}
+                delay = self._delay_until_deadline(
+                    countdown.get('started_at'), countdown.get('duration'), now
+                )
+
+            elif status == 'in_progress':
+                timer = state.get('question_timer') or {}
+                delay = self._delay_until_deadline(
+                    timer.get('started_at'), timer.get('duration'), now
+                )
+
+            elif status == 'finished':
+                delay = self.POLL_FINISHED_MS
+
+            elif status == 'idle' or not state.get('live', True):
+                updated_at = self._timestamp_seconds(state.get('updated_at'))
+                dormant = updated_at is None or now - updated_at > self.POLL_DORMANT_AFTER
+                delay = self.POLL_DORMANT_MS if dormant else self.POLL_IDLE_MS
+
+            else:
+                delay = self.POLL_ACTIVE_MS
+
+        except (TypeError, ValueError):
+            delay = self.POLL_ACTIVE_MS
+
+        return self.jitter_poll_ms(delay)
+
+    def _delay_until_deadline(self, started_at, duration, now):
+        started_seconds = self._timestamp_seconds(started_at)
+        if started_seconds is None:
+            return self.POLL_ACTIVE_MS
+
+        remaining = started_seconds + float(duration or 0) - now
+
+        if remaining > self.POLL_FAST_WINDOW or remaining < -self.POLL_FAST_WINDOW:
+            return self.POLL_ACTIVE_MS
+
+        # Consultar justo al terminar el contador y rápido un rato después
+        return min(max(remaining * 1000, self.POLL_FAST_MS), self.POLL_ACTIVE_MS)
+
+    def jitter_poll_ms(self, delay):
+        return int(delay * random.uniform(1 - self.POLL_JITTER, 1 + self.POLL_JITTER))
+
     def _empty_public_state(self):
         return {
+            'match_id': None,
+            'live': False,
             'status': 'idle',
             'level': None,
+            'level_key': None,
+            'room': None,
             'round': None,
             'teams': [],
             'scores': {},
@@ -716,27 +1411,28 @@ class QuizService:
             'updated_at': None
         }
 
-    def _build_public_payload(self, status='idle', question_override=None):
-        teams = session.get('quiz_teams', [])
-        scores = session.get('quiz_scores', {})
-        level = session.get('quiz_level')
-        round_type = session.get('quiz_round')
-        current_index = session.get('current_question_index', 0)
-        question_ids = session.get('quiz_question_ids', [])
+    def _build_public_payload(self, match, status='idle', question_override=None):
+        teams = match.get('teams', [])
+        scores = match.get('scores', {})
+        level = match.get('level')
+        round_type = match.get('round')
+        current_index = match.get('current_question_index', 0)
+        question_ids = match.get('question_ids', [])
         total_questions = len(question_ids)
 
-        countdown_started_at = session.get('countdown_started_at')
-        countdown_duration = session.get('countdown_duration', 0)
+        countdown_started_at = match.get('countdown_started_at')
+        countdown_duration = match.get('countdown_duration', 0)
 
-        question_timer_started_at = session.get('question_timer_started_at')
-        question_timer_duration = session.get('question_timer_duration', 300)
+        question_timer_started_at = match.get('question_timer_started_at')
+        question_timer_duration = match.get('question_timer_duration', 300)
 
         if status == 'countdown':
             question = None
         else:
-            question = question_override or self._get_current_question_raw()
+            question = question_override or self._get_current_question_raw(match)
 
-        existing_state = self.get_public_quiz_state(level=session.get('quiz_firestore_level'))
+        # Sin pregunta (countdown) no hay nada que conservar del estado anterior
+        existing_state = self.get_match_public_state(match) if question else {}
         existing_question = existing_state.get('question') or {}
 
         question_payload = None
@@ -765,12 +1461,12 @@ class QuizService:
                         'duration': question_timer_duration
                     }
             else:
-                selected_answer = session.get('public_selected_answer')
-                admin_validation_result = session.get('admin_validation_result')
-                argument_validation_required = session.get('argument_validation_required', False)
-                show_correct_answer = session.get('show_correct_answer', False)
+                selected_answer = match.get('public_selected_answer')
+                admin_validation_result = match.get('admin_validation_result')
+                argument_validation_required = match.get('argument_validation_required', False)
+                show_correct_answer = match.get('show_correct_answer', False)
                 correct_answer = question.get('correct') if show_correct_answer else None
-                validated_team_name = session.get('validated_team_name')
+                validated_team_name = match.get('validated_team_name')
 
                 public_question_timer = {
                     'started_at': question_timer_started_at,
@@ -779,8 +1475,7 @@ class QuizService:
 
             question_payload = {
                 'id': question.get('id'),
-                'image': question.get('question_image'),
-                'options': self._normalize_options(question.get('options', {})),
+                'content_hash': self.question_content_hash(self.question_content(question)),
                 'correct_answer': correct_answer,
                 'show_correct_answer': show_correct_answer,
                 'selected_answer': selected_answer,
@@ -795,8 +1490,12 @@ class QuizService:
             }
 
         payload = {
+            'match_id': match.get('match_id'),
+            'live': True,
             'status': status,
             'level': level,
+            'level_key': match.get('firestore_level'),
+            'room': match.get('room', self.DEFAULT_ROOM),
             'round': round_type,
             'teams': teams,
             'scores': scores,
@@ -813,29 +1512,45 @@ class QuizService:
             },
             'question_timer': public_question_timer,
             'question': question_payload,
-            'updated_at': firestore.SERVER_TIMESTAMP
+            'updated_at': SERVER_TIMESTAMP
         }
 
+        if match.get('audience_voting'):
+            question_id = question_payload.get('id') if question_payload else None
+            existing_votes = existing_state.get('votes') or {}
+
+            payload['audience_voting'] = True
+            payload['votes'] = (
+                existing_votes
+                if question_id and existing_votes.get('question_id') == question_id
+                else empty_tally(question_id)
+            )
+
         return payload
 
-    def _publish_current_state(self, status='in_progress', question_override=None, level=None):
+    def _publish_current_state(self, match, status='in_progress', question_override=None, batch=None):
         try:
             payload = self._build_public_payload(
+                match,
                 status=status,
                 question_override=question_override
             )
-            self._public_state_ref(level=level).set(payload, merge=False)
+            self._set_public_state(self._match_public_state_ref(match), payload, merge=False, batch=batch)
             return True
 
         except Exception as e:
-            print(f"Error al publicar estado actual del quiz: {e}")
+            logger.exception("Error al publicar estado actual del quiz: %s", e)
             return False
 
-    def _clear_public_state(self, level=None):
+    def _clear_public_state(self, level=None, room=None):
         try:
-            self._public_state_ref(level=level).set({
+            self._set_public_state(self._public_state_ref(level=level, room=room), {
+                'match_id': None,
+                'live': False,
                 'status': 'idle',
                 'level': None,
+                'level_key': None,
+                'room': None,
                 'round': None,
                 'teams': [],
                 'scores': {},
@@ -851,11 +1566,11 @@ class QuizService:
                     'duration': 300
                 },
                 'question': None,
-                'updated_at': firestore.SERVER_TIMESTAMP
+                'updated_at': SERVER_TIMESTAMP
             }, merge=False)
 
             return True
 
         except Exception as e:
-            print(f"Error al limpiar estado público del quiz: {e}")
+            logger.exception("Error al limpiar estado público del quiz: %s", e)
             return False
\ No newline at end of file
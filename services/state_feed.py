@@ -0,0 +1,122 @@
+"""
+Feed del estado público con deltas.
+
+Cada pantalla manda la versión que tiene (`?since=`) y recibe solo los
+cambios desde esa versión en formato JSON-Patch (RFC 6902: add, remove,
+replace) en lugar del estado completo. Si la versión ya no está en el
+buffer, o el patch pesaría más que el estado, recibe el estado completo.
+
+La versión es un hash del contenido del documento: la misma en todos
+los workers sin escribir contadores en Firestore. Cada worker guarda en
+memoria las últimas versiones que leyó de cada sala (ring buffer); si
+la pantalla cambia de worker y este no tiene su versión, recibe el
+estado completo una vez.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict, deque
+
+
+def state_version(state):
+    payload = json.dumps(state, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def _escape_pointer(key):
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def make_patch(old, new, path=''):
+    """
+    Operaciones JSON-Patch que llevan de old a new. Los dicts se comparan
+    campo por campo; listas y demás valores se reemplazan enteros.
+    """
+    if old == new:
+        return []
+
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return [{'op': 'replace', 'path': path, 'value': new}]
+
+    operations = []
+
+    for key in old:
+        if key not in new:
+            operations.append({'op': 'remove', 'path': f"{path}/{_escape_pointer(key)}"})
+
+    for key, value in new.items():
+        child = f"{path}/{_escape_pointer(key)}"
+
+        if key not in old:
+            operations.append({'op': 'add', 'path': child, 'value': value})
+        else:
+            operations.extend(make_patch(old[key], value, child))
+
+    return operations
+
+
+class PublicStateFeed:
+    """Últimas versiones del estado público de cada sala"""
+
+    MAX_KEYS = 64
+
+    def __init__(self, size=16):
+        self.size = size
+        self._history = OrderedDict()
+        self._lock = threading.Lock()
+        self.patches = 0
+        self.snapshots = 0
+
+    def update(self, key, state, since=None):
+        """
+        Registrar el estado leído de la sala `key` y devolver
+        (versión, patch): patch son los cambios desde `since`, o None si
+        hay que enviar el estado completo.
+        """
+        version = state_version(state)
+
+        with self._lock:
+            history = self._history.get(key)
+            if history is None:
+                history = self._history[key] = deque(maxlen=self.size)
+                while len(self._history) > self.MAX_KEYS:
+                    self._history.popitem(last=False)
+            self._history.move_to_end(key)
+
+            if not history or history[-1][0] != version:
+                history.append((version, state))
+
+            previous = None
+            if since:
+                for held_version, held_state in history:
+                    if held_version == since:
+                        previous = held_state
+                        break
+
+        patch = None
+        if previous is not None:
+            # El diff se arma fuera del lock: los estados del buffer no se modifican
+            patch = make_patch(previous, state)
+            if patch and self._size(patch) >= self._size(state):
+                patch = None
+
+        with self._lock:
+            if patch is None:
+                self.snapshots += 1
+            else:
+                self.patches += 1
+
+        return version, patch
+
+    @staticmethod
+    def _size(value):
+        return len(json.dumps(value, ensure_ascii=False, default=str))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rooms': len(self._history),
+                'patches': self.patches,
+                'snapshots': self.snapshots
+            }
@@ -2,43 +2,78 @@
 Servicio para gestión de equipos
 Olimpiadas Matemáticas - Tuluá
 """
-from firebase_admin import firestore
+import logging
+
+from repositories import Increment, NotFoundError
+from utils.cache import LRUCache
+from utils.singleflight import SingleFlight
+
+
+logger = logging.getLogger(__name__)
 
 
 class TeamService:
-    """Servicio para operaciones con equipos"""
+    """Servicio para operaciones con equipos (compartido entre threads)"""
+
+    CACHE_TTL = 30
 
     def __init__(self, db):
         self.db = db
-        self.cache = {}
-        self.cache_timestamp = 0
+        self.cache = LRUCache(maxsize=16, ttl=self.CACHE_TTL, name='teams')
+        self._flight = SingleFlight('teams')
+        self._team_ids = {}
 
     def get_all_teams(self, use_cache=True):
         """Obtener todos los equipos"""
-        import time
-
         # Usar caché si está disponible y tiene menos de 30 segundos
-        if use_cache and self.cache and (time.time() - self.cache_timestamp < 30):
-            return self.cache.get('teams', [])
+        if use_cache:
+            teams = self.cache.get('teams')
+            if teams is not None:
+                return teams
 
         try:
-            teams_ref = self.db.collection('teams')
-            teams = []
-
-            for doc in teams_ref.stream():
-                team = doc.to_dict()
-                team['id'] = doc.id
-                teams.append(team)
+            # Los pedidos simultáneos comparten una sola lectura
+            teams = self._flight.do('teams', self._load_teams)
 
             # Actualizar caché
-            self.cache['teams'] = teams
-            self.cache_timestamp = time.time()
+            self.cache.set('teams', teams)
             return teams
 
         except Exception as e:
-            print(f"Error al obtener equipos: {e}")
+            logger.exception("Error al obtener equipos: %s", e)
             return []
 
+    def _load_teams(self):
+        teams = []
+        team_ids = {}
+
+        for doc in self.db.collection('teams').stream():
+            team = doc.to_dict()
+            team['id'] = doc.id
+            teams.append(team)
+            team_ids.setdefault(team.get('name'), doc.id)
+
+        self._team_ids = team_ids
+        return teams
+
+    def get_team_reference(self, team_name):
+        """
+        Referencia al documento del equipo, con el id tomado de la lista
+        de equipos ya leída (sin consultar por nombre en cada punto).
+        """
+        team_id = self._team_ids.get(team_name)
+
+        if team_id is None:
+            team_id = next(
+                (team['id'] for team in self.get_all_teams() if team.get('name') == team_name),
+                None
+            )
+
+        if team_id is None:
+            return None
+
+        return self.db.collection('teams').document(team_id)
+
     def add_team(self, name, level):
         """Agregar un nuevo equipo"""
         try:
@@ -60,7 +95,7 @@ class TeamService:
             teams_ref.add(team_data)
 
             # Limpiar caché
-            self.cache.clear()
+            self._clear_cache()
             return True, "Equipo agregado correctamente"
 
         except Exception as e:
@@ -76,7 +111,7 @@ class TeamService:
             })
 
             # Limpiar caché
-            self.cache.clear()
+            self._clear_cache()
             return True, "Equipo actualizado correctamente"
 
         except Exception as e:
@@ -89,7 +124,7 @@ class TeamService:
             team_ref.delete()
 
             # Limpiar caché
-            self.cache.clear()
+            self._clear_cache()
             return True, "Equipo eliminado correctamente"
 
         except Exception as e:
@@ -119,7 +154,7 @@ class TeamService:
                 batch.commit()
 
             # Limpiar caché
-            self.cache.clear()
+            self._clear_cache()
             return True, f"Puntajes reiniciados correctamente ({count} equipos)"
 
         except Exception as e:
@@ -146,7 +181,7 @@ class TeamService:
             })
 
             # Limpiar caché
-            self.cache.clear()
+            self._clear_cache()
 
             team_data = team_doc.to_dict() or {}
             team_name = team_data.get('name', 'Equipo')
@@ -159,28 +194,74 @@ class TeamService:
     def update_team_score(self, team_name, points):
         """Actualizar el score de un equipo sumando puntos"""
         try:
-            teams_ref = self.db.collection('teams')
-            query = teams_ref.where('name', '==', team_name).limit(1).stream()
+            self.commit_score_update(team_name, points)
+            return True
 
-            for doc in query:
-                team_data = doc.to_dict()
-                current_score = team_data.get('score', 0)
-                current_total = team_data.get('total_score', 0)
+        except ValueError:
+            return False
 
-                new_score = current_score + points
-                new_total = current_total + points
+        except Exception as e:
+            logger.exception("Error al actualizar score: %s", e)
+            self._clear_cache()
+            return False
 
-                doc.reference.update({
-                    'score': new_score,
-                    'total_score': new_total
-                })
+    def commit_score_update(self, team_name, points, commit=None):
+        """
+        Sumar puntos al equipo en un batch junto con lo que agregue
+        commit(batch), que además hace el commit (por defecto solo el
+        commit).
+
+        El id del equipo sale de la lista en caché de este worker; si
+        quedó viejo (equipo renombrado o borrado en otro worker) el commit
+        falla con NotFoundError sin aplicar nada: se vuelve a leer la
+        lista y se reintenta una vez. ValueError si el equipo no existe.
+        """
+        commit = commit or (lambda batch: batch.commit())
 
-                # Limpiar caché
-                self.cache.clear()
-                return True
+        for attempt in (1, 2):
+            batch = self.db.batch()
 
+            if not self.stage_score_update(batch, team_name, points):
+                if attempt == 2:
+                    raise ValueError(f"El equipo {team_name} no existe")
+                self._clear_cache()
+                continue
+
+            try:
+                commit(batch)
+            except NotFoundError:
+                if attempt == 2:
+                    raise
+                logger.warning("Id en caché del equipo %s desactualizado: se relee la lista", team_name)
+                self._clear_cache()
+                continue
+
+            self.scores_committed()
+            return
+
+    def stage_score_update(self, batch, team_name, points):
+        """
+        Agregar al batch la suma de puntos del equipo (Increment: sin
+        leer el puntaje actual). Después del commit hay que llamar a
+        scores_committed(). Devuelve False si el equipo no existe.
+        """
+        team_ref = self.get_team_reference(team_name)
+        if team_ref is None:
             return False
 
-        except Exception as e:
-            print(f"Error al actualizar score: {e}")
-            return False
\ No newline at end of file
+        batch.update(team_ref, {
+            'score': Increment(points),
+            'total_score': Increment(points)
+        })
+        return True
+
+    def scores_committed(self):
+        # Los ids no cambian al sumar puntos: solo se descartan los puntajes
+        self._clear_cache(keep_ids=True)
+
+    def _clear_cache(self, keep_ids=False):
+        self.cache.clear()
+        self._flight.forget('teams')
+
+        if not keep_ids:
+            self._team_ids = {}
@@ -0,0 +1,160 @@
+"""
+Vencimiento de los cronómetros de pregunta desde el servidor.
+
+Cuando se publica una pregunta en curso se agenda su vencimiento
+(question_timer.started_at + duration). Un hilo de fondo duerme hasta el
+próximo vencimiento y pasa la sala a `time_expired` (ver
+QuizService.expire_question_timer), así el cambio de estado no depende
+de que una pantalla o el admin consulte justo en ese momento.
+
+Cada worker de gunicorn tiene su propio planificador. Además de lo que
+agenda el propio worker, cada `rescan_interval` segundos se releen las
+salas activas: así se agendan los cronómetros publicados por otros
+workers o antes de un reinicio. El vencimiento se aplica en una
+transacción que solo cambia la sala si sigue en la misma pregunta, así
+que varios workers venciendo el mismo cronómetro no se pisan.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionTimerScheduler:
+    """
+    expire(level_key, room, started_at): vence el cronómetro si sigue vigente
+    running_timers(): [(level_key, room, started_at, duration)] de las salas
+        con pregunta en curso
+    """
+
+    def __init__(self, expire, running_timers=None, rescan_interval=30):
+        self.expire = expire
+        self.running_timers = running_timers
+        self.rescan_interval = rescan_interval
+        self._heap = []
+        self._scheduled = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self.expired = 0
+
+    def schedule(self, level_key, room, started_at, duration):
+        """
+        Agendar (o reemplazar) el vencimiento del cronómetro de una sala.
+        """
+        try:
+            deadline = float(started_at) + float(duration)
+        except (TypeError, ValueError):
+            return False
+
+        key = (level_key, room)
+
+        with self._condition:
+            if self._scheduled.get(key) == (started_at, deadline):
+                return True
+
+            self._scheduled[key] = (started_at, deadline)
+            heapq.heappush(self._heap, (deadline, next(self._sequence), key, started_at))
+            self._condition.notify()
+
+        self.start()
+        return True
+
+    def cancel(self, level_key, room):
+        with self._condition:
+            # La entrada del heap se descarta al salir (ya no coincide)
+            self._scheduled.pop((level_key, room), None)
+
+    def pending(self):
+        with self._condition:
+            return len(self._scheduled)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._condition:
+                if self._thread is None or not self._thread.is_alive():
+                    self._stopped = False
+                    self._thread = threading.Thread(
+                        target=self._run,
+                        name='question-timers',
+                        daemon=True
+                    )
+                    self._thread.start()
+
+        return self._thread
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def reset_after_fork(self):
+        # El hilo no sobrevive al fork y el Condition heredado puede tener
+        # su lock tomado
+        self._heap = []
+        self._scheduled = {}
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def _run(self):
+        next_rescan = time.monotonic() if self.running_timers else None
+
+        while True:
+            if next_rescan is not None and time.monotonic() >= next_rescan:
+                self._rescan()
+                next_rescan = time.monotonic() + self.rescan_interval
+
+            due = self._wait_for_due(next_rescan)
+            if due is None:
+                return
+
+            for key, started_at in due:
+                try:
+                    if self.expire(key[0], key[1], started_at):
+                        self.expired += 1
+                except Exception as e:
+                    logger.exception("Error al vencer el cronómetro de %s/%s: %s", key[0], key[1], e)
+
+    def _wait_for_due(self, next_rescan):
+        """
+        Esperar al próximo vencimiento (o al próximo repaso de salas) y
+        devolver los cronómetros vencidos; None si se detuvo.
+        """
+        with self._condition:
+            while not self._stopped:
+                now = time.time()
+                due = []
+
+                while self._heap and self._heap[0][0] <= now:
+                    deadline, _sequence, key, started_at = heapq.heappop(self._heap)
+                    if self._scheduled.get(key) == (started_at, deadline):
+                        del self._scheduled[key]
+                        due.append((key, started_at))
+
+                if due:
+                    return due
+
+                timeout = self._heap[0][0] - now if self._heap else None
+                if next_rescan is not None:
+                    until_rescan = next_rescan - time.monotonic()
+                    if until_rescan <= 0:
+                        return []
+                    timeout = until_rescan if timeout is None else min(timeout, until_rescan)
+
+                self._condition.wait(timeout)
+
+        return None
+
+    def _rescan(self):
+        try:
+            for level_key, room, started_at, duration in self.running_timers():
+                self.schedule(level_key, room, started_at, duration)
+        except Exception as e:
+            logger.warning("No se pudieron releer los cronómetros activos: %s", e)
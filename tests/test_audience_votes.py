@@ -0,0 +1,50 @@
+import atexit
+
+from repositories.memory import MemoryRepository
+from services.audience_votes import AudienceVoteAggregator
+
+
+def make_aggregator(repository, published):
+    def publish(state_doc, tally, transaction):
+        published.append((state_doc, tally))
+
+    return AudienceVoteAggregator(repository, publish, flush_interval=60)
+
+
+def test_one_vote_per_device_and_tally_across_shards():
+    repository = MemoryRepository()
+    published = []
+    first = make_aggregator(repository, published)
+    second = make_aggregator(repository, published)
+
+    assert first.add('nivel1', 'q1', 'dev1', 'a')
+    assert not first.add('nivel1', 'q1', 'dev1', 'b')
+    assert first.add('nivel1', 'q1', 'dev2', 'b')
+    # El mismo dispositivo en otro worker cuenta una vez
+    assert second.add('nivel1', 'q1', 'dev1', 'c')
+    assert second.add('nivel1', 'q1', 'dev3', 'c')
+
+    assert first.flush() == 1
+    assert second.flush() == 1
+    assert first.flush() == 0
+
+    state_doc, tally = published[-1]
+    assert state_doc == 'nivel1'
+    assert tally['total'] == 3
+    # dev1 queda con el voto del primer shard por id
+    assert tally['counts']['a'] + tally['counts']['c'] == 2
+    assert tally['counts']['b'] == 1
+    assert first.stats() == {'questions': 1, 'accepted': 2, 'duplicates': 1, 'flushes': 1}
+
+
+def test_exit_hook_is_registered_once(monkeypatch):
+    registered = []
+    monkeypatch.setattr(atexit, 'register', registered.append)
+    aggregator = make_aggregator(MemoryRepository(), [])
+
+    aggregator.start()
+    # Hilo heredado de un fork: ya no está vivo y se vuelve a crear
+    aggregator._thread = None
+    aggregator.start()
+
+    assert registered == [aggregator._flush_at_exit]
@@ -0,0 +1,192 @@
+import pytest
+from google.api_core import exceptions as api_exceptions
+
+from repositories.base import NotFoundError, UnavailableError
+from repositories.circuit_breaker import CircuitBreaker, CircuitBreakerRepository, is_unavailability_error
+from repositories.memory import MemoryRepository
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def fail(error):
+    def function():
+        raise error
+    return function
+
+
+def ok():
+    return 'ok'
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker('test', failure_threshold=3, reset_timeout=10, clock=clock)
+
+
+def trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(api_exceptions.ServiceUnavailable):
+            breaker.call(fail(api_exceptions.ServiceUnavailable('caído')))
+
+
+def test_opens_after_threshold_and_rejects_without_calling(breaker):
+    trip(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    calls = []
+    with pytest.raises(UnavailableError):
+        breaker.call(lambda: calls.append(1))
+
+    assert calls == []
+    assert breaker.stats()['rejected'] == 1
+    assert breaker.stats()['trips'] == 1
+
+
+def test_success_resets_failure_count(breaker):
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            breaker.call(fail(TimeoutError()))
+
+    assert breaker.call(ok) == 'ok'
+    assert breaker.failures == 0
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_allows_a_single_probe(breaker, clock):
+    trip(breaker)
+    clock.now = 10
+
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    # Mientras la prueba está en curso el resto se rechaza
+    with pytest.raises(UnavailableError):
+        breaker.before_call()
+
+
+def test_half_open_probe_success_closes(breaker, clock):
+    trip(breaker)
+    clock.now = 10
+
+    assert breaker.call(ok) == 'ok'
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+
+
+def test_half_open_probe_failure_reopens(breaker, clock):
+    trip(breaker)
+    clock.now = 10
+
+    with pytest.raises(ConnectionError):
+        breaker.call(fail(ConnectionError()))
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opened_at == 10
+    assert breaker.stats()['trips'] == 1
+
+    with pytest.raises(UnavailableError):
+        breaker.call(ok)
+
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = CircuitBreaker('slow', failure_threshold=1, reset_timeout=10, deadline=0.5, clock=clock)
+
+    breaker.record(0.6)
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.mark.parametrize('error', [
+    ValueError('lógica'),
+    api_exceptions.InvalidArgument('argumento'),
+    api_exceptions.FailedPrecondition('precondición'),
+    api_exceptions.Aborted('contención'),
+])
+def test_logic_errors_do_not_count(breaker, error):
+    for _ in range(breaker.failure_threshold + 1):
+        with pytest.raises(type(error)):
+            breaker.call(fail(error))
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+
+
+def test_logic_error_releases_half_open_probe(breaker, clock):
+    trip(breaker)
+    clock.now = 10
+
+    with pytest.raises(ValueError):
+        breaker.call(fail(ValueError()))
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.call(ok) == 'ok'
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_not_found_counts_as_response(breaker):
+    with pytest.raises(TimeoutError):
+        breaker.call(fail(TimeoutError()))
+
+    with pytest.raises(NotFoundError):
+        breaker.call(fail(NotFoundError('no existe')))
+
+    assert breaker.failures == 0
+
+
+@pytest.mark.parametrize('error, expected', [
+    (api_exceptions.ServiceUnavailable('x'), True),
+    (api_exceptions.DeadlineExceeded('x'), True),
+    (api_exceptions.InternalServerError('x'), True),
+    (TimeoutError(), True),
+    (ConnectionResetError(), True),
+    (UnavailableError(), True),
+    (api_exceptions.InvalidArgument('x'), False),
+    (api_exceptions.Aborted('x'), False),
+    (KeyError('x'), False),
+])
+def test_is_unavailability_error(error, expected):
+    assert is_unavailability_error(error) is expected
+
+
+def test_transaction_is_a_single_half_open_probe(breaker, clock):
+    repository = CircuitBreakerRepository(MemoryRepository(), breaker)
+    ref = repository.collection('votes').document('sala1')
+    ref.set({'A': 1})
+
+    trip(breaker)
+    clock.now = 10
+
+    def tally(transaction):
+        votes = transaction.get(ref).to_dict()
+        transaction.update(ref, {'A': votes['A'] + 1})
+        return votes['A'] + 1
+
+    assert repository.run_transaction(tally) == 2
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert ref.get().to_dict() == {'A': 2}
+
+
+def test_transaction_failure_reopens_once(breaker, clock):
+    repository = CircuitBreakerRepository(MemoryRepository(), breaker)
+    trip(breaker)
+    clock.now = 10
+
+    def down(transaction):
+        raise ConnectionError('sin red')
+
+    with pytest.raises(ConnectionError):
+        repository.run_transaction(down)
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.failures == breaker.failure_threshold + 1
@@ -0,0 +1,147 @@
+import copy
+
+import pytest
+
+from repositories.memory import MemoryRepository
+from services.match_store import FirestoreJournalMirror, MatchStore
+
+
+class MemoryMirror(FirestoreJournalMirror):
+    def __init__(self, repository):
+        self.repository = repository
+
+    @property
+    def db(self):
+        return self.repository
+
+
+class FlakyRepository(MemoryRepository):
+    def __init__(self):
+        super().__init__()
+        self.fail_commits = 0
+
+    def _commit(self, writes):
+        if self.fail_commits:
+            self.fail_commits -= 1
+            raise ConnectionError('sin red')
+        return super()._commit(writes)
+
+
+@pytest.fixture
+def repository():
+    return FlakyRepository()
+
+
+@pytest.fixture
+def store(tmp_path, repository):
+    return MatchStore(str(tmp_path / 'matches.db'), mirror=MemoryMirror(repository))
+
+
+def fresh_store(tmp_path, repository, name='other.db'):
+    return MatchStore(str(tmp_path / name), mirror=MemoryMirror(repository))
+
+
+def play(store, match_id, data, steps):
+    for index in range(steps):
+        data['current_question_index'] = index
+        data['scores']['A'] += 1
+        store.save(match_id, copy.deepcopy(data), action='step')
+    return data
+
+
+def test_rebuild_from_snapshot_and_journal_tail(tmp_path, store, monkeypatch):
+    monkeypatch.setattr(MatchStore, 'SNAPSHOT_EVERY', 5)
+    data = {'teams': ['A', 'B'], 'scores': {'A': 0, 'B': 0}, 'extra': 1}
+    match_id = store.create(copy.deepcopy(data))
+
+    data = play(store, match_id, data, 12)
+    del data['extra']
+    store.save(match_id, copy.deepcopy(data), action='unset')
+
+    # Otro proceso, sin la caché en memoria: snapshot + cola del journal
+    other = MatchStore(store.db_path)
+    rebuilt = other.get(match_id)
+
+    assert rebuilt == {**data, 'match_id': match_id}
+    version, snapshot_seq = other._connect().execute(
+        f"SELECT version, snapshot_seq FROM {MatchStore.TABLE} WHERE match_id = ?", (match_id,)
+    ).fetchone()
+    assert version == 14
+    assert snapshot_seq == 11
+
+
+def test_restore_from_mirror(tmp_path, store, repository):
+    data = {'teams': ['A', 'B'], 'scores': {'A': 0, 'B': 0}}
+    match_id = store.create(copy.deepcopy(data))
+    data = play(store, match_id, data, 4)
+
+    restored = fresh_store(tmp_path, repository).restore(match_id)
+
+    assert restored == {**data, 'match_id': match_id}
+
+
+def test_failed_mirror_forces_snapshot_on_next_append(tmp_path, store, repository):
+    data = {'teams': ['A', 'B'], 'scores': {'A': 0, 'B': 0}}
+    match_id = store.create(copy.deepcopy(data))
+    data = play(store, match_id, data, 2)
+
+    repository.fail_commits = 1
+    data = play(store, match_id, data, 1)  # entrada 4 sin replicar
+    data = play(store, match_id, data, 2)
+
+    header = repository.collection('match_journal').document(match_id).get().to_dict()
+    assert header['snapshot_seq'] == 5
+
+    restored = fresh_store(tmp_path, repository).restore(match_id)
+    assert restored == {**data, 'match_id': match_id}
+
+
+def test_failed_batch_commit_forces_snapshot(tmp_path, store, repository):
+    data = {'teams': ['A', 'B'], 'scores': {'A': 0, 'B': 0}}
+    match_id = store.create(copy.deepcopy(data))
+
+    batch = repository.batch()
+    data['current_question_index'] = 1
+    store.save(match_id, copy.deepcopy(data), batch=batch)
+    repository.fail_commits = 1
+    with pytest.raises(ConnectionError):
+        batch.commit()
+
+    data['scores']['B'] = 3
+    store.save(match_id, copy.deepcopy(data))
+
+    restored = fresh_store(tmp_path, repository).restore(match_id)
+    assert restored == {**data, 'match_id': match_id}
+
+
+def test_mirror_rebuild_stops_at_gap(repository):
+    mirror = MemoryMirror(repository)
+    header = repository.collection('match_journal').document('m1')
+    header.set({'snapshot': {'score': 0}, 'snapshot_seq': 1, 'status': 'active'})
+
+    entries = header.collection('entries')
+    entries.document('00000002').set({'seq': 2, 'changes': {'set': {'score': 1}}})
+    entries.document('00000004').set({'seq': 4, 'changes': {'set': {'score': 3}}})
+
+    version, status, data = mirror.rebuild('m1', MatchStore._apply)
+
+    assert version == 2
+    assert status == 'active'
+    assert data == {'score': 1}
+
+
+def test_snapshot_replaces_removed_keys_in_mirror(tmp_path, store, repository, monkeypatch):
+    monkeypatch.setattr(MatchStore, 'SNAPSHOT_EVERY', 2)
+    data = {'teams': ['A', 'B'], 'scores': {'A': 0, 'B': 0}, 'extra': {'flag': True}}
+    match_id = store.create(copy.deepcopy(data))
+    data = play(store, match_id, data, 2)
+
+    del data['extra']
+    data = play(store, match_id, data, 2)
+
+    header = repository.collection('match_journal').document(match_id).get().to_dict()
+    assert 'extra' not in header['snapshot']
+    assert header['snapshot_seq'] == header['version']
+
+    restored = fresh_store(tmp_path, repository).restore(match_id)
+    assert restored == {**data, 'match_id': match_id}
@@ -0,0 +1,54 @@
+import pytest
+from flask import Flask
+from flask_login import LoginManager, UserMixin, login_user
+
+from routes.metrics_routes import metrics_bp
+
+
+class Admin(UserMixin):
+    id = 'admin'
+
+
+def make_app(token=None):
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', METRICS_TOKEN=token)
+
+    login_manager = LoginManager(app)
+    login_manager.user_loader(lambda user_id: Admin() if user_id == 'admin' else None)
+
+    app.register_blueprint(metrics_bp)
+
+    @app.route('/login')
+    def login():
+        login_user(Admin())
+        return ''
+
+    return app
+
+
+def test_denied_by_default_without_token():
+    client = make_app().test_client()
+
+    assert client.get('/metrics').status_code == 404
+    assert client.get('/metrics?token=').status_code == 404
+
+
+def test_admin_session_can_read_metrics():
+    client = make_app().test_client()
+    client.get('/login')
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+
+
+@pytest.mark.parametrize('kwargs, status', [
+    ({'query_string': {'token': 's3cret'}}, 200),
+    ({'headers': {'Authorization': 'Bearer s3cret'}}, 200),
+    ({'headers': {'Authorization': 'Bearer otro'}}, 404),
+    ({}, 404),
+])
+def test_token_as_query_or_bearer(kwargs, status):
+    client = make_app('s3cret').test_client()
+
+    assert client.get('/metrics', **kwargs).status_code == status
@@ -0,0 +1,31 @@
+from utils.profiler import RequestProfile
+
+
+def test_only_one_request_is_profiled_at_a_time():
+    first = RequestProfile(0.01)
+    second = RequestProfile(0.01)
+
+    assert first.start()
+    try:
+        assert not second.start()
+        second.stop()  # no tenía el perfilador: no hace nada
+    finally:
+        first.stop()
+
+    assert first.elapsed_ms is not None
+    assert second.elapsed_ms is None
+
+    third = RequestProfile(0.01)
+    assert third.start()
+    third.stop()
+
+
+def test_stop_is_idempotent():
+    profile = RequestProfile(0.01)
+    assert profile.start()
+    profile.stop()
+    profile.stop()
+
+    again = RequestProfile(0.01)
+    assert again.start()
+    again.stop()
@@ -0,0 +1,150 @@
+import pytest
+from flask import Flask
+from flask_login import LoginManager
+
+from utils import rate_limit
+from utils.rate_limit import CLIENT_COOKIE, TokenBucketLimiter, init_rate_limits
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_burst_then_refill_at_rate():
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(rate=2, burst=4, clock=clock)
+
+    assert [limiter.take('a')[0] for _ in range(5)] == [True] * 4 + [False]
+
+    allowed, retry_after = limiter.take('a')
+    assert not allowed
+    assert retry_after == pytest.approx(0.5)
+
+    clock.now = 0.5
+    assert limiter.take('a') == (True, 0)
+    assert not limiter.take('a')[0]
+
+    # Nunca acumula más que la ráfaga
+    clock.now = 100
+    assert [limiter.take('a')[0] for _ in range(5)] == [True] * 4 + [False]
+
+
+def test_keys_are_independent_and_scale_multiplies():
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(rate=1, burst=2, clock=clock)
+
+    assert [limiter.take('a')[0] for _ in range(3)] == [True, True, False]
+    assert limiter.take('b')[0]
+
+    assert [limiter.take('shared', scale=3)[0] for _ in range(7)] == [True] * 6 + [False]
+    assert limiter.take('shared', scale=3)[1] == pytest.approx(1 / 3)
+
+
+def test_oldest_keys_are_evicted():
+    limiter = TokenBucketLimiter(rate=1, burst=1, max_keys=2, clock=FakeClock())
+
+    for key in ('a', 'b', 'c'):
+        limiter.take(key)
+
+    assert len(limiter) == 2
+    # 'a' salió: vuelve con el bucket lleno
+    assert limiter.take('a')[0]
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY='test',
+        RATE_LIMITS={'page': (0.001, 2)},
+        RATE_LIMIT_TOTALS={'page': (0.001, 5)},
+        RATE_LIMIT_SHARED_IP_FACTOR=1,
+        PUBLIC_CONCURRENCY_LIMIT=4
+    )
+
+    login_manager = LoginManager(app)
+    login_manager.user_loader(lambda user_id: None)
+
+    init_rate_limits(app)
+
+    @app.route('/page/<level_slug>')
+    def page(level_slug):
+        return '<html></html>'
+
+    return app
+
+
+def signed_cookie(app):
+    with app.test_request_context():
+        return rate_limit._new_client_cookie()
+
+
+def statuses(client, count, url='/page/nivel1', **kwargs):
+    return [client.get(url, **kwargs).status_code for _ in range(count)]
+
+
+def test_signed_cookie_gets_its_own_bucket(app):
+    client = app.test_client()
+    client.set_cookie(CLIENT_COOKIE, signed_cookie(app))
+
+    assert statuses(client, 3) == [200, 200, 429]
+
+
+def test_forged_cookie_falls_back_to_ip_and_is_replaced(app):
+    # Sin guardar la cookie que entrega la respuesta
+    client = app.test_client(use_cookies=False)
+    forged = {'Cookie': f"{CLIENT_COOKIE}={'a' * 32}.{'b' * 32}"}
+
+    assert statuses(client, 3, headers=forged) == [200, 200, 429]
+
+    # Rotar ids inventados no da un bucket nuevo
+    rotated = {'Cookie': f"{CLIENT_COOKIE}={'c' * 32}.{'d' * 32}"}
+    assert statuses(client, 1, headers=rotated) == [429]
+
+    response = client.get('/page/nivel2', headers=forged)
+    value = response.headers['Set-Cookie'].split(';')[0].split('=', 1)[1]
+    with app.test_request_context(headers={'Cookie': f'{CLIENT_COOKIE}={value}'}):
+        assert rate_limit.signed_client_id() == value.split('.')[0]
+
+
+def test_forwarded_for_is_ignored_without_proxy_fix(app):
+    client = app.test_client(use_cookies=False)
+
+    codes = [
+        client.get('/page/nivel1', headers={'X-Forwarded-For': f'10.0.0.{i}'}).status_code
+        for i in range(3)
+    ]
+
+    assert codes == [200, 200, 429]
+
+
+def test_level_total_caps_many_clients(app):
+    codes = []
+    for _ in range(7):
+        client = app.test_client()
+        client.set_cookie(CLIENT_COOKIE, signed_cookie(app))
+        codes.append(client.get('/page/nivel1').status_code)
+
+    assert codes == [200] * 5 + [429] * 2
+
+    # Otro nivel tiene su propio total
+    client = app.test_client()
+    client.set_cookie(CLIENT_COOKIE, signed_cookie(app))
+    assert client.get('/page/nivel2').status_code == 200
+
+
+def test_proxy_fix_uses_forwarded_for_from_trusted_proxy(app):
+    app.config['PROXY_FIX_COUNT'] = 1
+    rate_limit.init_proxy_fix(app)
+    client = app.test_client(use_cookies=False)
+
+    codes = [
+        client.get('/page/nivel1', headers={'X-Forwarded-For': f'10.0.0.{i}'}).status_code
+        for i in range(3)
+    ]
+
+    assert codes == [200, 200, 200]
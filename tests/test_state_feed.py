@@ -0,0 +1,118 @@
+import threading
+
+from services.state_feed import PublicStateFeed, make_patch, state_version
+
+
+def apply_patch(document, patch):
+    """Aplicar add/remove/replace como lo hace la pantalla"""
+    for operation in patch:
+        keys = [key.replace('~1', '/').replace('~0', '~') for key in operation['path'].split('/')[1:]]
+        if not keys:
+            document = operation['value']
+            continue
+
+        target = document
+        for key in keys[:-1]:
+            target = target[key]
+
+        if operation['op'] == 'remove':
+            del target[keys[-1]]
+        else:
+            target[keys[-1]] = operation['value']
+
+    return document
+
+
+def test_make_patch_operations():
+    old = {'state': 'in_progress', 'scores': {'A': 1, 'B': 0}, 'timer': 10, 'a/b': 1}
+    new = {'state': 'in_progress', 'scores': {'A': 2, 'B': 0}, 'options': ['x', 'y'], 'a/b': 2}
+
+    patch = make_patch(old, new)
+
+    assert {'op': 'replace', 'path': '/scores/A', 'value': 2} in patch
+    assert {'op': 'remove', 'path': '/timer'} in patch
+    assert {'op': 'add', 'path': '/options', 'value': ['x', 'y']} in patch
+    assert {'op': 'replace', 'path': '/a~1b', 'value': 2} in patch
+    assert apply_patch({**old, 'scores': dict(old['scores'])}, patch) == new
+    assert make_patch(new, new) == []
+
+
+def test_lists_and_type_changes_are_replaced_whole():
+    assert make_patch({'o': [1, 2]}, {'o': [1, 3]}) == [{'op': 'replace', 'path': '/o', 'value': [1, 3]}]
+    assert make_patch({'o': {'a': 1}}, {'o': None}) == [{'op': 'replace', 'path': '/o', 'value': None}]
+
+
+def test_patch_since_known_version():
+    feed = PublicStateFeed()
+    first = {'state': 'in_progress', 'question': {'index': 1, 'image': 'x' * 200}}
+    second = {'state': 'in_progress', 'question': {'index': 2, 'image': 'x' * 200}}
+
+    version, patch = feed.update('sala1', first)
+    assert version == state_version(first)
+    assert patch is None
+
+    new_version, patch = feed.update('sala1', second, since=version)
+    assert new_version == state_version(second)
+    assert patch == [{'op': 'replace', 'path': '/question/index', 'value': 2}]
+
+    # Sin cambios: patch vacío, no el estado completo
+    assert feed.update('sala1', second, since=new_version) == (new_version, [])
+    assert feed.stats() == {'rooms': 1, 'patches': 2, 'snapshots': 1}
+
+
+def test_unknown_since_gets_full_state():
+    feed = PublicStateFeed()
+    feed.update('sala1', {'state': 'idle'})
+
+    assert feed.update('sala1', {'state': 'idle'}, since='deotroworker')[1] is None
+    # La versión es de otra sala
+    assert feed.update('sala2', {'state': 'paused'}, since=state_version({'state': 'idle'}))[1] is None
+    assert feed.stats()['snapshots'] == 3
+
+
+def test_patch_larger_than_state_sends_full_state():
+    feed = PublicStateFeed()
+    version, _ = feed.update('sala1', {'a': 1, 'b': 2, 'c': 3})
+
+    assert feed.update('sala1', {'x': 1}, since=version)[1] is None
+    assert feed.stats()['patches'] == 0
+
+
+def test_ring_buffer_forgets_old_versions():
+    feed = PublicStateFeed(size=2)
+    pad = 'x' * 100
+    versions = [feed.update('sala1', {'n': n, 'pad': pad})[0] for n in range(3)]
+
+    assert feed.update('sala1', {'n': 3, 'pad': pad}, since=versions[0])[1] is None
+    assert feed.update('sala1', {'n': 3, 'pad': pad}, since=versions[2])[1] == [{'op': 'replace', 'path': '/n', 'value': 3}]
+
+
+def test_oldest_room_is_evicted():
+    feed = PublicStateFeed()
+    feed.MAX_KEYS = 2
+    version, _ = feed.update('sala1', {'n': 1})
+    feed.update('sala2', {'n': 1})
+    feed.update('sala3', {'n': 1})
+
+    assert feed.stats()['rooms'] == 2
+    assert feed.update('sala1', {'n': 2}, since=version)[1] is None
+
+
+def test_counters_are_exact_under_concurrency():
+    feed = PublicStateFeed()
+    version, _ = feed.update('sala1', {'n': 0, 'pad': 'x' * 100})
+
+    def worker():
+        for n in range(500):
+            feed.update('sala1', {'n': 0, 'pad': 'x' * 100}, since=version)
+            feed.update('sala1', {'n': 0, 'pad': 'x' * 100}, since='desconocida')
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = feed.stats()
+    assert stats['patches'] == 2000
+    assert stats['snapshots'] == 2001
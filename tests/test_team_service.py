@@ -0,0 +1,102 @@
+import copy
+
+import pytest
+
+from repositories.memory import MemoryRepository
+from services.match_store import FirestoreJournalMirror, MatchStore
+from services.team_service import TeamService
+
+
+class MemoryMirror(FirestoreJournalMirror):
+    def __init__(self, repository):
+        self.repository = repository
+
+    @property
+    def db(self):
+        return self.repository
+
+
+@pytest.fixture
+def repository():
+    return MemoryRepository()
+
+
+@pytest.fixture
+def service(repository):
+    for name in ('A', 'B'):
+        repository.collection('teams').add({'name': name, 'level': 'Nivel I', 'score': 0, 'total_score': 0})
+    return TeamService(repository)
+
+
+def scores(repository):
+    return {doc.to_dict()['name']: doc.to_dict()['score'] for doc in repository.collection('teams').stream()}
+
+
+def recreate(repository, name, score):
+    """Otro worker borra el equipo y lo vuelve a crear (id nuevo)"""
+    for doc in repository.collection('teams').stream():
+        if doc.to_dict()['name'] == name:
+            repository.collection('teams').document(doc.id).delete()
+    repository.collection('teams').add({'name': name, 'level': 'Nivel I', 'score': score, 'total_score': score})
+
+
+def test_commit_score_update_with_extra_writes(service, repository):
+    def commit(batch):
+        batch.set(repository.collection('public_state').document('nivel1'), {'scores': {'A': 2}})
+        batch.commit()
+
+    service.commit_score_update('A', 2, commit)
+
+    assert scores(repository) == {'A': 2, 'B': 0}
+    assert repository.collection('public_state').document('nivel1').get().to_dict() == {'scores': {'A': 2}}
+
+
+def test_stale_team_id_is_refreshed_and_retried(service, repository):
+    service.get_all_teams()
+    recreate(repository, 'A', 7)
+    attempts = []
+
+    def commit(batch):
+        attempts.append(1)
+        batch.set(repository.collection('public_state').document('nivel1'), {'attempt': len(attempts)})
+        batch.commit()
+
+    service.commit_score_update('A', 2, commit)
+
+    assert len(attempts) == 2
+    assert scores(repository) == {'A': 9, 'B': 0}
+    # El primer intento no aplicó ninguna escritura
+    assert repository.collection('public_state').document('nivel1').get().to_dict() == {'attempt': 2}
+
+
+def test_missing_team_raises_without_writing(service, repository):
+    service.get_all_teams()
+    commit_calls = []
+
+    with pytest.raises(ValueError):
+        service.commit_score_update('Z', 1, commit_calls.append)
+
+    assert commit_calls == []
+    assert service.update_team_score('Z', 1) is False
+
+
+def test_retried_batch_carries_match_journal_entry(tmp_path, service, repository):
+    store = MatchStore(str(tmp_path / 'matches.db'), mirror=MemoryMirror(repository))
+    data = {'teams': ['A', 'B'], 'scores': {'A': 0, 'B': 0}}
+    match_id = store.create(copy.deepcopy(data))
+
+    service.get_all_teams()
+    recreate(repository, 'A', 0)
+    data['scores']['A'] = 2
+
+    def commit(batch):
+        store.save(match_id, copy.deepcopy(data), action='points_assigned', batch=batch)
+        batch.commit()
+
+    service.commit_score_update('A', 2, commit)
+
+    entries = repository.collection('match_journal').document(match_id).collection('entries')
+    assert entries.document('00000002').get().to_dict()['action'] == 'points_assigned'
+    assert MatchStore(str(tmp_path / 'other.db'), mirror=MemoryMirror(repository)).restore(match_id) == {
+        **data, 'match_id': match_id
+    }
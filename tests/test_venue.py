@@ -0,0 +1,108 @@
+import pytest
+
+from repositories.memory import MemoryRepository
+from repositories.venue import VenueRepository
+
+
+class RemoteRepository(MemoryRepository):
+    def __init__(self):
+        super().__init__()
+        self.fail = None
+        self.during_commit = None
+        self.commits = []
+
+    def _commit(self, writes):
+        if self.during_commit:
+            callback, self.during_commit = self.during_commit, None
+            callback()
+        if self.fail:
+            raise self.fail
+        self.commits.append([('/'.join(write.path), write.op) for write in writes])
+        return super()._commit(writes)
+
+
+@pytest.fixture
+def remote():
+    return RemoteRepository()
+
+
+@pytest.fixture
+def venue(tmp_path, remote):
+    # Sin remote_factory no arranca el hilo de réplica: sync_once a mano
+    repository = VenueRepository(str(tmp_path / 'venue.db'))
+    repository._remote = remote
+    return repository
+
+
+def outbox(venue):
+    return dict(venue._connect().execute(
+        f"SELECT path, version FROM {VenueRepository.OUTBOX_TABLE}"
+    ).fetchall())
+
+
+def test_writes_are_coalesced_per_document(venue, remote):
+    doc = venue.collection('teams').document('t1')
+    doc.set({'score': 1})
+    doc.update({'score': 2})
+    venue.collection('teams').document('t2').set({'score': 0})
+
+    assert outbox(venue) == {'teams/t1': 2, 'teams/t2': 1}
+
+    assert venue.sync_once() == 2
+    assert outbox(venue) == {}
+    assert remote.collection('teams').document('t1').get().to_dict() == {'score': 2}
+    assert venue.sync_once() == 0
+
+
+def test_document_changed_while_sending_stays_queued(venue, remote):
+    doc = venue.collection('teams').document('t1')
+    doc.set({'score': 1})
+
+    remote.during_commit = lambda: doc.update({'score': 5})
+    assert venue.sync_once() == 1
+
+    # Se envió la versión 1; la 2 sigue en la cola
+    assert remote.collection('teams').document('t1').get().to_dict() == {'score': 1}
+    assert outbox(venue) == {'teams/t1': 2}
+
+    venue.sync_once()
+    assert remote.collection('teams').document('t1').get().to_dict() == {'score': 5}
+    assert outbox(venue) == {}
+
+
+def test_deleted_document_is_replicated_as_delete(venue, remote):
+    doc = venue.collection('teams').document('t1')
+    doc.set({'score': 1})
+    venue.sync_once()
+
+    doc.delete()
+    venue.sync_once()
+
+    assert remote.commits[-1] == [('teams/t1', 'delete')]
+    assert not remote.collection('teams').document('t1').get().exists
+
+
+def test_remote_failure_keeps_queue_and_counts_attempts(venue, remote):
+    venue.collection('teams').document('t1').set({'score': 1})
+    remote.fail = ConnectionError('sin red')
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            venue.sync_once()
+
+    status = venue.status()
+    assert status['pending'] == 1
+    assert status['max_attempts'] == 2
+    assert status['last_error'] == 'sin red'
+
+    remote.fail = None
+    assert venue.sync_once() == 1
+    assert venue.status()['pending'] == 0
+    assert venue.status()['last_error'] is None
+
+
+def test_imported_documents_are_not_queued(venue):
+    venue.import_documents('questions', [('q1', {'level': 'nivel1'})])
+
+    assert outbox(venue) == {}
+    assert venue.collection('questions').document('q1').get().to_dict() == {'level': 'nivel1'}
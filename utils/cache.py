@@ -1,37 +1,197 @@
 """
-Sistema de caché simple para mejorar rendimiento
+Caché en memoria LRU + TTL, segura entre threads (workers gthread).
+
+- Tamaño acotado: al superar `maxsize` sale la entrada usada hace más
+  tiempo
+- TTL por entrada (o el de la caché), medido con time.monotonic
+- Estadísticas: aciertos, fallos, expulsiones y expiraciones (las
+  cachés con nombre se publican en /metrics, ver utils/metrics.py)
+- Decorador `cached` para funciones y métodos de lectura
+
+Cada worker tiene su propia copia: invalidar una entrada solo afecta al
+proceso que escribió, los demás la ven vieja hasta que expire. Por eso
+los TTL de los servicios son cortos.
 """
-from datetime import datetime, timedelta
 
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from functools import wraps
 
-class SimpleCache:
-    """Caché en memoria para datos frecuentes"""
 
-    def __init__(self):
-        self._cache = {}
-        self._cache_duration = timedelta(minutes=5)
+_MISSING = object()
+_named_caches = weakref.WeakSet()
 
-    def get(self, key):
-        """Obtiene un valor del caché si es válido"""
-        if key in self._cache:
-            data, timestamp = self._cache[key]
-            if datetime.now() - timestamp < self._cache_duration:
-                return data
-            else:
-                del self._cache[key]
-        return None
 
-    def set(self, key, value):
-        """Almacena un valor en el caché"""
-        self._cache[key] = (value, datetime.now())
+class LRUCache:
+    """Caché LRU con expiración por entrada"""
+
+    def __init__(self, maxsize=256, ttl=300, name=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        if name:
+            _named_caches.add(self)
+
+    def get(self, key, default=None):
+        """Obtiene un valor del caché si no expiró"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= self._clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Almacena un valor; ttl=None usa el de la caché, 0 no expira"""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = self._clock() + ttl if ttl else None
+
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_set(self, key, factory, ttl=None, cache_none=False):
+        """
+        Devuelve el valor en caché o lo calcula con factory().
+        Por defecto no guarda None (errores o documentos inexistentes).
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        value = factory()
+        if value is not None or cache_none:
+            self.set(key, value, ttl)
+        return value
+
+    def delete(self, key):
+        with self._lock:
+            return self._data.pop(key, _MISSING) is not _MISSING
+
+    def delete_where(self, predicate):
+        """Elimina las entradas cuya clave cumple predicate(key)"""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
 
     def clear(self, key=None):
-        """Limpia el caché"""
-        if key:
-            self._cache.pop(key, None)
-        else:
-            self._cache.clear()
+        """Limpia el caché (o solo una clave)"""
+        if key is not None:
+            self.delete(key)
+            return
+
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+
+def cached(cache, key=None, ttl=None, cache_none=False):
+    """
+    Decorador: guarda el resultado en `cache`.
+
+    `cache` puede ser una LRUCache o una función que la devuelve a partir
+    de los argumentos (para métodos: lambda self: self.cache).
+    `key` arma la clave a partir de los argumentos; por defecto
+    (nombre de la función, *args, kwargs ordenados) sin `self`.
+
+    La función decorada expone `uncached` para saltarse la caché.
+    """
+    def decorator(func):
+        code = func.__code__
+        is_method = code.co_argcount > 0 and code.co_varnames[0] == 'self'
+
+        def make_key(args, kwargs):
+            if key is not None:
+                return key(*args, **kwargs)
+
+            positional = args[1:] if is_method else args
+            return (func.__qualname__,) + tuple(positional) + tuple(sorted(kwargs.items()))
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if isinstance(cache, LRUCache):
+                target = cache
+            else:
+                target = cache(args[0]) if is_method else cache()
+
+            return target.get_or_set(
+                make_key(args, kwargs),
+                lambda: func(*args, **kwargs),
+                ttl=ttl,
+                cache_none=cache_none
+            )
+
+        wrapper.uncached = func
+        return wrapper
+
+    return decorator
+
+
+def cache_stats():
+    """
+    Estadísticas de las cachés con nombre del proceso, sumadas por nombre
+    (varias instancias del mismo servicio comparten nombre).
+    """
+    totals = {}
+
+    for instance in list(_named_caches):
+        stats = instance.stats()
+        total = totals.setdefault(stats['name'], dict.fromkeys(
+            ('size', 'maxsize', 'hits', 'misses', 'evictions', 'expirations'), 0))
+        for field in total:
+            total[field] += stats[field]
+
+    return totals
+
 
+# Compatibilidad con el nombre anterior
+SimpleCache = LRUCache
 
 # Instancia global del caché
-cache = SimpleCache()
+cache = LRUCache(name='global')
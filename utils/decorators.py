@@ -4,7 +4,6 @@ Decoradores personalizados para rutas
 
 from functools import wraps
 from flask import flash, redirect, url_for, session, current_app, request, jsonify
-import traceback
 
 
 PUBLIC_ENDPOINTS = {
@@ -33,8 +32,7 @@ def handle_errors(f):
             return f(*args, **kwargs)
 
         except ValueError as e:
-            current_app.logger.error(f'ValueError en {f.__name__}: {str(e)}')
-            current_app.logger.error(traceback.format_exc())
+            current_app.logger.warning('ValueError en %s: %s', f.__name__, e, exc_info=True)
 
             if _is_ajax_request():
                 return jsonify({
@@ -50,8 +48,7 @@ def handle_errors(f):
             return redirect(url_for('quiz.dashboard'))
 
         except Exception as e:
-            current_app.logger.error(f'Error en {f.__name__}: {str(e)}')
-            current_app.logger.error(traceback.format_exc())
+            current_app.logger.exception('Error en %s: %s', f.__name__, e)
 
             if _is_ajax_request():
                 return jsonify({
@@ -73,7 +70,7 @@ def require_quiz_session(f):
     """Verifica que existe una sesión de quiz válida"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'quiz_level' not in session or 'quiz_teams' not in session:
+        if 'quiz_match_id' not in session:
             flash('No hay una sesión de quiz activa', 'error')
             return redirect(url_for('quiz.select_level'))
         return f(*args, **kwargs)
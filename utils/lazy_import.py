@@ -0,0 +1,39 @@
+"""
+Importación diferida de módulos pesados (firebase_admin, firestore, storage).
+
+Importar firebase_admin.firestore arrastra gRPC y protobuf y cuesta
+cientos de milisegundos. Con lazy_import el módulo real se importa en
+el primer acceso a uno de sus atributos, no al importar la aplicación.
+"""
+
+import importlib
+import threading
+
+
+class LazyModule:
+    """Proxy que importa el módulo real en el primer acceso a un atributo."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'cargado' if self._module is not None else 'diferido'
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def lazy_import(name):
+    """Devuelve un proxy del módulo que se importa en el primer uso."""
+    return LazyModule(name)
@@ -0,0 +1,344 @@
+"""
+Métricas de la aplicación en formato Prometheus (sin dependencias).
+
+- Contadores e histogramas con etiquetas, thread-safe
+- Métricas HTTP por endpoint y métricas del repositorio de datos por
+  endpoint / operación / colección (ver repositories/instrumented.py)
+- Contabilidad por request en flask.g: cuántas RPC hizo, cuánto tardaron
+  y cuántos bytes movieron; se agrega como campos al log del request
+  (ver utils/structured_logging.py) y al header Server-Timing
+
+Cada worker de gunicorn tiene su propio registro: /metrics muestra los
+números del worker que atendió el scrape (etiqueta pid).
+"""
+
+import os
+import threading
+import time
+
+from flask import g, has_request_context, request
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels=()):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+
+        for labels, value in sorted(items):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, (list(state[0]), state[1], state[2])) for labels, state in self._values.items()]
+
+        for labels, (bucket_counts, total, count) in sorted(items):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(self.labelnames, labels, 'le="%s"' % bound)
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+
+            inf_labels = _format_labels(self.labelnames, labels, 'le="+Inf"')
+            yield f"{self.name}_bucket{inf_labels} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}"
+
+
+class CallbackMetric:
+    """
+    Métrica cuyos valores se leen al momento del scrape:
+    callback() devuelve [(valores de etiquetas, valor)].
+    """
+
+    def __init__(self, name, documentation, kind, labelnames, callback):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def samples(self):
+        for labels, value in sorted(self.callback()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name, documentation, kind, labelnames, callback):
+        return self.register(CallbackMetric(name, documentation, kind, labelnames, callback))
+
+    def render(self):
+        lines = [
+            '# HELP olimpiadas_process_info Worker que respondió este scrape.',
+            '# TYPE olimpiadas_process_info gauge',
+            f'olimpiadas_process_info{{pid="{os.getpid()}"}} 1'
+        ]
+
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'olimpiadas_http_requests_total',
+    'Requests HTTP atendidos.',
+    ('endpoint', 'method', 'status')
+)
+HTTP_DURATION = REGISTRY.histogram(
+    'olimpiadas_http_request_duration_seconds',
+    'Duración de los requests HTTP.',
+    ('endpoint', 'method')
+)
+DATASTORE_OPERATIONS = REGISTRY.counter(
+    'olimpiadas_datastore_operations_total',
+    'Operaciones (RPC) contra el repositorio de datos.',
+    ('endpoint', 'operation', 'collection')
+)
+DATASTORE_DOCUMENTS = REGISTRY.counter(
+    'olimpiadas_datastore_documents_total',
+    'Documentos leídos o escritos.',
+    ('endpoint', 'operation')
+)
+DATASTORE_BYTES = REGISTRY.counter(
+    'olimpiadas_datastore_bytes_total',
+    'Bytes aproximados (JSON) leídos o escritos.',
+    ('endpoint', 'operation', 'direction')
+)
+DATASTORE_ERRORS = REGISTRY.counter(
+    'olimpiadas_datastore_errors_total',
+    'Operaciones del repositorio que fallaron.',
+    ('endpoint', 'operation')
+)
+DATASTORE_DURATION = REGISTRY.histogram(
+    'olimpiadas_datastore_operation_duration_seconds',
+    'Latencia de las operaciones del repositorio de datos.',
+    ('endpoint', 'operation')
+)
+
+
+def _cache_lookups():
+    from utils.cache import cache_stats
+
+    for name, stats in cache_stats().items():
+        yield (name, 'hit'), stats['hits']
+        yield (name, 'miss'), stats['misses']
+
+
+def _cache_removals():
+    from utils.cache import cache_stats
+
+    for name, stats in cache_stats().items():
+        yield (name, 'lru'), stats['evictions']
+        yield (name, 'ttl'), stats['expirations']
+
+
+def _cache_entries():
+    from utils.cache import cache_stats
+
+    return [((name,), stats['size']) for name, stats in cache_stats().items()]
+
+
+CACHE_LOOKUPS = REGISTRY.callback(
+    'olimpiadas_cache_lookups_total',
+    'Consultas a las cachés en memoria.',
+    'counter', ('cache', 'result'), lambda: list(_cache_lookups())
+)
+CACHE_REMOVALS = REGISTRY.callback(
+    'olimpiadas_cache_removals_total',
+    'Entradas expulsadas (lru) o expiradas (ttl).',
+    'counter', ('cache', 'reason'), lambda: list(_cache_removals())
+)
+CACHE_ENTRIES = REGISTRY.callback(
+    'olimpiadas_cache_entries',
+    'Entradas en cada caché.',
+    'gauge', ('cache',), _cache_entries
+)
+
+
+def _singleflight_calls():
+    from utils.singleflight import singleflight_stats
+
+    for name, stats in singleflight_stats().items():
+        yield (name, 'leader'), stats['leaders']
+        yield (name, 'shared'), stats['shared']
+
+
+SINGLEFLIGHT_CALLS = REGISTRY.callback(
+    'olimpiadas_singleflight_calls_total',
+    'Lecturas coalescidas: leader hizo la lectura, shared reutilizó una en curso.',
+    'counter', ('group', 'result'), lambda: list(_singleflight_calls())
+)
+
+
+# ============================================================
+# Contabilidad por request
+# ============================================================
+
+BACKGROUND = '-'
+
+
+def current_endpoint():
+    if has_request_context():
+        return request.endpoint or 'unknown'
+    return BACKGROUND
+
+
+def record_datastore_operation(operation, collection, seconds, documents=0,
+                               bytes_read=0, bytes_written=0, error=False):
+    """
+    Registrar una operación del repositorio (llamado por InstrumentedRepository).
+    """
+    endpoint = current_endpoint()
+
+    DATASTORE_OPERATIONS.inc((endpoint, operation, collection))
+    DATASTORE_DURATION.observe((endpoint, operation), seconds)
+
+    if documents:
+        DATASTORE_DOCUMENTS.inc((endpoint, operation), documents)
+    if bytes_read:
+        DATASTORE_BYTES.inc((endpoint, operation, 'read'), bytes_read)
+    if bytes_written:
+        DATASTORE_BYTES.inc((endpoint, operation, 'written'), bytes_written)
+    if error:
+        DATASTORE_ERRORS.inc((endpoint, operation))
+
+    if has_request_context():
+        stats = g.get('datastore_stats')
+        if stats is None:
+            stats = g.datastore_stats = new_request_stats()
+
+        stats['rpc'] += 1
+        stats[operation] = stats.get(operation, 0) + 1
+        stats['documents'] += documents
+        stats['bytes'] += bytes_read + bytes_written
+        stats['ms'] += seconds * 1000
+
+
+def new_request_stats():
+    return {'rpc': 0, 'documents': 0, 'bytes': 0, 'ms': 0.0}
+
+
+def init_metrics(app):
+    """
+    Medir cada request y dejar el resumen en el log y en Server-Timing.
+    """
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    log_requests = app.config.get('METRICS_LOG_REQUESTS', True)
+
+    @app.before_request
+    def _metrics_start():
+        if g.get('request_started_at') is None:
+            g.request_started_at = time.perf_counter()
+        g.datastore_stats = new_request_stats()
+
+    @app.after_request
+    def _metrics_finish(response):
+        started = g.get('request_started_at')
+        if started is None:
+            return response
+
+        elapsed = time.perf_counter() - started
+        endpoint = request.endpoint or 'unknown'
+        stats = g.get('datastore_stats') or new_request_stats()
+
+        HTTP_REQUESTS.inc((endpoint, request.method, str(response.status_code)))
+        HTTP_DURATION.observe((endpoint, request.method), elapsed)
+
+        response.headers['Server-Timing'] = (
+            f'db;dur={stats["ms"]:.1f};desc="{stats["rpc"]} rpc", '
+            f'app;dur={elapsed * 1000:.1f}'
+        )
+
+        if log_requests and endpoint != 'metrics.metrics':
+            app.logger.info(
+                '%s %s %s', request.method, request.path, response.status_code,
+                extra={
+                    'status': response.status_code,
+                    'duration_ms': round(elapsed * 1000, 1),
+                    'rpc': stats['rpc'],
+                    'db_ms': round(stats['ms'], 1),
+                    'docs': stats['documents'],
+                    'bytes': stats['bytes'],
+                    'db_ops': {
+                        key: value for key, value in stats.items()
+                        if key not in ('rpc', 'documents', 'bytes', 'ms')
+                    }
+                }
+            )
+
+        return response
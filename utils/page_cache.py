@@ -0,0 +1,125 @@
+"""
+Caché del HTML renderizado de las páginas públicas (scoreboard, versus,
+versus_hub).
+
+Las pantallas recargan estas páginas completas (versus.html pesa unos
+31 KB) y casi siempre con el mismo estado. Cada página se guarda ya
+renderizada y comprimida (gzip, y brotli si el paquete está instalado)
+con la clave (template, alcance, versión):
+
+- alcance: la sala o el panel (p. ej. ('nivel1', 'sala1'))
+- versión: hash de lo que se usa para renderizar (ver
+  services/state_feed.state_version), la calcula la ruta
+
+Un publish, desde cualquier worker, cambia la versión: la siguiente
+carga renderiza de nuevo y descarta la versión anterior del mismo
+alcance. Mientras el estado no cambia, la página es una búsqueda en la
+caché y la escritura de los bytes comprimidos según Accept-Encoding.
+
+No se usa con el admin (las páginas cambian con current_user) ni si la
+sesión tiene mensajes flash pendientes.
+"""
+
+import gzip
+
+from flask import current_app, render_template, request, session
+from flask_login import current_user
+
+from utils.cache import LRUCache
+from utils.singleflight import SingleFlight
+
+try:
+    import brotli
+except ImportError:  # opcional: sin él se sirve gzip
+    brotli = None
+
+
+class RenderedPage:
+    """HTML de una página y sus versiones comprimidas"""
+
+    __slots__ = ('version', 'body', 'gzip', 'brotli')
+
+    def __init__(self, version, html, gzip_level=6, brotli_quality=5):
+        self.version = version
+        self.body = html.encode('utf-8')
+        self.gzip = gzip.compress(self.body, compresslevel=gzip_level, mtime=0)
+        self.brotli = brotli.compress(self.body, quality=brotli_quality) if brotli else None
+
+    def encoded(self, accept_encodings):
+        """(bytes, Content-Encoding) según lo que acepta el cliente"""
+        if self.brotli is not None and accept_encodings['br']:
+            return self.brotli, 'br'
+
+        if accept_encodings['gzip']:
+            return self.gzip, 'gzip'
+
+        return self.body, None
+
+
+class RenderedPageCache:
+    def __init__(self, maxsize=128, ttl=600, gzip_level=6, brotli_quality=5):
+        self.cache = LRUCache(maxsize=maxsize, ttl=ttl, name='rendered_pages')
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self._flight = SingleFlight('rendered_pages')
+
+    def get_or_render(self, template, scope, version, render):
+        """
+        Página de (template, scope) en `version`; si no está la arma con
+        render() (una vez aunque lleguen varios requests a la vez) y
+        descarta las otras versiones del mismo alcance.
+        """
+        key = (template, scope, version)
+
+        page = self.cache.get(key)
+        if page is not None:
+            return page
+
+        def build():
+            page = RenderedPage(version, render(), self.gzip_level, self.brotli_quality)
+            self.cache.delete_where(lambda held: held[:2] == key[:2] and held[2] != version)
+            self.cache.set(key, page)
+            return page
+
+        return self._flight.do(key, build)
+
+    def stats(self):
+        return self.cache.stats()
+
+
+def init_page_cache(app):
+    """Crear la caché de páginas públicas (PAGE_CACHE_ENABLED)"""
+    if not app.config.get('PAGE_CACHE_ENABLED', True):
+        return
+
+    app.extensions['page_cache'] = RenderedPageCache(
+        maxsize=app.config.get('PAGE_CACHE_SIZE', 128),
+        gzip_level=app.config.get('PAGE_CACHE_GZIP_LEVEL', 6),
+        brotli_quality=app.config.get('PAGE_CACHE_BROTLI_QUALITY', 5)
+    )
+
+
+def render_cached(template, scope, version, **context):
+    """
+    render_template con la caché de páginas públicas. Responde la página
+    comprimida con ETag (la versión) y Vary: Accept-Encoding.
+    """
+    page_cache = current_app.extensions.get('page_cache')
+
+    if page_cache is None or current_user.is_authenticated or session.get('_flashes'):
+        return render_template(template, **context)
+
+    page = page_cache.get_or_render(
+        template,
+        scope,
+        version,
+        lambda: render_template(template, **context)
+    )
+    body, encoding = page.encoded(request.accept_encodings)
+
+    response = current_app.response_class(body, mimetype='text/html')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(f"{page.version}-{encoding or 'identity'}")
+    return response.make_conditional(request)
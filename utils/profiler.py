@@ -0,0 +1,351 @@
+"""
+Perfilador de requests bajo demanda (solo admin).
+
+Formas de activarlo:
+- un request puntual: header `X-Profile: 1` o `?_profile=1` con sesión de
+  admin (o PROFILER_TOKEN en el header, para curl)
+- muestreo: desde /admin/profiler el admin define un porcentaje de
+  requests a perfilar, opcionalmente solo de un endpoint, durante N
+  minutos. La configuración vive en instance/profiler.json para que
+  la compartan todos los workers de gunicorn.
+
+Cada request perfilado deja en instance/profiles/:
+- <id>.txt     funciones con más tiempo (cProfile, acumulado y propio)
+- <id>.folded  pilas colapsadas de un muestreador de pilas, compatibles
+               con flamegraph.pl / speedscope
+- <id>.prof    estadísticas de cProfile (pstats, snakeviz)
+"""
+
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import current_app, g, request
+
+
+PROFILE_EXTENSIONS = ('.txt', '.folded', '.prof')
+
+# cProfile es un perfilador del proceso: en Python 3.12+ un segundo enable()
+# mientras otro está activo falla con "Another profiling tool is already
+# active". Solo se perfila un request a la vez; los demás se atienden sin
+# perfilar.
+_active_profile = threading.Lock()
+
+
+# ============================================================
+# Muestreador de pilas
+# ============================================================
+
+class StackSampler:
+    """
+    Toma la pila de un hilo cada `interval` segundos desde un hilo aparte.
+    La resolución real depende del GIL: sirve para requests lentos
+    (decenas o cientos de ms), justo los que interesa mirar.
+    """
+
+    def __init__(self, thread_id, interval=0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=1)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + '\n'
+
+
+class RequestProfile:
+    def __init__(self, sample_interval):
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(threading.get_ident(), sample_interval)
+        self.elapsed_ms = None
+        self._holds_lock = False
+
+    def start(self):
+        """False si ya hay otro request perfilándose (o otra herramienta activa)"""
+        if not _active_profile.acquire(blocking=False):
+            return False
+
+        self._holds_lock = True
+        try:
+            self.profile.enable()
+        except ValueError:
+            self._release()
+            return False
+
+        self.sampler.start()
+        return True
+
+    def stop(self):
+        if not self._holds_lock:
+            return
+
+        self.profile.disable()
+        self.sampler.stop()
+        self.elapsed_ms = (time.perf_counter() - self._started) * 1000
+        self._release()
+
+    def _release(self):
+        self._holds_lock = False
+        _active_profile.release()
+
+    def top_functions(self, limit=40):
+        output = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=output)
+        stats.sort_stats('cumulative').print_stats(limit)
+        output.write('\n')
+        stats.sort_stats('tottime').print_stats(limit)
+        return output.getvalue()
+
+
+# ============================================================
+# Configuración compartida entre workers
+# ============================================================
+
+class ProfilerSettings:
+    """
+    instance/profiler.json: {"rate": 10, "endpoint": "quiz.assign_point", "until": 1700000000}
+    Se relee como máximo una vez por segundo.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._cached = {}
+        self._checked_at = 0
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        now = time.monotonic()
+
+        if now - self._checked_at < 1:
+            return self._cached
+
+        with self._lock:
+            self._checked_at = now
+
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                self._cached, self._mtime = {}, None
+                return self._cached
+
+            if mtime != self._mtime:
+                try:
+                    with open(self.path, encoding='utf-8') as fh:
+                        self._cached = json.load(fh)
+                    self._mtime = mtime
+                except (OSError, ValueError):
+                    self._cached = {}
+
+        return self._cached
+
+    def save(self, rate, endpoint=None, minutes=10):
+        settings = {
+            'rate': max(0.0, min(100.0, float(rate))),
+            'endpoint': endpoint or None,
+            'until': time.time() + minutes * 60
+        }
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            json.dump(settings, fh)
+        os.replace(tmp_path, self.path)
+
+        self._checked_at = 0
+        return settings
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        self._checked_at = 0
+
+    def active(self):
+        settings = self.load()
+        if not settings or settings.get('until', 0) < time.time() or not settings.get('rate'):
+            return None
+        return settings
+
+
+# ============================================================
+# Integración con Flask
+# ============================================================
+
+def _profiles_dir():
+    return current_app.config['PROFILER_DIR']
+
+
+def list_profiles(limit=50):
+    directory = _profiles_dir()
+
+    try:
+        names = [name for name in os.listdir(directory) if name.endswith('.txt')]
+    except OSError:
+        return []
+
+    profiles = []
+    for name in sorted(names, reverse=True)[:limit]:
+        profile_id = name[:-4]
+        profiles.append({
+            'id': profile_id,
+            'files': [
+                profile_id + extension
+                for extension in PROFILE_EXTENSIONS
+                if os.path.exists(os.path.join(directory, profile_id + extension))
+            ]
+        })
+
+    return profiles
+
+
+def _prune(directory, keep):
+    ids = sorted({name.rsplit('.', 1)[0] for name in os.listdir(directory)})
+
+    for profile_id in ids[:-keep] if keep else []:
+        for extension in PROFILE_EXTENSIONS:
+            try:
+                os.remove(os.path.join(directory, profile_id + extension))
+            except OSError:
+                pass
+
+
+def _is_admin():
+    from flask_login import current_user
+
+    if current_user.is_authenticated:
+        return True
+
+    token = current_app.config.get('PROFILER_TOKEN')
+    if not token:
+        return False
+
+    provided = request.headers.get('X-Profile-Token', '')
+    return hmac.compare_digest(provided.encode('utf-8'), token.encode('utf-8'))
+
+
+def _should_profile(settings_store):
+    endpoint = request.endpoint
+
+    if not endpoint or endpoint == 'static' or endpoint.startswith('profiler.'):
+        return False
+
+    if request.headers.get('X-Profile') == '1' or request.args.get('_profile') == '1':
+        return _is_admin()
+
+    settings = settings_store.active()
+    if not settings:
+        return False
+
+    if settings.get('endpoint') and settings['endpoint'] != endpoint:
+        return False
+
+    return random.random() * 100 < settings['rate']
+
+
+def _write_profile(profile, response):
+    directory = _profiles_dir()
+    os.makedirs(directory, exist_ok=True)
+
+    stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(profile.started_at))
+    endpoint = (request.endpoint or 'unknown').replace('.', '_')
+    profile_id = f"{stamp}-{int(profile.started_at * 1000) % 1000:03d}-{endpoint}-{os.getpid()}"
+    base = os.path.join(directory, profile_id)
+
+    header = (
+        f"{request.method} {request.full_path.rstrip('?')}\n"
+        f"endpoint: {request.endpoint}\n"
+        f"status: {response.status_code}\n"
+        f"duración: {profile.elapsed_ms:.1f} ms\n"
+        f"muestras de pila: {sum(profile.sampler.stacks.values())}\n"
+        f"pid: {os.getpid()}\n\n"
+    )
+
+    with open(base + '.txt', 'w', encoding='utf-8') as fh:
+        fh.write(header)
+        fh.write(profile.top_functions(current_app.config.get('PROFILER_TOP_FUNCTIONS', 40)))
+
+    with open(base + '.folded', 'w', encoding='utf-8') as fh:
+        fh.write(profile.sampler.collapsed())
+
+    profile.profile.dump_stats(base + '.prof')
+
+    _prune(directory, current_app.config.get('PROFILER_MAX_PROFILES', 50))
+    return profile_id
+
+
+def init_profiler(app):
+    """
+    Registrar los hooks del perfilador y el almacén de configuración.
+    """
+    settings_store = ProfilerSettings(app.config['PROFILER_SETTINGS_PATH'])
+    app.extensions['profiler_settings'] = settings_store
+    sample_interval = app.config.get('PROFILER_SAMPLE_INTERVAL_MS', 1) / 1000
+
+    @app.before_request
+    def _profiler_start():
+        if _should_profile(settings_store):
+            profile = RequestProfile(sample_interval)
+            if profile.start():
+                g.request_profile = profile
+
+    @app.after_request
+    def _profiler_finish(response):
+        profile = g.pop('request_profile', None)
+
+        if profile is not None:
+            profile.stop()
+            try:
+                response.headers['X-Profile-Id'] = _write_profile(profile, response)
+            except OSError as e:
+                app.logger.error(f"No se pudo guardar el perfil: {e}")
+
+        return response
+
+    @app.teardown_request
+    def _profiler_teardown(error=None):
+        # Si el request terminó con una excepción sin manejar, after_request
+        # no corre: apagar el perfilador igual.
+        profile = g.pop('request_profile', None)
+        if profile is not None:
+            profile.stop()
+
+
+def get_settings_store():
+    return current_app.extensions['profiler_settings']
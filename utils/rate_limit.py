@@ -0,0 +1,264 @@
+"""
+Control de admisión de los endpoints públicos.
+
+- Límite por cliente y nivel (token bucket en memoria, compartido entre
+  los threads del worker): una pestaña de kiosco en un bucle de recarga
+  agota su propio cupo y no el del resto.
+- Límite total por nivel (RATE_LIMIT_TOTALS, todos los clientes del
+  worker juntos): acota la carga aunque lleguen muchos clientes
+  distintos.
+- Cupo global de requests públicos simultáneos por worker: si está
+  lleno el request se descarta enseguida con 429 en lugar de hacer cola
+  frente a Firestore, así siempre quedan threads para el admin.
+- El admin (sesión iniciada) no pasa por ninguno de los dos.
+
+El cliente se identifica con una cookie firmada (HMAC con SECRET_KEY)
+que se entrega junto con las páginas públicas: un id inventado no vale
+y cuenta como cliente sin cookie. Sin cookie válida se usa la IP de la
+conexión (remote_addr, con un cupo mayor, porque en la sede muchos
+teléfonos salen por la misma IP). Detrás de un proxy, PROXY_FIX_COUNT
+indica cuántos proxies de confianza hay para tomar la IP de
+X-Forwarded-For (ver init_proxy_fix); sin él ese encabezado se ignora.
+
+Las respuestas 429 llevan Retry-After; los descartes se cuentan en
+/metrics (olimpiadas_requests_shed_total).
+"""
+
+import hashlib
+import hmac
+import math
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from flask import current_app, g, jsonify, request
+
+from utils.metrics import REGISTRY
+
+
+REQUESTS_SHED = REGISTRY.counter(
+    'olimpiadas_requests_shed_total',
+    'Requests públicos rechazados con 429 (rate: límite por cliente, total: límite del nivel, concurrency: cupo del worker).',
+    ('endpoint', 'reason')
+)
+
+CLIENT_COOKIE = 'olimpiadas_client'
+CLIENT_COOKIE_MAX_AGE = 30 * 24 * 3600
+CLIENT_ID_PATTERN = re.compile(r'^([a-f0-9]{32})\.([a-f0-9]{32})$')
+TOTAL_KEY = '*'
+
+
+class TokenBucketLimiter:
+    """
+    Un bucket por clave: `burst` requests de golpe y luego `rate` por
+    segundo. Las claves sin uso salen primero al superar `max_keys`.
+    """
+
+    def __init__(self, rate, burst, max_keys=10000, clock=time.monotonic):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, cost=1, scale=1):
+        """
+        Consumir `cost` tokens. Devuelve (permitido, segundos hasta que
+        haya tokens). `scale` multiplica ritmo y ráfaga de esta clave.
+        """
+        rate = self.rate * scale
+        burst = self.burst * scale
+        now = self._clock()
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+
+            if bucket is None:
+                tokens = burst
+                while len(self._buckets) >= self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                self._buckets.move_to_end(key)
+
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                return True, 0
+
+            self._buckets[key] = (tokens, now)
+            return False, (cost - tokens) / rate if rate else 60
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class ConcurrencyGate:
+    """Cupo de requests simultáneos; quien no entra a tiempo se descarta"""
+
+    def __init__(self, limit, timeout=0.1):
+        self.limit = limit
+        self.timeout = timeout
+        self._semaphore = threading.BoundedSemaphore(limit)
+
+    def enter(self):
+        return self._semaphore.acquire(timeout=self.timeout)
+
+    def leave(self):
+        self._semaphore.release()
+
+
+# ============================================================
+# Integración con Flask
+# ============================================================
+
+def _client_signature(client_id):
+    key = current_app.config['SECRET_KEY'].encode('utf-8')
+    return hmac.new(key, client_id.encode('utf-8'), hashlib.sha256).hexdigest()[:32]
+
+
+def _new_client_cookie():
+    client_id = uuid.uuid4().hex
+    return f"{client_id}.{_client_signature(client_id)}"
+
+
+def signed_client_id():
+    """
+    Id de la cookie del cliente si la firma es válida, si no None. Lo
+    usa también el voto del público para contar un voto por dispositivo.
+    """
+    match = CLIENT_ID_PATTERN.match(request.cookies.get(CLIENT_COOKIE, ''))
+    if not match:
+        return None
+
+    client_id, signature = match.groups()
+    if not hmac.compare_digest(signature, _client_signature(client_id)):
+        return None
+
+    return client_id
+
+
+def set_client_cookie(response):
+    """Entregar al cliente una cookie firmada nueva"""
+    response.set_cookie(
+        CLIENT_COOKIE,
+        _new_client_cookie(),
+        max_age=CLIENT_COOKIE_MAX_AGE,
+        httponly=True,
+        samesite='Lax'
+    )
+    return response
+
+
+def _client_key():
+    client_id = signed_client_id()
+    if client_id:
+        return client_id, False
+
+    return f"ip:{request.remote_addr}", True
+
+
+def _too_many_requests(retry_after):
+    seconds = max(1, math.ceil(retry_after))
+    message = f"Demasiadas solicitudes. Reintenta en {seconds} s."
+
+    if 'text/html' in request.headers.get('Accept', ''):
+        # Navegación (recarga de la página): texto simple
+        response = current_app.response_class(message, mimetype='text/plain')
+    else:
+        response = jsonify({
+            'success': False,
+            'message': message,
+            'retry_after': seconds
+        })
+
+    response.status_code = 429
+    response.headers['Retry-After'] = str(seconds)
+    return response
+
+
+def init_proxy_fix(app):
+    """
+    Detrás de PROXY_FIX_COUNT proxies de confianza, tomar la IP del
+    cliente de X-Forwarded-For (remote_addr la refleja).
+    """
+    count = app.config.get('PROXY_FIX_COUNT', 0)
+    if count:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=count, x_proto=count)
+
+
+def init_rate_limits(app):
+    """
+    Aplicar RATE_LIMITS, RATE_LIMIT_TOTALS y el cupo
+    PUBLIC_CONCURRENCY_LIMIT a los endpoints públicos.
+    """
+    if not app.config.get('RATE_LIMIT_ENABLED', True):
+        return
+
+    limiters = {
+        endpoint: TokenBucketLimiter(rate, burst)
+        for endpoint, (rate, burst) in app.config.get('RATE_LIMITS', {}).items()
+    }
+    totals = {
+        endpoint: TokenBucketLimiter(rate, burst, max_keys=64)
+        for endpoint, (rate, burst) in app.config.get('RATE_LIMIT_TOTALS', {}).items()
+    }
+    gate = ConcurrencyGate(
+        app.config.get('PUBLIC_CONCURRENCY_LIMIT', 16),
+        app.config.get('PUBLIC_QUEUE_TIMEOUT', 0.1)
+    )
+    shared_ip_factor = app.config.get('RATE_LIMIT_SHARED_IP_FACTOR', 20)
+
+    app.extensions['rate_limiters'] = limiters
+    app.extensions['rate_limit_totals'] = totals
+    app.extensions['public_gate'] = gate
+
+    @app.before_request
+    def _admission_check():
+        limiter = limiters.get(request.endpoint)
+        if limiter is None:
+            return None
+
+        from flask_login import current_user
+        if current_user.is_authenticated:
+            return None
+
+        client, shared = _client_key()
+        level = (request.view_args or {}).get('level_slug') or '-'
+
+        allowed, retry_after = limiter.take((client, level), scale=shared_ip_factor if shared else 1)
+        if not allowed:
+            REQUESTS_SHED.inc((request.endpoint, 'rate'))
+            return _too_many_requests(retry_after)
+
+        total = totals.get(request.endpoint)
+        if total is not None:
+            allowed, retry_after = total.take((TOTAL_KEY, level))
+            if not allowed:
+                REQUESTS_SHED.inc((request.endpoint, 'total'))
+                return _too_many_requests(retry_after)
+
+        if not gate.enter():
+            REQUESTS_SHED.inc((request.endpoint, 'concurrency'))
+            return _too_many_requests(1)
+
+        g.public_gate_slot = True
+        return None
+
+    @app.after_request
+    def _issue_client_cookie(response):
+        if (
+            request.endpoint in limiters
+            and response.mimetype == 'text/html'
+            and not signed_client_id()
+        ):
+            set_client_cookie(response)
+        return response
+
+    @app.teardown_request
+    def _admission_release(error=None):
+        if g.pop('public_gate_slot', False):
+            gate.leave()
@@ -0,0 +1,109 @@
+"""
+Coalescencia de lecturas concurrentes idénticas (single-flight).
+
+Cuando varios threads piden la misma clave al mismo tiempo, solo el
+primero hace la lectura; los demás esperan y reciben el mismo resultado
+(o la misma excepción). Tras cada transición del quiz, decenas de
+pantallas consultan el estado público casi a la vez: con esto cada
+worker hace una sola lectura a Firestore.
+
+El resultado es compartido entre los que esperaban: no modificarlo.
+Después de escribir una clave, `forget(key)` hace que los siguientes
+pedidos no se sumen a una lectura que empezó antes de la escritura.
+"""
+
+import threading
+import weakref
+
+
+_groups = weakref.WeakSet()
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Grupo de lecturas coalescidas por clave"""
+
+    def __init__(self, name=None, timeout=None):
+        self.name = name
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+
+        if name:
+            _groups.add(self)
+
+    def do(self, key, function):
+        """
+        Ejecutar function() una sola vez por clave entre los threads que
+        llegan mientras está en curso. Si la espera supera `timeout` el
+        thread hace su propia lectura.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+            else:
+                self.shared += 1
+                leader = False
+
+        if not leader:
+            if not call.event.wait(self.timeout):
+                return function()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+            return call.result
+
+        except BaseException as e:
+            call.error = e
+            raise
+
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.event.set()
+
+    def forget(self, key):
+        """Los pedidos siguientes de esta clave inician una lectura nueva"""
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def stats(self):
+        return {
+            'name': self.name,
+            'in_flight': len(self._calls),
+            'leaders': self.leaders,
+            'shared': self.shared
+        }
+
+
+def singleflight_stats():
+    """
+    Estadísticas de los grupos con nombre del proceso, sumadas por nombre.
+    """
+    totals = {}
+
+    for group in list(_groups):
+        stats = group.stats()
+        total = totals.setdefault(stats['name'], dict.fromkeys(('in_flight', 'leaders', 'shared'), 0))
+        for field in total:
+            total[field] += stats[field]
+
+    return totals
@@ -0,0 +1,184 @@
+"""
+Perfilado del arranque en frío (STARTUP_PROFILE=1).
+
+Registra:
+- tiempo de importación por módulo (acumulado y propio)
+- duración de cada fase de inicialización (create_app, Firebase, ...)
+- tiempo hasta el primer byte del primer request
+
+El reporte se guarda en instance/startup_profile.json cuando termina
+el primer request. Sin la variable de entorno no hace nada.
+"""
+
+import builtins
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.enabled = False
+        self.started_at = None
+        self.imports = {}
+        self.phases = []
+        self.marks = {}
+        self._original_import = None
+        self._stack = []
+        self._lock = threading.Lock()
+        self._reported = False
+
+    def start(self):
+        """
+        Activa el perfilado si STARTUP_PROFILE está definido.
+        Debe llamarse antes de importar el resto de la aplicación.
+        """
+        if self.enabled or os.environ.get('STARTUP_PROFILE', '').lower() not in ('1', 'true', 'yes'):
+            return
+
+        self.enabled = True
+        self.started_at = time.perf_counter()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def stop(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import
+
+        if (
+            level
+            or name in sys.modules
+            or threading.current_thread() is not threading.main_thread()
+        ):
+            return original(name, globals, locals, fromlist, level)
+
+        started = time.perf_counter()
+        self._stack.append(0.0)
+
+        try:
+            return original(name, globals, locals, fromlist, level)
+
+        finally:
+            elapsed = time.perf_counter() - started
+            children = self._stack.pop()
+
+            if self._stack:
+                self._stack[-1] += elapsed
+
+            entry = self.imports.setdefault(name, {'cumulative_ms': 0.0, 'self_ms': 0.0})
+            entry['cumulative_ms'] += elapsed * 1000
+            entry['self_ms'] += (elapsed - children) * 1000
+
+    def _offset_ms(self):
+        return (time.perf_counter() - self.started_at) * 1000
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Mide una fase de inicialización.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        offset = self._offset_ms()
+        started = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases.append({
+                    'name': name,
+                    'start_ms': round(offset, 2),
+                    'duration_ms': round((time.perf_counter() - started) * 1000, 2)
+                })
+
+    def profiled(self, name=None):
+        """
+        Decorador equivalente a phase() para funciones de inicialización.
+        """
+        def decorator(func):
+            phase_name = name or func.__name__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.phase(phase_name):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def mark(self, name):
+        if self.enabled:
+            with self._lock:
+                self.marks.setdefault(name, round(self._offset_ms(), 2))
+
+    def install(self, app):
+        """
+        Registra hooks para medir el primer request y escribir el reporte.
+        """
+        if not self.enabled:
+            return
+
+        self.mark('app_ready')
+
+        @app.before_request
+        def _startup_profile_first_request():
+            self.mark('first_request_started')
+
+        @app.after_request
+        def _startup_profile_first_response(response):
+            if not self._reported:
+                self.mark('first_response_ready')
+                self.write_report(app.config['STARTUP_PROFILE_PATH'])
+                app.logger.info(
+                    f"Perfil de arranque guardado en {app.config['STARTUP_PROFILE_PATH']}"
+                )
+
+            return response
+
+    def report(self, top=40):
+        imports = sorted(
+            (
+                {'module': module, **{k: round(v, 2) for k, v in times.items()}}
+                for module, times in self.imports.items()
+            ),
+            key=lambda item: item['cumulative_ms'],
+            reverse=True
+        )
+
+        return {
+            'pid': os.getpid(),
+            'marks_ms': dict(self.marks),
+            'phases': list(self.phases),
+            'imports_total': len(imports),
+            'imports': imports[:top]
+        }
+
+    def write_report(self, path):
+        with self._lock:
+            if self._reported:
+                return
+            self._reported = True
+
+        self.stop()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(path, 'w', encoding='utf-8') as fh:
+            json.dump(self.report(), fh, indent=2, ensure_ascii=False)
+
+
+startup_profiler = StartupProfiler()
@@ -0,0 +1,307 @@
+"""
+Logging estructurado y no bloqueante.
+
+- Cada registro sale como una línea JSON: ts, level, logger, msg, pid,
+  datos del request (request_id, method, path, endpoint, elapsed_ms) y
+  los campos pasados con extra=
+- El hilo del request solo encola el registro (QueueHandler). Un hilo de
+  fondo (QueueListener) lo formatea, traceback incluido, y lo escribe en
+  stderr. Si la cola se llena se descarta el registro en lugar de
+  bloquear el request.
+- Los WARNING y ERROR se limitan por punto de origen (archivo, línea,
+  endpoint y tipo de excepción): unos pocos por ventana y, en el primero
+  de la ventana siguiente, cuántos se omitieron. Una caída de Firestore
+  no se convierte en miles de tracebacks por worker.
+- Cada request lleva un id: el header X-Request-ID entrante o uno nuevo,
+  devuelto en la respuesta.
+
+Los registros descartados se cuentan en /metrics
+(olimpiadas_log_records_dropped_total).
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+from utils.metrics import REGISTRY
+
+
+LOG_RECORDS_DROPPED = REGISTRY.counter(
+    'olimpiadas_log_records_dropped_total',
+    'Registros de log descartados (cola llena o límite de errores).',
+    ('reason',)
+)
+
+STANDARD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+REQUEST_ID_MAX_LENGTH = 64
+
+
+# ============================================================
+# Formato
+# ============================================================
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'pid': record.process
+        }
+
+        for key, value in record.__dict__.items():
+            if key not in STANDARD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+
+        if record.exc_info and record.exc_info[0] is not None:
+            entry['exc_type'] = record.exc_info[0].__name__
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """
+    Para desarrollo (LOG_FORMAT=text): una línea legible con el request id.
+    """
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s')
+
+    def format(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = '-'
+        return super().format(record)
+
+
+# ============================================================
+# Filtros (corren en el hilo que registra)
+# ============================================================
+
+class RequestContextFilter(logging.Filter):
+    """
+    Agregar al registro los datos del request en curso. Tiene que correr
+    en el hilo del request: el hilo de fondo no tiene contexto de Flask.
+    """
+
+    def filter(self, record):
+        if not has_request_context():
+            return True
+
+        if not hasattr(record, 'request_id'):
+            record.request_id = g.get('request_id')
+        if not hasattr(record, 'method'):
+            record.method = request.method
+        if not hasattr(record, 'path'):
+            record.path = request.path
+        if not hasattr(record, 'endpoint'):
+            record.endpoint = request.endpoint
+
+        started = g.get('request_started_at')
+        if started is not None and not hasattr(record, 'elapsed_ms'):
+            record.elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        return True
+
+
+class ErrorRateLimitFilter(logging.Filter):
+    """
+    Como mucho `burst` registros por punto de origen cada `window`
+    segundos, a partir de `level`. El primero que pasa en una ventana
+    nueva lleva `suppressed` con los omitidos en la anterior.
+    """
+
+    MAX_KEYS = 1000
+
+    def __init__(self, level=logging.WARNING, burst=5, window=60):
+        super().__init__()
+        self.level = level
+        self.burst = burst
+        self.window = window
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < self.level or not self.burst:
+            return True
+
+        exc_type = record.exc_info[0].__name__ if record.exc_info and record.exc_info[0] else None
+        key = (record.pathname, record.lineno, getattr(record, 'endpoint', None), exc_type)
+        now = time.monotonic()
+
+        with self._lock:
+            state = self._windows.get(key)
+
+            if state is None or now - state[0] >= self.window:
+                suppressed = state[2] if state else 0
+
+                if state is None and len(self._windows) >= self.MAX_KEYS:
+                    self._expire(now)
+
+                state = self._windows[key] = [now, 0, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+
+            if state[1] < self.burst:
+                state[1] += 1
+                return True
+
+            state[2] += 1
+
+        LOG_RECORDS_DROPPED.inc(('rate_limited',))
+        return False
+
+    def _expire(self, now):
+        for key in [key for key, state in self._windows.items() if now - state[0] >= self.window]:
+            del self._windows[key]
+
+        if len(self._windows) >= self.MAX_KEYS:
+            self._windows.clear()
+
+
+# ============================================================
+# Cola
+# ============================================================
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(('queue_full',))
+
+    def prepare(self, record):
+        # A diferencia de QueueHandler.prepare no se formatea aquí: el JSON
+        # y el traceback (exc_info) los arma el hilo de fondo.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+_lock = threading.Lock()
+_handler = None
+_listener = None
+
+
+def configure_logging(level='INFO', log_format='json', queue_size=10000,
+                      error_burst=5, error_window=60, stream=None):
+    """
+    Instalar el pipeline en el logger raíz (una vez por proceso; las
+    llamadas siguientes solo ajustan el nivel).
+    """
+    global _handler, _listener
+
+    root = logging.getLogger()
+    root.setLevel(level)
+
+    with _lock:
+        if _handler is not None:
+            _handler.setLevel(level)
+            return _handler
+
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(TextFormatter() if log_format == 'text' else JsonFormatter())
+
+        # El nivel va también en el handler: Flask pone app.logger en DEBUG
+        # cuando app.debug está activo
+        _handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+        _handler.setLevel(level)
+        _handler.addFilter(RequestContextFilter())
+        _handler.addFilter(ErrorRateLimitFilter(burst=error_burst, window=error_window))
+
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(_handler)
+
+        _listener = logging.handlers.QueueListener(_handler.queue, output)
+        _listener.start()
+
+        atexit.register(shutdown_logging)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_restart_after_fork)
+
+    return _handler
+
+
+def shutdown_logging():
+    """
+    Escribir lo que quede en la cola y detener el hilo de fondo.
+    """
+    global _listener
+
+    with _lock:
+        if _listener is not None and _listener._thread is not None:
+            _listener.stop()
+
+
+def _restart_after_fork():
+    # El hilo de fondo no sobrevive al fork (workers de gunicorn con
+    # preload) y la cola heredada puede tener su lock tomado: empezar
+    # con una cola y un hilo nuevos.
+    global _lock, _listener
+
+    _lock = threading.Lock()
+    if _handler is None:
+        return
+
+    _handler.queue = queue.Queue(maxsize=_handler.queue.maxsize)
+    _listener = logging.handlers.QueueListener(_handler.queue, *_listener.handlers)
+    _listener.start()
+
+
+# ============================================================
+# Integración con Flask
+# ============================================================
+
+def _incoming_request_id():
+    value = request.headers.get('X-Request-ID', '')
+    if value and len(value) <= REQUEST_ID_MAX_LENGTH and value.isprintable():
+        return value
+    return uuid.uuid4().hex
+
+
+def init_logging(app):
+    """
+    Configurar el logging del proceso y el id de cada request.
+    """
+    configure_logging(
+        level=app.config.get('LOG_LEVEL', 'INFO'),
+        log_format=app.config.get('LOG_FORMAT', 'json'),
+        queue_size=app.config.get('LOG_QUEUE_SIZE', 10000),
+        error_burst=app.config.get('LOG_ERROR_BURST', 5),
+        error_window=app.config.get('LOG_ERROR_WINDOW', 60)
+    )
+
+    # Los registros de app.logger pasan por el logger raíz
+    from flask.logging import default_handler
+    app.logger.removeHandler(default_handler)
+
+    @app.before_request
+    def _logging_start():
+        g.request_id = _incoming_request_id()
+        g.request_started_at = time.perf_counter()
+
+    @app.after_request
+    def _logging_finish(response):
+        request_id = g.get('request_id')
+        if request_id:
+            response.headers['X-Request-ID'] = request_id
+        return response